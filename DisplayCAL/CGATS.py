@@ -12,11 +12,24 @@ import re
 import os
 from pathlib import Path
 
+import numpy
+
 from DisplayCAL import colormath
 from DisplayCAL.log import safe_print
 from DisplayCAL.options import debug, verbose
 from DisplayCAL.util_io import GzipFileProper, StringIOu as StringIO
 
+# Everything except tab, printable ASCII and 8-bit chars
+CONTROL_CHARS = bytes(range(0x09)) + bytes(range(0x0A, 0x20)) + b"\x7f"
+
+# Placeholder for DATA samples that are only stored in columns so far
+LAZY_SAMPLE = object()
+
+POWERS_OF_TEN = numpy.array([10.0**i for i in range(1, 16)])
+
+# Types of items that query looks into
+CONTAINER_TYPES = (dict, list, tuple)
+
 
 def get_device_value_labels(color_rep=None):
     # TODO: Avoid using filter...
@@ -62,6 +75,157 @@ def rpad(value, width) -> bytes:
     return strval
 
 
+def rpad_columns(columns, width):
+    """Return rows of space separated values, each padded like rpad.
+
+    columns is a list of equally long columns of values. Widths and
+    precisions of float64 and int64 numpy array columns are determined for
+    the whole column at once, and each row is formatted with a single format
+    operation.
+
+    """
+    if not columns or not len(columns[0]):
+        return []
+    fragments = [b"%s", b"%d"]
+    fragment_codes = {b"%s": 0, b"%d": 1}
+    codes = []
+    args = []
+    for column in columns:
+        if isinstance(column, numpy.ndarray) and column.dtype.kind == "f":
+            # Same as rpad for values that have a decimal point and are
+            # neither too large nor too small to be represented in decimal
+            # notation by str()
+            widths = width + (column < 0)
+            a = numpy.abs(column)
+            plain = numpy.isfinite(column) & (a < 1e15) & ((a >= 1e-4) | (a == 0))
+            # Number of characters before the decimal point
+            i = numpy.signbit(column) + (
+                numpy.searchsorted(POWERS_OF_TEN, numpy.floor(a), "right") + 1
+            )
+            plain &= i < widths - 1
+            keys = numpy.where(plain, widths * 1000 + widths - i - 1, -1)
+            unique, column_codes = numpy.unique(keys, return_inverse=True)
+            lookup = []
+            for key in unique.tolist():
+                fragment = b"%%%i.%if" % divmod(key, 1000) if key > -1 else b"%s"
+                if fragment not in fragment_codes:
+                    fragment_codes[fragment] = len(fragments)
+                    fragments.append(fragment)
+                lookup.append(fragment_codes[fragment])
+            column_codes = numpy.array(lookup)[column_codes.reshape(-1)]
+            values = column.tolist()
+            for j in numpy.flatnonzero(~plain).tolist():
+                values[j] = rpad(values[j], width + (1 if values[j] < 0 else 0))
+        elif isinstance(column, numpy.ndarray) and column.dtype.kind in "iu":
+            column_codes = numpy.ones(len(column), dtype=numpy.intp)
+            values = column.tolist()
+        else:
+            column_codes = numpy.zeros(len(column), dtype=numpy.intp)
+            values = [rpad(value, width + (1 if value < 0 else 0)) for value in column]
+        codes.append(column_codes)
+        args.append(values)
+    # One format per distinct combination of fragments
+    unique, row_codes = numpy.unique(
+        numpy.stack(codes, axis=-1), axis=0, return_inverse=True
+    )
+    formats = [b" ".join(fragments[code] for code in row) for row in unique.tolist()]
+    return [
+        formats[code] % values
+        for code, values in zip(row_codes.reshape(-1).tolist(), zip(*args))
+    ]
+
+
+def tokenize(raw_line):
+    """Return line stripped of control chars and comments, and its values.
+
+    Quoted values are unquoted.
+
+    """
+    # Replace 1.#IND00 with NaN
+    raw_line = raw_line.replace(b"1.#IND00", b"NaN")
+
+    # strip control chars and leading/trailing whitespace
+    line = raw_line.strip().translate(None, CONTROL_CHARS)
+
+    if b"#" in line or b'"' in line:
+        # Deal with comments and quotes
+        quoted = False
+        values = []
+        token_start = 0
+        end = len(line) - 1
+        for i in range(len(line)):
+            char = line[i : i + 1]
+            if char == b'"':
+                if quoted is False:
+                    if not line[token_start:i]:
+                        token_start = i
+                    quoted = True
+                else:
+                    quoted = False
+            if (quoted is False and char in b"# \t") or i == end:
+                if i == end:
+                    i += 1
+                value = line[token_start:i]
+                if value:
+                    if value[0:1] == b'"' == value[-2:-1]:
+                        # Unquote
+                        value = value[1:-1]
+                    # Need to unescape double quote -> single quote
+                    values.append(value.replace(b'""', b'"'))
+                if char == b"#":
+                    # Strip comment
+                    line = line[:i].strip()
+                    break
+                elif char in b" \t":
+                    token_start = i + 1
+    else:
+        # no comments or quotes
+        values = line.split()
+    return line, values
+
+
+def str2number(value):
+    """Return int or float if value is an unsigned number, otherwise value"""
+    match = re.match(rb"(?:\d+|((?:\d*\.\d+|\d+)(?:e[+-]?\d+)?))$", value)
+    if match:
+        if match.groups()[0]:
+            return float(value)
+        return int(value)
+    return value
+
+
+def get_vmaxlen(values, round_digits=False):
+    """Return the number of digits needed to represent values in decimal
+    notation (as used for the DATA vmaxlen attribute).
+
+    If round_digits is True, values (NumPy array) with more than 4 decimal
+    digits are rounded in-place to 4 digits first.
+
+    """
+    unique, inverse = numpy.unique(values, return_inverse=True)
+    strvals = list(map(str, numpy.abs(unique).tolist()))
+    if round_digits:
+        rounded = [
+            i
+            for i, strval in enumerate(strvals)
+            if "." in strval and len(strval) - strval.index(".") > 5
+        ]
+        if rounded:
+            for i in rounded:
+                unique[i] = round(unique[i].item(), 4)
+                strvals[i] = str(abs(unique[i].item()))
+            mask = numpy.isin(inverse, rounded)
+            values[mask] = unique[inverse[mask]]
+    vmaxlen = max(map(len, strvals), default=0)
+    if "e" in "".join(strvals):
+        # Scientific notation
+        for strval in strvals:
+            parts = strval.split("e")
+            if len(parts) > 1:
+                vmaxlen = max(vmaxlen, len(parts[0]) + abs(int(parts[1])))
+    return vmaxlen
+
+
 def sort_RGB_gray_to_top(a, b):
     if a[0] == a[1] == a[2]:
         if b[0] == b[1] == b[2]:
@@ -217,6 +381,46 @@ class CGATSValueError(CGATSError, ValueError):
     pass
 
 
+class _QueryResultValues(object):
+    """Values of a query result, compared by equality like the values of a
+    list, but hashed where possible.
+
+    """
+
+    def __init__(self, values=()):
+        self._values = []
+        self._hashed = set()
+        self._unhashable = []
+        for value in values:
+            self.add(value)
+
+    def _hashable(self, value):
+        try:
+            if isinstance(value, dict):
+                if getattr(value, "_columns", None) is not None:
+                    # Needs CGATS.__eq__
+                    return None
+                return (dict, frozenset(dict.items(value)))
+            hash(value)
+        except TypeError:
+            return None
+        return value
+
+    def __contains__(self, value):
+        hashable = self._hashable(value)
+        if hashable is None:
+            return value in self._values
+        return hashable in self._hashed or value in self._unhashable
+
+    def add(self, value):
+        self._values.append(value)
+        hashable = self._hashable(value)
+        if hashable is None:
+            self._unhashable.append(value)
+        else:
+            self._hashed.add(hashable)
+
+
 class CGATS(dict):
     """CGATS structure.
 
@@ -235,7 +439,10 @@ class CGATS(dict):
         self.filename = filename
 
     key = None
+    _columns = None
+    _index = None
     _lvl = 0
+    _shared_columns = frozenset()
     _modified = False
     mtime = None
     parent = None
@@ -302,47 +509,10 @@ class CGATS(dict):
                 cgats.close()
 
             context = self
-            for raw_line in raw_lines:
-                # Replace 1.#IND00 with NaN
-                raw_line = raw_line.replace(b"1.#IND00", b"NaN")
-
-                # strip control chars and leading/trailing whitespace
-                line = re.sub(b"[^\x09\x20-\x7E\x80-\xFF]", b"", raw_line.strip())
-
-                if b"#" in line or b'"' in line:
-                    # Deal with comments and quotes
-                    quoted = False
-                    values = []
-                    token_start = 0
-                    end = len(line) - 1
-                    for i in range(len(line)):
-                        char = line[i : i + 1]
-                        if char == b'"':
-                            if quoted is False:
-                                if not line[token_start:i]:
-                                    token_start = i
-                                quoted = True
-                            else:
-                                quoted = False
-                        if (quoted is False and char in b"# \t") or i == end:
-                            if i == end:
-                                i += 1
-                            value = line[token_start:i]
-                            if value:
-                                if value[0:1] == b'"' == value[-2:-1]:
-                                    # Unquote
-                                    value = value[1:-1]
-                                # Need to unescape double quote -> single quote
-                                values.append(value.replace(b'""', b'"'))
-                            if char == b"#":
-                                # Strip comment
-                                line = line[:i].strip()
-                                break
-                            elif char in b" \t":
-                                token_start = i + 1
-                else:
-                    # no comments or quotes
-                    values = line.split()
+            i = 0
+            while i < len(raw_lines):
+                line, values = tokenize(raw_lines[i])
+                i += 1
 
                 if line[:6] == b"BEGIN_":
                     key = line[6:].decode()
@@ -372,6 +542,7 @@ class CGATS(dict):
                     context["DATA"].root = self
                     context["DATA"].type = b"DATA"
                     context = context["DATA"]
+                    i = context.add_data_block(raw_lines, i)
                 elif line == b"END_DATA":
                     context = context.parent
                 elif line[:6] == b"BEGIN_":
@@ -432,15 +603,41 @@ class CGATS(dict):
         self.setmodified()
 
     def __delitem__(self, name):
+        if self.type == b"SAMPLE":
+            if self.parent is not None and name in (self.parent._columns or ()):
+                self.parent._create_samples(True)
+        elif self._columns is not None:
+            self._create_samples(True)
         dict.__delitem__(self, name)
+        self._discard_index()
         self.setmodified()
 
+    def __eq__(self, other):
+        if (
+            isinstance(other, CGATS)
+            and other is not self
+            and (self._columns is not None or other._columns is not None)
+            and dict.keys(self) == dict.keys(other)
+        ):
+            # Compare samples, not placeholders
+            self._create_samples()
+            other._create_samples()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
     def __getattr__(self, name):
         if name in self:
             return self[name]
         else:
             raise AttributeError(name)
 
+    def __iter__(self):
+        # Not dict's own iterator, so dict(self) and {**self} get the values
+        # via __getitem__ (which creates samples only stored in columns)
+        return dict.__iter__(self)
+
     def __getitem__(self, name):
         if name == -1:
             return self.get(len(self) - 1)
@@ -460,11 +657,13 @@ class CGATS(dict):
 
     def get(self, name, default=None):
         if name == -1:
-            return dict.get(self, len(self) - 1, default)
+            name = len(self) - 1
         elif name in ("NUMBER_OF_FIELDS", "NUMBER_OF_SETS"):
             return getattr(self, name, default)
-        else:
-            return dict.get(self, name, default)
+        value = dict.get(self, name, default)
+        if value is LAZY_SAMPLE:
+            value = self._get_sample(name)
+        return value
 
     def get_colorants(self):
         color_rep = (self.queryv1("COLOR_REP") or b"").split(b"_")
@@ -531,10 +730,16 @@ class CGATS(dict):
         return desc
 
     def __setattr__(self, name, value):
-        if name in ("_keys", "_lvl"):
+        if name in ("_columns", "_keys", "_lvl", "_shared_columns"):
             object.__setattr__(self, name, value)
         elif name == "modified":
             self.setmodified(value)
+        elif name == "parent":
+            # Items are only indexed by the CGATS instance they belong to
+            self._discard_index()
+            object.__setattr__(self, name, value)
+            self._discard_index()
+            self.setmodified()
         elif name in (
             "datetime",
             "filename",
@@ -543,7 +748,6 @@ class CGATS(dict):
             "key",
             "mtime",
             "normalize_fields",
-            "parent",
             "root",
             "type",
             "vmaxlen",
@@ -555,9 +759,226 @@ class CGATS(dict):
             self[name] = value
 
     def __setitem__(self, name, value):
+        if self.type == b"SAMPLE":
+            if self.parent is not None and self.parent._columns is not None:
+                self.parent._set_column_value(name, self.key, value)
+        elif self._columns is not None:
+            self._create_samples(True)
+        if (
+            not dict.__contains__(self, name)
+            or isinstance(value, CONTAINER_TYPES)
+            or isinstance(dict.get(self, name), CONTAINER_TYPES)
+        ):
+            # The keys below self change
+            self._discard_index()
         dict.__setitem__(self, name, value)
         self.setmodified()
 
+    def __repr__(self):
+        self._create_samples()
+        return dict.__repr__(self)
+
+    def clear(self):
+        self._columns = None
+        dict.clear(self)
+        self._discard_index()
+
+    def items(self):
+        self._create_samples()
+        return dict.items(self)
+
+    def setdefault(self, name, default=None):
+        if not dict.__contains__(self, name):
+            self[name] = default
+        value = dict.get(self, name)
+        if value is LAZY_SAMPLE:
+            value = self._get_sample(name)
+        return value
+
+    def update(self, *args, **kwargs):
+        if self.type == b"SAMPLE":
+            # Values are written through to the DATA columns (see __setitem__)
+            for name, value in dict(*args, **kwargs).items():
+                self[name] = value
+            return
+        self._create_samples(True)
+        dict.update(self, *args, **kwargs)
+        self._discard_index()
+
+    def values(self):
+        self._create_samples()
+        return dict.values(self)
+
+    def _create_samples(self, discard_columns=False):
+        """Create the sample objects of DATA rows that are only stored in
+        columns.
+
+        If discard_columns is True, also stop keeping the values in columns
+        (the samples are then the only storage), e.g. before rows are added,
+        removed or moved.
+
+        """
+        if self._columns is None:
+            return
+        columns = {}
+        for name, column in self._columns.items():
+            if isinstance(column, numpy.ndarray):
+                column = column.tolist()
+            columns[name] = column
+        for key in [key for key, sample in dict.items(self) if sample is LAZY_SAMPLE]:
+            self._get_sample(key, columns)
+        if discard_columns:
+            self._columns = None
+
+    def _get_sample(self, key, columns=None):
+        """Create the sample object of DATA row key from columns"""
+        sample = CGATS()
+        for name, column in (columns or self._columns).items():
+            value = column[key]
+            if isinstance(value, numpy.generic):
+                value = value.item()
+            dict.__setitem__(sample, name, value)
+        object.__setattr__(sample, "key", key)
+        object.__setattr__(sample, "parent", self)
+        object.__setattr__(sample, "root", self.root)
+        object.__setattr__(sample, "type", b"SAMPLE")
+        dict.__setitem__(self, key, sample)
+        return sample
+
+    def _set_column_value(self, name, key, value):
+        """Update column name at DATA row key (if there is such a column)"""
+        column = self._columns.get(name)
+        if column is None:
+            return
+        if name in self._shared_columns:
+            # The column is shared with a copy (see copy method)
+            if isinstance(column, numpy.ndarray):
+                column = column.copy()
+            else:
+                column = list(column)
+            self._columns[name] = column
+            self._shared_columns = self._shared_columns - {name}
+        if isinstance(column, numpy.ndarray):
+            if column.dtype.kind == "f":
+                fits = isinstance(value, float)
+            else:
+                fits = isinstance(value, int) and not isinstance(value, bool)
+            if fits:
+                try:
+                    column[key] = value
+                except OverflowError:
+                    pass
+                else:
+                    return
+            # Keep values that don't fit the array type as they are
+            column = self._columns[name] = column.tolist()
+        column[key] = value
+
+    def copy(self):
+        """Return a copy of the CGATS structure.
+
+        DATA columns are shared between the copy and the original until either
+        of them changes a column (copy-on-write), so copying doesn't depend on
+        the number of samples kept in columns.
+
+        The copy is the root of the copied structure and has no parent, also
+        if self is not the root.
+
+        """
+        return self._copy(None, None)
+
+    def _copy(self, parent, root):
+        clone = CGATS()
+        for name in (
+            "datetime",
+            "emit_keywords",
+            "file_identifier",
+            "filename",
+            "key",
+            "mtime",
+            "type",
+            "vmaxlen",
+        ):
+            object.__setattr__(clone, name, getattr(self, name))
+        if root is None:
+            root = clone
+            object.__setattr__(clone, "normalize_fields", self.root.normalize_fields)
+            object.__setattr__(clone, "_modified", self.root._modified)
+        object.__setattr__(clone, "parent", parent)
+        object.__setattr__(clone, "root", root)
+        columns = self._columns
+        if columns is not None:
+            self._shared_columns = clone._shared_columns = frozenset(columns)
+            clone._columns = dict(columns)
+        dict.update(clone, dict.items(self))
+        for key, value in [
+            (key, value) for key, value in dict.items(self) if isinstance(value, CGATS)
+        ]:
+            if columns is not None and dict.keys(value) == columns.keys():
+                # The sample has no other values than the columns
+                value = LAZY_SAMPLE
+            else:
+                value = value._copy(clone, root)
+            dict.__setitem__(clone, key, value)
+        return clone
+
+    def _is_root_item(self):
+        """Return whether self is an item of the root (e.g. a CTI3 block) or
+        a copy of one (see copy)"""
+        if self.parent is not None:
+            return self.parent.type == b"ROOT"
+        return self.type not in (
+            b"DATA",
+            b"DATA_FORMAT",
+            b"KEYWORDS",
+            b"ROOT",
+            b"SAMPLE",
+            b"SECTION",
+        )
+
+    def _discard_index(self):
+        """Discard the query index of self and the items self belongs to"""
+        item = self
+        while item is not None:
+            object.__setattr__(item, "_index", None)
+            item = item.parent
+
+    def _get_index(self):
+        """Return the query index of self, i.e. the keys of self and of all
+        CGATS items below self, and whether there are any items below self.
+
+        The index is kept until self or an item below self gets a new key.
+        Return None if self contains CGATS items that belong to another
+        CGATS instance (e.g. query results) or other containers.
+
+        """
+        if self._index is None:
+            keys = set()
+            leaf = True
+            for value in dict.values(self):
+                if value is LAZY_SAMPLE:
+                    leaf = False
+                elif isinstance(value, CGATS):
+                    if value.parent is not self:
+                        return None
+                    index = value._get_index()
+                    if index is None:
+                        return None
+                    keys |= index[0]
+                    leaf = False
+                elif isinstance(value, CONTAINER_TYPES):
+                    return None
+            keys.update(dict.keys(self))
+            if self._columns is not None:
+                keys.update(self._columns)
+            # See query
+            if dict.__contains__(self, "DATA_FORMAT"):
+                keys.add("NUMBER_OF_FIELDS")
+            if dict.__contains__(self, "DATA"):
+                keys.add("NUMBER_OF_SETS")
+            object.__setattr__(self, "_index", (frozenset(keys), leaf))
+        return self._index
+
     def setmodified(self, modified=True):
         """Set 'modified' state on the 'root' object."""
         if self.root and self.root._modified != modified:
@@ -584,7 +1005,7 @@ class CGATS(dict):
                 result.append(self.datetime)
             if self.type == b"SECTION":
                 result.append(b"BEGIN_" + self.key.encode())
-            elif self.parent and self.parent.type == b"ROOT":
+            elif self._is_root_item():
                 result.append(self.type.ljust(7))  # Make sure CGATS file
                 #                                    identifiers are always
                 #                                    a minimum of 7 characters
@@ -593,6 +1014,10 @@ class CGATS(dict):
                 iterable = self
             else:
                 iterable = self.keys()
+            if "KEYWORDS" in self:
+                keywords = set(self["KEYWORDS"].values())
+            else:
+                keywords = ()
             for key in iterable:
                 value = self[key]
                 if isinstance(value, str):
@@ -606,9 +1031,7 @@ class CGATS(dict):
                         if isinstance(key, int):
                             result.append(bytes(str(value), "utf-8"))
                         else:
-                            if "KEYWORDS" in self and key in list(
-                                self["KEYWORDS"].values()
-                            ):
+                            if key in keywords:
                                 if self.emit_keywords:
                                     result.append(b'KEYWORD "%s"' % key.encode())
                             if isinstance(value, bytes):
@@ -631,8 +1054,9 @@ class CGATS(dict):
                 result.append(b"")
         if data and data.parent["DATA_FORMAT"]:
             if "KEYWORDS" in data.parent and self.emit_keywords:
-                for item in list(data.parent["DATA_FORMAT"].values()):
-                    if item in list(data.parent["KEYWORDS"].values()):
+                keywords = set(data.parent["KEYWORDS"].values())
+                for item in data.parent["DATA_FORMAT"].values():
+                    if item in keywords:
                         result.append(b'KEYWORD "%s"' % item)
             result.append(
                 b"NUMBER_OF_FIELDS %s"
@@ -644,22 +1068,15 @@ class CGATS(dict):
             result.append(b"")
             result.append(b"NUMBER_OF_SETS %s" % (bytes(str(len(data)), "utf-8")))
             result.append(b"BEGIN_DATA")
-            for key in data:
-                result.append(
-                    b" ".join(
-                        [
-                            rpad(
-                                data[key][item.decode("utf-8")],
-                                data.vmaxlen
-                                + (1 if data[key][item.decode("utf-8")] < 0 else 0),
-                            )
-                            for item in list(data.parent["DATA_FORMAT"].values())
-                        ]
-                    )
+            result.extend(
+                rpad_columns(
+                    data._get_output_columns(data.parent["DATA_FORMAT"].values()),
+                    data.vmaxlen,
                 )
+            )
             result.append(b"END_DATA")
         if (
-            (self.parent and self.parent.type or self.type) == b"ROOT"
+            (self.type == b"ROOT" or self._is_root_item())
             and result
             and result[-1] != b""
             and lvl == 0
@@ -669,6 +1086,74 @@ class CGATS(dict):
         self.root._lvl -= 1
         return b"\n".join(result)
 
+    def _get_output_columns(self, fields):
+        """Return the values of DATA fields as written, column by column
+
+        Values of samples that were created are read from the samples, values
+        of samples only stored in columns from the columns.
+
+        """
+        samples = [
+            (key, sample)
+            for key, sample in dict.items(self)
+            if sample is not LAZY_SAMPLE
+        ]
+        columns = []
+        for item in fields:
+            name = item.decode("utf-8")
+            column = (self._columns or {}).get(name)
+            if name.upper() in ("INDEX", "SAMPLE_ID", "SAMPLEID"):
+                if isinstance(column, numpy.ndarray):
+                    # Integer IDs are derived from the key (see __getitem__)
+                    column = numpy.arange(len(self)) + (name.upper() != "INDEX")
+                else:
+                    column = [self[key][name] for key in self]
+            elif column is None:
+                try:
+                    column = [
+                        dict.__getitem__(sample, name) for sample in self.values()
+                    ]
+                except KeyError:
+                    raise CGATSKeyError(name)
+                if all(type(value) is float for value in column):
+                    column = numpy.array(column, dtype=numpy.float64)
+            elif samples:
+                try:
+                    values = [
+                        (key, dict.__getitem__(sample, name)) for key, sample in samples
+                    ]
+                except KeyError:
+                    raise CGATSKeyError(name)
+                column = self._get_updated_column(column, values)
+            columns.append(column)
+        return columns
+
+    @staticmethod
+    def _get_updated_column(column, values):
+        """Return a copy of column with (key, value) pairs values applied
+
+        The copy is a list unless all values fit the array type of column
+        (see _set_column_value).
+
+        """
+        if isinstance(column, numpy.ndarray):
+            vtype = float if column.dtype.kind == "f" else int
+            if all(type(value) is vtype for key, value in values):
+                keys = [key for key, value in values]
+                try:
+                    updated = column.copy()
+                    updated[keys] = [value for key, value in values]
+                except OverflowError:
+                    pass
+                else:
+                    return updated
+            column = column.tolist()
+        else:
+            column = list(column)
+        for key, value in values:
+            column[key] = value
+        return column
+
     def add_keyword(self, keyword, value=None):
         """Add a keyword to the list of keyword values."""
         if isinstance(keyword, bytes):
@@ -1041,14 +1526,7 @@ class CGATS(dict):
                                 item = b"SAMPLE_ID"
                             # allow alphanumeric INDEX / SAMPLE_ID
                             if isinstance(value, bytes):
-                                match = re.match(
-                                    rb"(?:\d+|((?:\d*\.\d+|\d+)(?:e[+-]?\d+)?))$", value
-                                )
-                                if match:
-                                    if match.groups()[0]:
-                                        value = float(value)
-                                    else:
-                                        value = int(value)
+                                value = str2number(value)
                         elif item.upper() not in (
                             b"SAMPLE_NAME",
                             b"SAMPLE_LOC",
@@ -1147,9 +1625,7 @@ class CGATS(dict):
                     "Invalid data type for %s "
                     "(expected bytes or str, got %s)" % (self.type, type(data))
                 )
-        elif self.type in (b"DATA_FORMAT", b"KEYWORDS") or (
-            self.parent and self.parent.type == b"ROOT"
-        ):
+        elif self.type in (b"DATA_FORMAT", b"KEYWORDS") or self._is_root_item():
             if isinstance(data, (dict, list, tuple)):
                 for var in data:
                     if isinstance(var, bytes):
@@ -1229,6 +1705,173 @@ class CGATS(dict):
             raise CGATSInvalidOperationError("Cannot add data to %s" % self.type)
         return context
 
+    def add_data_block(self, raw_lines, start=0):
+        """Add the samples of a DATA block in one go.
+
+        Lines are read from raw_lines[start:] up to the next BEGIN_ or END_
+        line, and the index of that line is returned.
+
+        The values are converted column by column and kept in columns, sample
+        objects are only created when a sample is accessed. If that's not
+        possible (e.g. because a sample has the wrong number of values), the
+        samples are added one by one using add_data instead.
+
+        """
+        rows = []
+        i = start
+        while i < len(raw_lines):
+            line, values = tokenize(raw_lines[i])
+            if line[:6] == b"BEGIN_" or line[:4] == b"END_":
+                break
+            if values:
+                rows.append(values)
+            i += 1
+        if rows and not self._set_columns(rows):
+            for values in rows:
+                self.add_data(values)
+        return i
+
+    def _set_columns(self, rows):
+        """Set DATA columns from rows of (bytes) values.
+
+        Return False if the rows can't be stored in columns.
+
+        """
+        data_format = self.parent and self.parent.get("DATA_FORMAT")
+        if self.type != b"DATA" or len(self) or not data_format:
+            return False
+        fields = list(data_format.values())
+        if any(len(values) != len(fields) for values in rows):
+            return False
+        vmaxlen = self.vmaxlen
+        columns = {}
+        for item, values in zip(fields, zip(*rows)):
+            if item.upper() in (b"INDEX", b"SAMPLE_ID", b"SAMPLEID"):
+                if self.root.normalize_fields and item.upper() == b"SAMPLEID":
+                    item = b"SAMPLE_ID"
+                # allow alphanumeric INDEX / SAMPLE_ID
+                column = [str2number(value) for value in values]
+                if all(type(value) is int for value in column):
+                    try:
+                        column = numpy.array(column, dtype=numpy.int64)
+                    except OverflowError:
+                        pass
+            elif item.upper() not in (b"SAMPLE_NAME", b"SAMPLE_LOC", b"SAMPLENAME"):
+                try:
+                    column = numpy.fromiter(map(float, values), numpy.float64)
+                except ValueError:
+                    return False
+                vmaxlen = max(
+                    vmaxlen,
+                    get_vmaxlen(
+                        column,
+                        (self.parent.type != b"CAL" and item.startswith(b"RGB_"))
+                        or item.startswith(b"CMYK_"),
+                    ),
+                )
+            else:
+                if self.root.normalize_fields and item.upper() == b"SAMPLENAME":
+                    item = b"SAMPLE_NAME"
+                column = list(values)
+            columns[item.decode()] = column
+        if vmaxlen > self.vmaxlen:
+            self.vmaxlen = vmaxlen
+        dict.update(self, dict.fromkeys(range(len(rows)), LAZY_SAMPLE))
+        self._columns = columns
+        self._discard_index()
+        self.setmodified()
+        return True
+
+    def column(self, name):
+        """Return the values of field name of all DATA samples as array.
+
+        If the values are kept in a numeric column, a read-only view of the
+        column is returned (no copy).
+
+        """
+        if self.type != b"DATA":
+            raise CGATSInvalidOperationError("Cannot get column of %s" % self.type)
+        column = (self._columns or {}).get(name)
+        if isinstance(column, numpy.ndarray):
+            column = column.view()
+            column.flags.writeable = False
+            return column
+        elif column is not None:
+            return numpy.asarray(column)
+        values = []
+        for sample in dict.values(self):
+            if sample is LAZY_SAMPLE or name not in sample:
+                raise CGATSKeyError(name)
+            values.append(dict.__getitem__(sample, name))
+        return numpy.asarray(values)
+
+    def columns(self, names):
+        """Return the values of fields names of all DATA samples as array of
+        shape (number of samples, number of names).
+
+        """
+        return numpy.stack([self.column(name) for name in names], axis=-1)
+
+    def set_column(self, name, values):
+        """Set field name of all DATA samples from a sequence of values"""
+        if self.type != b"DATA":
+            raise CGATSInvalidOperationError("Cannot set column of %s" % self.type)
+        values = numpy.asarray(values)
+        if values.shape != (len(self),):
+            raise CGATSValueError(
+                "Expected %i values for %s, got array of shape %r"
+                % (len(self), name, values.shape)
+            )
+        if self._columns is None:
+            for sample, value in zip(dict.values(self), values.tolist()):
+                sample[name] = value
+            return
+        if values.dtype.kind == "f":
+            column = values.astype(numpy.float64)
+        elif values.dtype.kind in "iu":
+            column = values.astype(numpy.int64)
+        else:
+            column = values.tolist()
+        self._columns[name] = column
+        self._shared_columns = self._shared_columns - {name}
+        if isinstance(column, numpy.ndarray):
+            values = column.tolist()
+        else:
+            values = column
+        for key, sample in dict.items(self):
+            if sample is not LAZY_SAMPLE:
+                dict.__setitem__(sample, name, values[key])
+                object.__setattr__(sample, "_index", None)
+        self._discard_index()
+        self.setmodified()
+
+    def set_columns(self, names, values):
+        """Set fields names of all DATA samples from an array of shape
+        (number of samples, number of names).
+
+        """
+        values = numpy.asarray(values)
+        if values.shape != (len(self), len(names)):
+            raise CGATSValueError(
+                "Expected %i x %i values, got array of shape %r"
+                % (len(self), len(names), values.shape)
+            )
+        for i, name in enumerate(names):
+            self.set_column(name, values[:, i])
+
+    def _has_fields(self, names):
+        """Return whether all DATA samples (and at least one) have fields names"""
+        if not len(self):
+            return False
+        names = [name for name in names if name not in (self._columns or ())]
+        if not names:
+            return True
+        for sample in dict.values(self):
+            # Samples not created yet only have the column fields
+            if sample is LAZY_SAMPLE or any(name not in sample for name in names):
+                return False
+        return True
+
     def export_3d(
         self,
         filename,
@@ -1807,7 +2450,17 @@ Transform {
             if not isinstance(query, (list, tuple)):
                 query = (query,)
 
-        items = [self] + [self[key] for key in self]
+        index = self._get_index()
+        if index is not None and not index[0].issuperset(query):
+            # No item can match
+            items = []
+        elif self._columns is not None:
+            keys = self._get_query_keys(query, query_value)
+            items = [self] + [self[key] for key in keys]
+        else:
+            items = [self] + [self[key] for key in self]
+        # Values of result, to skip duplicates from items below self
+        result_values = None
         for item in items:
             if isinstance(item, (dict, list, tuple)):
 
@@ -1864,23 +2517,68 @@ Transform {
                                 result[n] = result_n[0]
                             else:
                                 result[n] = result_n
+                            if result_values is not None:
+                                result_values.add(result[n])
 
                 if isinstance(item, CGATS) and item != self:
+                    item_index = item._get_index()
+                    if item_index is not None and (
+                        item_index[1] or not item_index[0].issuperset(query)
+                    ):
+                        # Nothing below item can match. If item is a leaf,
+                        # its query result is item itself, which was already
+                        # matched above
+                        continue
                     result_n = item.query(query, query_value, get_value, get_first)
                     if result_n is not None:
                         if get_first:
                             result = result_n
                             break
                         elif len(result_n):
+                            if result_values is None:
+                                result_values = _QueryResultValues(dict.values(result))
                             for i in result_n:
-                                n = len(result)
-                                if result_n[i] not in list(result.values()):
-                                    result[n] = result_n[i]
+                                value = result_n[i]
+                                if value not in result_values:
+                                    result[len(result)] = value
+                                    result_values.add(value)
 
         if isinstance(result, CGATS):
             result.setmodified(modified)
         return result
 
+    def _get_query_keys(self, query, query_value=None):
+        """Return the keys of DATA samples that may match query.
+
+        Samples that are only stored in columns are matched against the
+        columns, so sample objects need to be created only for matches.
+
+        """
+        mask = numpy.ones(len(self), dtype=bool)
+        for query_key in query:
+            if str(query_key).upper() in ("INDEX", "SAMPLE_ID", "SAMPLEID"):
+                # May be derived from the sample key, see __getitem__
+                return list(self)
+            column = self._columns.get(query_key)
+            if column is None:
+                mask[:] = False
+                break
+            if query_value is None and isinstance(query, dict):
+                value = query[query_key]
+            else:
+                value = query_value
+            if value is None:
+                continue
+            if isinstance(column, numpy.ndarray) and isinstance(value, (int, float)):
+                mask &= column == value
+            else:
+                mask &= [not v != value for v in column]
+        return [
+            key
+            for key, sample in dict.items(self)
+            if sample is not LAZY_SAMPLE or mask[key]
+        ]
+
     def queryi(self, query, query_value=None):
         """Query and return matching items. See also query method."""
         return self.query(query, query_value, get_value=False, get_first=False)
@@ -1903,12 +2601,14 @@ Transform {
             key = item.key
         else:
             key = item
+        self._create_samples(True)
         maxindex = len(self) - 1
         result = self[key]
         if type(key) == int and key != maxindex:
             self.moveby1(key + 1, -1)
         name = len(self) - 1
         dict.pop(self, name)
+        self._discard_index()
         self.setmodified()
         return result
 
@@ -1959,12 +2659,8 @@ Transform {
                 data.parent.DATA_FORMAT.add_data((label,))
 
         # Add L*a*b* to each sample
-        for _key in data:
-            sample = data[_key]
-            cie_values = [sample[label.decode("utf-8")] for label in cie_labels]
-            Lab = colormath.XYZ2Lab(*cie_values)
-            for i, label in enumerate(Lab_data_format):
-                sample[label] = Lab[i]
+        XYZ = data.columns([label.decode("utf-8") for label in cie_labels])
+        data.set_columns(Lab_data_format, colormath.np.XYZ2Lab(XYZ))
 
     def fix_zero_measurements(self, warn_only=False, logfile=safe_print):
         """Fix (or warn about) <= zero measurements
@@ -2111,10 +2807,10 @@ Transform {
                         "%.4f %.4f %.4f"
                         % (white_cie["XYZ_X"], white_cie["XYZ_Y"], white_cie["XYZ_Z"]),
                     )
-                    for sample in self.DATA.values():
-                        for label in "XYZ":
-                            v = sample["XYZ_" + label]
-                            sample["XYZ_" + label] = v / white_Y * 100
+                    labels = ("XYZ_X", "XYZ_Y", "XYZ_Z")
+                    self.DATA.set_columns(
+                        labels, self.DATA.columns(labels) / white_Y * 100
+                    )
                 self.add_keyword("NORMALIZED_TO_Y_100", "YES")
                 return True
         return False
@@ -2164,24 +2860,24 @@ Transform {
                 whitepoint_source = dataset.get_white_cie("XYZ")
             if whitepoint_source:
                 sections += 1
-                for item in dataset.queryv1("DATA").values():
-                    if "XYZ_X" in item:
-                        X, Y, Z = item["XYZ_X"], item["XYZ_Y"], item["XYZ_Z"]
-                    else:
-                        X, Y, Z = colormath.Lab2XYZ(
-                            item["LAB_L"], item["LAB_A"], item["LAB_B"], scale=100
-                        )
-                    X, Y, Z = colormath.adapt(
-                        X, Y, Z, whitepoint_source, whitepoint_destination, cat
-                    )
-                    if "LAB_L" in item:
-                        (
-                            item["LAB_L"],
-                            item["LAB_A"],
-                            item["LAB_B"],
-                        ) = colormath.XYZ2Lab(X, Y, Z)
-                    if "XYZ_X" in item:
-                        item["XYZ_X"], item["XYZ_Y"], item["XYZ_Z"] = X, Y, Z
+                data = dataset.queryv1("DATA")
+                XYZ_labels = ("XYZ_X", "XYZ_Y", "XYZ_Z")
+                Lab_labels = ("LAB_L", "LAB_A", "LAB_B")
+                has_XYZ = data._has_fields(XYZ_labels)
+                has_Lab = data._has_fields(Lab_labels)
+                if has_XYZ:
+                    XYZ = data.columns(XYZ_labels)
+                elif has_Lab:
+                    XYZ = colormath.np.Lab2XYZ(data.columns(Lab_labels), scale=100)
+                else:
+                    continue
+                XYZ = colormath.np.adapt(
+                    XYZ, whitepoint_source, whitepoint_destination, cat
+                )
+                if has_Lab:
+                    data.set_columns(Lab_labels, colormath.np.XYZ2Lab(XYZ))
+                if has_XYZ:
+                    data.set_columns(XYZ_labels, XYZ)
         return sections
 
     def apply_bpc(self, bp_out=(0, 0, 0), weight=False):
@@ -2196,24 +2892,25 @@ Transform {
         """
         n = 0
         for dataset in self.query("DATA").values():
+            data = dataset.queryv1("DATA")
             if dataset.type.strip() == b"CAL":
                 is_Lab = False
                 labels = ("RGB_R", "RGB_G", "RGB_B")
-                data = dataset.queryi(labels)
+                if not data._has_fields(labels + ("RGB_I",)):
+                    # Can't apply bpc
+                    continue
+                values = data.columns(labels)
 
                 # Get black
-                black1 = data.queryi1({"RGB_I": 0})
+                black1 = numpy.flatnonzero(data.column("RGB_I") == 0)
                 # Get white
-                white1 = data.queryi1({"RGB_I": 1})
-                if not black1 or not white1:
+                white1 = numpy.flatnonzero(data.column("RGB_I") == 1)
+                if not len(black1) or not len(white1):
                     # Can't apply bpc
                     continue
 
-                black = []
-                white = []
-                for label in labels:
-                    black.append(black1[label])
-                    white.append(white1[label])
+                black = values[black1[0]].tolist()
+                white = values[white1[0]].tolist()
                 max_v = 1.0
             else:
                 is_Lab = b"_LAB" in (dataset.queryv1("COLOR_REP") or b"")
@@ -2223,29 +2920,35 @@ Transform {
                 else:
                     labels = ("XYZ_X", "XYZ_Y", "XYZ_Z")
                     index = 1  # Index of Y in labels
-                data = dataset.queryi(("RGB_R", "RGB_G", "RGB_B") + labels)
+                device_labels = ("RGB_R", "RGB_G", "RGB_B")
+                if not data._has_fields(device_labels + labels):
+                    # Can't apply bpc
+                    continue
+                RGB = data.columns(device_labels)
+                values = data.columns(labels)
 
                 # Get blacks
-                blacks = data.queryi({"RGB_R": 0, "RGB_G": 0, "RGB_B": 0})
+                blacks = values[(RGB == 0).all(axis=-1)]
                 # Get whites
-                whites = data.queryi({"RGB_R": 100, "RGB_G": 100, "RGB_B": 100})
-                if not blacks or not whites:
+                whites = values[(RGB == 100).all(axis=-1)]
+                if not len(blacks) or not len(whites):
                     # Can't apply bpc
                     continue
 
+                # Use the first of the brightest blacks and whites
                 black = [0, 0, 0]
-                for i in blacks:
-                    if blacks[i][labels[index]] > black[index]:
-                        for j, label in enumerate(labels):
-                            black[j] = blacks[i][label]
+                white = [0, 0, 0]
+                for patch, patches in ((black, blacks), (white, whites)):
+                    brightest = patches[:, index] > patch[index]
+                    if brightest.any():
+                        patch[:] = patches[
+                            numpy.argmax(
+                                numpy.where(brightest, patches[:, index], -numpy.inf)
+                            )
+                        ].tolist()
                 if is_Lab:
                     black = colormath.Lab2XYZ(*black)
 
-                white = [0, 0, 0]
-                for i in whites:
-                    if whites[i][labels[index]] > white[index]:
-                        for j, label in enumerate(labels):
-                            white[j] = whites[i][label]
                 if is_Lab:
                     max_v = 100.0
                     white = colormath.Lab2XYZ(*white)
@@ -2256,28 +2959,21 @@ Transform {
 
             # Apply black point compensation
             n += 1
-            for i in data:
-                values = list(data[i].queryv1(labels).values())
-                if is_Lab:
-                    values = colormath.Lab2XYZ(*values)
-                else:
-                    values = [v / max_v for v in values]
-                if weight:
-                    values = colormath.apply_bpc(
-                        values[0], values[1], values[2], black, bp_out, white, weight
-                    )
-                else:
-                    values = colormath.blend_blackpoint(
-                        values[0], values[1], values[2], black, bp_out, white
-                    )
-                values = [v * max_v for v in values]
-                if is_Lab:
-                    values = colormath.XYZ2Lab(*values)
-                for j, label in enumerate(labels):
-                    if is_Lab and j > 0:
-                        data[i][label] = values[j]
-                    else:
-                        data[i][label] = max(0.0, values[j])
+            if is_Lab:
+                values = colormath.np.Lab2XYZ(values)
+            else:
+                values = values / max_v
+            if weight:
+                values = colormath.np.apply_bpc(values, black, bp_out, white, weight)
+            else:
+                values = colormath.np.blend_blackpoint(values, black, bp_out, white)
+            values = values * max_v
+            if is_Lab:
+                values = colormath.np.XYZ2Lab(values)
+                values[:, 0] = numpy.where(values[:, 0] > 0, values[:, 0], 0.0)
+            else:
+                values = numpy.where(values > 0, values, 0.0)
+            data.set_columns(labels, values)
         return n
 
     def get_white_cie(self, colorspace=None):
@@ -9,12 +9,14 @@ import pathlib
 import re
 import struct
 import sys
+import threading
 import warnings
-from collections import UserString
+from collections import OrderedDict, UserString
 from copy import copy
 from hashlib import md5
 from time import strftime
-from weakref import WeakValueDictionary
+
+import numpy
 
 from DisplayCAL.util_dict import dict_sort
 
@@ -418,6 +420,22 @@ ciis = {
 }
 
 
+def PCSLab_dec_to_uInt16(L, a, b):
+    # ICCv4 PCS L*a*b* encoding
+    return [
+        v * (655.35, 257, 257)[i] + (0, 32896, 32896)[i]
+        for i, v in enumerate((L, a, b))
+    ]
+
+
+def PCSLab_uInt16_to_dec(L_uInt16, a_uInt16, b_uInt16):
+    # ICCv4 PCS L*a*b* encoding
+    return [
+        (v - (0, 32896, 32896)[i]) / (655.35, 257.0, 257.0)[i]
+        for i, v in enumerate((L_uInt16, a_uInt16, b_uInt16))
+    ]
+
+
 def legacy_PCSLab_dec_to_uInt16(L, a, b):
     # ICCv2 (legacy) PCS L*a*b* encoding
     # Only used by LUT16Type and namedColor2Type in ICCv4
@@ -1291,20 +1309,21 @@ def create_synthetic_hdr_clut_profile(
             num_workers -= 1
         num_batches = clutres // 6
 
-        HDR_XYZ = sum(
-            pool_slice(
-                _mp_hdr_tonemap,
-                HDR_XYZ,
-                (rgb_space, maxv, sat, cat),
-                {},
-                num_workers,
-                worker and worker.thread_abort,
-                logfile,
-                num_batches,
-                perc,
-            ),
-            [],
-        )
+        HDR_XYZ_in = HDR_XYZ
+        HDR_XYZ = []
+        for slices in pool_slice(
+            _mp_hdr_tonemap,
+            HDR_XYZ_in,
+            (rgb_space, maxv, sat, cat),
+            {},
+            num_workers,
+            worker and worker.thread_abort,
+            logfile,
+            num_batches,
+            perc,
+        ):
+            HDR_XYZ.extend(slices)
+        del HDR_XYZ_in
         prevperc = startperc = perc = 75
     else:
         prevperc = startperc = perc = 50
@@ -2545,15 +2564,6 @@ def unset_display_profile(
         return False
 
 
-def _blend_blackpoint(row, bp_in, bp_out, wp=None, use_bpc=False, weight=False):
-    X, Y, Z = row
-    if use_bpc:
-        X, Y, Z = colormath.apply_bpc(X, Y, Z, bp_in, bp_out, wp, weight=weight)
-    else:
-        X, Y, Z = colormath.blend_blackpoint(X, Y, Z, bp_in, bp_out, wp)
-    return X, Y, Z
-
-
 def _mp_apply(
     blocks,
     thread_abort_event,
@@ -2621,40 +2631,6 @@ def _mp_apply(
     return blocks
 
 
-def _mp_apply_black(
-    blocks,
-    thread_abort_event,
-    progress_queue,
-    pcs,
-    bp,
-    bp_out,
-    wp,
-    use_bpc,
-    weight,
-    D50,
-    interp,
-    rinterp,
-    abortmessage="Aborted",
-):
-    """Worker for applying black point compensation or offset
-
-    This should be spawned as a multiprocessing process
-
-    """
-    return _mp_apply(
-        blocks,
-        thread_abort_event,
-        progress_queue,
-        pcs,
-        _blend_blackpoint,
-        (bp, bp_out, wp if use_bpc else None, use_bpc, weight),
-        D50,
-        interp,
-        rinterp,
-        abortmessage,
-    )
-
-
 def _mp_hdr_tonemap(
     HDR_XYZ, thread_abort_event, progress_queue, rgb_space, maxv, sat, cat="Bradford"
 ):
@@ -2789,23 +2765,11 @@ def dateTimeNumber(binary_string):
 
     :param binary_string: A 12 character long bytes value representing a datetime value.
     """
-    Y, m, d, H, M, S = [
-        uInt16Number(chunk)
-        for chunk in (
-            binary_string[:2],
-            binary_string[2:4],
-            binary_string[4:6],
-            binary_string[6:8],
-            binary_string[8:10],
-            binary_string[10:12],
-        )
-    ]
-    return datetime.datetime(*(Y, m, d, H, M, S))
+    return datetime.datetime(*struct.unpack(">6H", binary_string[:12]))
 
 
 def dateTimeNumber_tohex(dt):
-    data = [uInt16Number_tohex(n) for n in dt.timetuple()[:6]]
-    return b"".join(data)
+    return struct.pack(">6H", *dt.timetuple()[:6])
 
 
 def s15Fixed16Number(binaryString):
@@ -2816,6 +2780,16 @@ def s15Fixed16Number_tohex(num):
     return struct.pack(">i", int(round(num * 65536)))
 
 
+def s15Fixed16Number_array(binaryString, count=-1):
+    """Decode big-endian s15Fixed16Number bytes to an array of floats"""
+    return numpy.frombuffer(binaryString, ">i4", count) / 65536.0
+
+
+def s15Fixed16Number_array_tohex(values):
+    """Encode a sequence or array of numbers as s15Fixed16Number bytes"""
+    return _number_array_tohex(values, ">i4", "i", 65536)
+
+
 def s15f16_is_equal(
     a, b, quantizer=lambda v: s15Fixed16Number(s15Fixed16Number_tohex(v))
 ):
@@ -2830,6 +2804,11 @@ def u16Fixed16Number_tohex(num):
     return struct.pack(">I", int(round(num * 65536)) & 0xFFFFFFFF)
 
 
+def u16Fixed16Number_array(binaryString, count=-1):
+    """Decode big-endian u16Fixed16Number bytes to an array of floats"""
+    return numpy.frombuffer(binaryString, ">u4", count) / 65536.0
+
+
 def u8Fixed8Number(binaryString):
     return struct.unpack(">H", binaryString)[0] / 256.0
 
@@ -2846,6 +2825,25 @@ def uInt16Number_tohex(num):
     return struct.pack(">H", int(round(num)))
 
 
+def uInt16Number_array(binaryString, count=-1):
+    """Decode big-endian uInt16Number bytes to an array
+
+    The array is a read-only view of binaryString.
+
+    """
+    return numpy.frombuffer(binaryString, ">u2", count)
+
+
+def uInt16Number_array_tohex(values):
+    """Encode a sequence or array of numbers as big-endian uInt16Number bytes
+
+    Rounds like uInt16Number_tohex and raises struct.error for values that
+    are out of range.
+
+    """
+    return _number_array_tohex(values, ">u2", "H")
+
+
 def uInt32Number(binaryString):
     return struct.unpack(">I", binaryString)[0]
 
@@ -2858,6 +2856,20 @@ def uInt32Number_tohex(num):
         raise e
 
 
+def uInt32Number_array(binaryString, count=-1):
+    """Decode big-endian uInt32Number bytes to an array
+
+    The array is a read-only view of binaryString.
+
+    """
+    return numpy.frombuffer(binaryString, ">u4", count)
+
+
+def uInt32Number_array_tohex(values):
+    """Encode a sequence or array of numbers as big-endian uInt32Number bytes"""
+    return _number_array_tohex(values, ">u4", "I")
+
+
 def uInt64Number(binaryString):
     return struct.unpack(">Q", binaryString)[0]
 
@@ -2866,6 +2878,20 @@ def uInt64Number_tohex(num):
     return struct.pack(">Q", int(round(num)))
 
 
+def uInt64Number_array(binaryString, count=-1):
+    """Decode big-endian uInt64Number bytes to an array
+
+    The array is a read-only view of binaryString.
+
+    """
+    return numpy.frombuffer(binaryString, ">u8", count)
+
+
+def uInt64Number_array_tohex(values):
+    """Encode a sequence or array of numbers as big-endian uInt64Number bytes"""
+    return _number_array_tohex(values, ">u8", "Q")
+
+
 def uInt8Number(binaryString):
     return struct.unpack(">H", b"\0" + binaryString)[0]
 
@@ -2874,6 +2900,44 @@ def uInt8Number_tohex(num):
     return struct.pack(">H", int(round(num)))[1:2]
 
 
+def uInt8Number_array(binaryString, count=-1):
+    """Decode uInt8Number bytes to an array
+
+    The array is a read-only view of binaryString.
+
+    """
+    return numpy.frombuffer(binaryString, "u1", count)
+
+
+def uInt8Number_array_tohex(values):
+    """Encode a sequence or array of numbers as uInt8Number bytes"""
+    return _number_array_tohex(values, "u1", "B")
+
+
+def _number_array_tohex(values, dtype, fmt, scale=1):
+    """Encode a sequence or array of numbers as bytes of integer dtype
+
+    Values are multiplied by scale and rounded like the single value
+    encoders. Raises struct.error for values that are out of range.
+
+    """
+    values = numpy.asarray(values)
+    dtype = numpy.dtype(dtype)
+    if values.dtype.kind in "iu" and scale == 1:
+        # Integers need no rounding (and may not be exactly representable as
+        # double precision floating point)
+        values = values.astype(numpy.int64 if values.dtype.kind == "i" else dtype)
+    else:
+        values = numpy.multiply(values, scale, dtype=numpy.float64)
+        numpy.rint(values, out=values)
+    info = numpy.iinfo(dtype)
+    if values.size and not (info.min <= values.min() and values.max() <= info.max):
+        raise struct.error(
+            "'%s' format requires %i <= number <= %i" % (fmt, info.min, info.max)
+        )
+    return values.astype(dtype).tobytes()
+
+
 def videoCardGamma(tagData, tagSignature):
     # reserved = uInt32Number(tagData[4:8])
     tagType = uInt32Number(tagData[8:12])
@@ -2919,6 +2983,116 @@ class CRInterpolation(object):
         )
 
 
+def _interp_clut(clut, values, interpolation="tetrahedral"):
+    """Interpolate cLUT array of shape (<grid steps>, ...) * <input channels> +
+    (<output channels>,) at values of shape (..., <input channels>) in the
+    range 0..1. The number of grid steps may differ per input channel.
+
+    interpolation can be "tetrahedral" (simplex, the n-dimensional equivalent
+    of tetrahedral interpolation) or "trilinear" (multilinear).
+
+    """
+    clut = numpy.asarray(clut, dtype=numpy.float64)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    i = clut.ndim - 1
+    g = numpy.array(clut.shape[:-1])
+    flat = clut.reshape(-1, clut.shape[-1])
+    strides = numpy.cumprod(numpy.append(1, g[:0:-1]))[::-1]
+    x = numpy.clip(values, 0, 1) * (g - 1)
+    base = numpy.minimum(numpy.floor(x), numpy.maximum(g - 2, 0)).astype(numpy.intp)
+    frac = x - base
+    index = numpy.sum(base * strides, axis=-1)
+    if interpolation == "tetrahedral":
+        # Walk from the base vertex along the edges of the simplex containing
+        # the value, in order of descending fractional coordinates
+        order = numpy.argsort(-frac, axis=-1, kind="stable")
+        frac = numpy.take_along_axis(frac, order, axis=-1)
+        result = (1 - frac[..., :1]) * flat[index]
+        for j in range(i):
+            index = index + strides[order[..., j]]
+            weight = frac[..., j] - (frac[..., j + 1] if j < i - 1 else 0)
+            result += weight[..., numpy.newaxis] * flat[index]
+    elif interpolation == "trilinear":
+        result = 0
+        for corner in numpy.ndindex(*(2,) * i):
+            weight = numpy.prod(
+                numpy.where(corner, frac, 1 - frac), axis=-1, keepdims=True
+            )
+            result = result + weight * flat[index + numpy.dot(corner, strides)]
+    else:
+        raise ValueError("Unknown interpolation %r" % interpolation)
+    return result
+
+
+def _interp_curves(curves, values):
+    """Apply 1D curves (array of shape (<channels>, <entries>)) to values
+    (shape (..., <channels>)) in the range 0..1"""
+    values = numpy.asarray(values, dtype=numpy.float64)
+    xp = numpy.linspace(0, 1, curves.shape[-1])
+    return numpy.stack(
+        [numpy.interp(values[..., j], xp, curve) for j, curve in enumerate(curves)],
+        axis=-1,
+    )
+
+
+def _smooth_rows(values, window, protect=None):
+    """Smooth values along the last axis like colormath.smooth_avg (one pass)
+
+    The first and last value of each row, and values where the boolean
+    array protect is True, are left unchanged.
+
+    """
+    window = numpy.asarray(window, dtype=numpy.float64)
+    window = window / window.sum()
+    count = values.shape[-1]
+    extend = int(math.ceil(len(window) / 2.0))
+    half = (len(window) - 1) // 2
+    pad = [(0, 0)] * (values.ndim - 1) + [(extend, extend)]
+    padded = numpy.pad(values, pad, mode="edge")
+    smoothed = numpy.zeros(values.shape)
+    for m, weight in enumerate(window):
+        start = extend + half - m
+        smoothed += weight * padded[..., start : start + count]
+    smoothed[..., 0] = values[..., 0]
+    smoothed[..., -1] = values[..., -1]
+    if protect is not None:
+        smoothed = numpy.where(protect, values, smoothed)
+    return smoothed
+
+
+def _trc_lookup(trc, values):
+    """Apply CurveType or ParametricCurveType to values in the range 0..1"""
+    values = numpy.clip(numpy.asarray(values, dtype=numpy.float64), 0, 1)
+    if isinstance(trc, ParametricCurveType):
+        params = trc.params
+        g = params["g"]
+        if len(params) == 1:
+            result = values**g
+        elif len(params) in (3, 4):
+            a, b = params["a"], params["b"]
+            result = numpy.where(
+                values >= -b / a,
+                numpy.maximum(a * values + b, 0) ** g + params.get("c", 0),
+                params.get("c", 0),
+            )
+        elif len(params) in (5, 7):
+            a, b, c, d = params["a"], params["b"], params["c"], params["d"]
+            result = numpy.where(
+                values >= d,
+                numpy.maximum(a * values + b, 0) ** g + params.get("e", 0),
+                c * values + params.get("f", 0),
+            )
+        else:
+            raise NotImplementedError("Invalid number of parameters: %i" % len(params))
+        return numpy.clip(result, 0, 1)
+    if len(trc) == 1:
+        # Gamma
+        return values ** trc[0]
+    return numpy.interp(
+        values, numpy.linspace(0, 1, len(trc)), numpy.asarray(trc) / 65535.0
+    )
+
+
 class ADict(dict):
     """Convenience class for dictionary key access via attributes.
 
@@ -2963,7 +3137,9 @@ class LazyLoadTagAODict(AODict):
             return tag
         # Load and parse tag data
         tagSignature = key
-        typeSignature, tagDataOffset, tagDataSize, tagData = tag
+        typeSignature, tagDataOffset, tagDataSize, tagData = (
+            self.profile._get_tag_data_tuple(tagSignature)
+        )
         try:
             if tagSignature in tagSignature2Tag:
                 tag = tagSignature2Tag[tagSignature](tagData, tagSignature)
@@ -2973,7 +3149,15 @@ class LazyLoadTagAODict(AODict):
                     args += (self.profile.connectionColorSpace,)
                     if typeSignature == b"ncl2":
                         args += (self.profile.colorSpace,)
-                elif typeSignature in (b"XYZ ", b"mft2", b"curv", b"MS10", b"pseq"):
+                elif typeSignature in (
+                    b"XYZ ",
+                    b"mAB ",
+                    b"mBA ",
+                    b"mft2",
+                    b"curv",
+                    b"MS10",
+                    b"pseq",
+                ):
                     args += (self.profile,)
                 tag = typeSignature2Type[typeSignature](*args)
             else:
@@ -3003,8 +3187,23 @@ class ICCProfileTag(object):
         self.tagData = tagData
         self.tagSignature = tagSignature
 
+    def _get_version(self):
+        """Return the version of the tag contents.
+
+        The version changes whenever the tag is modified, so tag data that was
+        serialized for the same version is reused. Return None if changes are
+        not tracked (the tag data is then serialized each time it is needed).
+
+        """
+        return None
+
     def __setattr__(self, name, value):
-        if not isinstance(self, dict) or name in ("_keys", "tagData", "tagSignature"):
+        if not isinstance(self, dict) or name in (
+            "_encoded",
+            "_keys",
+            "tagData",
+            "tagSignature",
+        ):
             object.__setattr__(self, name, value)
         else:
             self[name] = value
@@ -3144,6 +3343,21 @@ class Illuminant(ADict):
 
 
 class LUT16Type(ICCProfileTag):
+    """lut16Type
+
+    The input curves, cLUT and output curves are available both as numpy
+    arrays (input_array, clut_array, output_array), which are zero-copy views
+    of the tag data until modified, and as the legacy nested lists (input, clut,
+    output). The lists are built lazily from the arrays when first accessed and
+    from then on are the authoritative data (they may be modified in place)
+    until the respective array property is accessed again.
+
+    Arrays are stored read-only, so the tables can only be changed by
+    assignment. While no list is in use, changes are tracked and the encoded
+    tag data is reused until the next change.
+
+    """
+
     def __init__(self, tagData=None, tagSignature=None, profile=None):
         ICCProfileTag.__init__(self, tagData, tagSignature)
         self.profile = profile
@@ -3151,6 +3365,15 @@ class LUT16Type(ICCProfileTag):
         self._input = None
         self._clut = None
         self._output = None
+        self._input_array = None
+        self._clut_array = None
+        self._output_array = None
+        # Unmodified views of tagData
+        self._views = {}
+        # Bumped on every change of tables, matrix or tagData
+        self._version = 0
+        # (version, tag data) of the last encoding
+        self._encoded = None
         self._i = (tagData and uInt8Number(tagData[8:9])) or 0  # Input channel count
         self._o = (tagData and uInt8Number(tagData[9:10])) or 0  # Output channel count
         self._g = (tagData and uInt8Number(tagData[10:11])) or 0  # cLUT grid res
@@ -3188,22 +3411,23 @@ class LUT16Type(ICCProfileTag):
         thread_abort=None,
         abortmessage="Aborted",
     ):
+        # The whole cLUT is processed at once as (<entries>, <output channels>)
+        # array
         pcs = self.profile and self.profile.connectionColorSpace
-        bp_row = list(self.clut[0][0])
-        wp_row = list(self.clut[-1][-1])
+        clut_shape = self.clut_array.shape
+        clut = self.clut_array.reshape(-1, clut_shape[-1])
         nonzero_bp = tuple(bp_out) != (0, 0, 0)
-        interp = []
-        rinterp = []
+        orange = None
         if not use_bpc or nonzero_bp:
-            osize = len(self.output[0])
-            omaxv = osize - 1.0
-            orange = [i / omaxv * 65535 for i in range(osize)]
-            for i in range(3):
-                interp.append(colormath.Interp(orange, self.output[i]))
-                rinterp.append(colormath.Interp(self.output[i], orange))
-            for row in (bp_row, wp_row):
-                for column, value in enumerate(row):
-                    row[column] = interp[column](value)
+            output = self.output_array
+            osize = output.shape[-1]
+            orange = numpy.arange(osize) / (osize - 1.0) * 65535
+            clut = numpy.stack(
+                [numpy.interp(clut[:, i], orange, output[i]) for i in range(3)],
+                axis=-1,
+            )
+        bp_row = clut[0].tolist()
+        wp_row = clut[-1].tolist()
         if use_bpc:
             method = "apply_bpc"
         else:
@@ -3223,41 +3447,38 @@ class LUT16Type(ICCProfileTag):
         if [round(v * 32768) for v in bp] != [round(v * 32768) for v in bp_out]:
             D50 = colormath.get_whitepoint("D50")
 
-            from DisplayCAL.multiprocess import pool_slice
-
-            if len(self.clut[0]) < 33:
-                num_workers = 1
-            else:
-                num_workers = None
-
             # if pcs != "Lab" and nonzero_bp:
             # bp_out_offset = bp_out
             # bp_out = (0, 0, 0)
 
             if bp != bp_out:
-                self.clut = sum(
-                    pool_slice(
-                        _mp_apply_black,
-                        self.clut,
-                        (
-                            pcs,
-                            bp,
-                            bp_out,
-                            wp,
-                            use_bpc,
-                            weight,
-                            D50,
-                            interp,
-                            rinterp,
-                            abortmessage,
-                        ),
-                        {},
-                        num_workers,
-                        thread_abort,
-                        logfile,
-                    ),
-                    [],
-                )
+                if thread_abort and thread_abort.event.is_set():
+                    from DisplayCAL.debughelpers import Info
+
+                    raise Info(abortmessage)
+                if pcs == b"Lab":
+                    Lab = numpy.stack(legacy_PCSLab_uInt16_to_dec(*clut.T), axis=-1)
+                    XYZ = colormath.np.Lab2XYZ(Lab, D50)
+                else:
+                    XYZ = clut / 32768.0
+                if use_bpc:
+                    XYZ = colormath.np.apply_bpc(XYZ, bp, bp_out, wp, weight=weight)
+                else:
+                    XYZ = colormath.np.blend_blackpoint(XYZ, bp, bp_out)
+                if pcs == b"Lab":
+                    Lab = colormath.np.XYZ2Lab(XYZ, D50)
+                    clut = numpy.stack(legacy_PCSLab_dec_to_uInt16(*Lab.T), axis=-1)
+                    clut = numpy.clip(clut, 0, 65535)
+                else:
+                    clut = numpy.minimum(numpy.maximum(XYZ, 0) * 32768.0, 65535)
+                if orange is not None:
+                    clut = numpy.stack(
+                        [numpy.interp(clut[:, i], output[i], orange) for i in range(3)],
+                        axis=-1,
+                    )
+                self.clut_array = clut.reshape(clut_shape)
+                if logfile:
+                    logfile.write("\r100%")
 
         # if pcs != "Lab" and nonzero_bp:
         # # Apply black offset to output curves
@@ -3276,43 +3497,114 @@ class LUT16Type(ICCProfileTag):
         # out[2].append(v * 65535)
         # self.output = out
 
+    def _get_table_array(self, name, detach=True):
+        """Return input, cLUT or output table as array
+
+        If the legacy nested list has been materialized, it is converted back
+        to an array so changes made to it are preserved. If detach is True,
+        the list is dropped and the array becomes the authoritative data.
+
+        """
+        table = getattr(self, "_" + name)
+        if table is not None:
+            array = numpy.array(table, dtype=numpy.float64)
+            if not array.size:
+                array = numpy.empty((len(table), 0))
+            elif name == "clut":
+                # <grid steps> ** (<input channels> - 1) rows of <grid steps>
+                # columns of <output channels> values
+                rows, g, o = array.shape
+                i = 1
+                while g > 1 and g ** (i - 1) < rows:
+                    i += 1
+                array = array.reshape((g,) * i + (o,))
+            if not detach:
+                return array
+            array.flags.writeable = False
+            setattr(self, "_" + name, None)
+            setattr(self, "_%s_array" % name, array)
+            # The list may have been modified while in use
+            self._version += 1
+            return array
+        array = getattr(self, "_%s_array" % name)
+        if array is None:
+            i, o, g, n, m = self._i, self._o, self._g, self._n, self._m
+            if name == "input":
+                offset, shape = 52, (i, n)
+            elif name == "clut":
+                offset, shape = 52 + n * i * 2, (g,) * i + (o,)
+            else:
+                offset, shape = 52 + n * i * 2 + g**i * o * 2, (o, m)
+            if self._tagData and i:
+                count = int(numpy.prod(shape))
+                array = numpy.frombuffer(self._tagData, ">u2", count, offset)
+                array = array.reshape(shape)
+            else:
+                array = numpy.empty((0, 0), dtype=">u2")
+            self._views[name] = array
+            setattr(self, "_%s_array" % name, array)
+        return array
+
+    def _set_table_array(self, name, value):
+        # Store a read-only copy, so the array can't be changed in place
+        value = numpy.array(value)
+        value.flags.writeable = False
+        setattr(self, "_" + name, None)
+        setattr(self, "_%s_array" % name, value)
+        self._version += 1
+
+    def _get_table_list(self, name):
+        """Return input, cLUT or output table as (legacy) nested list"""
+        table = getattr(self, "_" + name)
+        if table is None:
+            array = self._get_table_array(name)
+            if name == "clut" and array.size:
+                array = array.reshape((-1,) + array.shape[-2:])
+            table = array.tolist()
+            setattr(self, "_" + name, table)
+            setattr(self, "_%s_array" % name, None)
+        return table
+
+    def _set_table_list(self, name, value):
+        setattr(self, "_%s_array" % name, None)
+        setattr(self, "_" + name, value)
+        self._version += 1
+
+    def _get_version(self):
+        if (self._input, self._clut, self._output) != (None,) * 3:
+            # Lists may be modified in place, changes can't be tracked
+            return None
+        if self._matrix is None:
+            return self._version
+        return self._version, tuple(tuple(row) for row in self._matrix)
+
     @property
     def clut(self):
-        if self._clut is None:
-            i, o, g, n = self._i, self._o, self._g, self._n
-            tagData = self._tagData
-            self._clut = [
-                [
-                    [
-                        uInt16Number(
-                            tagData[
-                                52
-                                + n * i * 2
-                                + o * 2 * (g * x + y)
-                                + z * 2 : 54
-                                + n * i * 2
-                                + o * 2 * (g * x + y)
-                                + z * 2
-                            ]
-                        )
-                        for z in range(o)
-                    ]
-                    for y in range(g)
-                ]
-                for x in range(int(g**i / g))
-            ]
-        return self._clut
+        """cLUT as list of <grid steps> ** (<input channels> - 1) rows with
+        <grid steps> columns of <output channels> values"""
+        return self._get_table_list("clut")
 
     @clut.setter
     def clut(self, value):
-        self._clut = value
+        self._set_table_list("clut", value)
+
+    @property
+    def clut_array(self):
+        """cLUT as array of shape (<grid steps>, ...) * <input channels> +
+        (<output channels>,)"""
+        return self._get_table_array("clut")
+
+    @clut_array.setter
+    def clut_array(self, value):
+        self._set_table_array("clut", value)
 
     def clut_writepng(self, stream_or_filename):
         """Write the cLUT as PNG image organized in <grid steps> * <grid steps>
         sized squares, ordered vertically"""
-        if len(self.clut[0][0]) != 3:
+        clut = self.clut_array
+        if clut.shape[-1] != 3:
             raise NotImplementedError("clut_writepng: output channels != 3")
-        imfile.write(self.clut, stream_or_filename)
+        imfile.write(clut.reshape((-1,) + clut.shape[-2:]), stream_or_filename)
 
     def clut_writecgats(self, stream_or_filename):
         """Write the cLUT as CGATS"""
@@ -3375,23 +3667,20 @@ BEGIN_DATA
 
     @property
     def input(self):
-        if self._input is None:
-            i, n = self._i, self._n
-            tagData = self._tagData
-            self._input = [
-                [
-                    uInt16Number(
-                        tagData[52 + n * 2 * z + y * 2 : 54 + n * 2 * z + y * 2]
-                    )
-                    for y in range(n)
-                ]
-                for z in range(i)
-            ]
-        return self._input
+        return self._get_table_list("input")
 
     @input.setter
     def input(self, value):
-        self._input = value
+        self._set_table_list("input", value)
+
+    @property
+    def input_array(self):
+        """Input curves as array of shape (<input channels>, <entries>)"""
+        return self._get_table_array("input")
+
+    @input_array.setter
+    def input_array(self, value):
+        self._set_table_array("input", value)
 
     @property
     def input_channels_count(self):
@@ -3420,6 +3709,27 @@ BEGIN_DATA
                 lut = dict_sort(lut)
                 channel[e] = list(lut.values())
 
+    def lookup(self, values, interpolation="tetrahedral"):
+        """Look up values of shape (..., <input channels>) in the range 0..1
+
+        Applies input curves, cLUT and output curves and returns the output
+        values as array of shape (..., <output channels>) in the range 0..1
+        (i.e. the encoded output values divided by 65535). The matrix is only
+        applied for XYZ input (B2A tables of XYZ PCS profiles).
+
+        """
+        values = numpy.clip(numpy.asarray(values, dtype=numpy.float64), 0, 1)
+        if (
+            self.tagSignature
+            and self.tagSignature.startswith("B2A")
+            and self.profile
+            and self.profile.connectionColorSpace == b"XYZ"
+        ):
+            values = numpy.clip(colormath.np.matmul(self.matrix, values), 0, 1)
+        values = _interp_curves(self.input_array / 65535.0, values)
+        values = _interp_clut(self.clut_array / 65535.0, values, interpolation)
+        return _interp_curves(self.output_array / 65535.0, values)
+
     def clut_row_apply_per_channel(
         self,
         indexes,
@@ -3526,36 +3836,24 @@ BEGIN_DATA
     @matrix.setter
     def matrix(self, value):
         self._matrix = value
+        self._version += 1
 
     @property
     def output(self):
-        if self._output is None:
-            i, o, g, n, m = self._i, self._o, self._g, self._n, self._m
-            tagData = self._tagData
-            self._output = [
-                [
-                    uInt16Number(
-                        tagData[
-                            52
-                            + n * i * 2
-                            + m * 2 * z
-                            + y * 2
-                            + g**i * o * 2 : 54
-                            + n * i * 2
-                            + m * 2 * z
-                            + y * 2
-                            + g**i * o * 2
-                        ]
-                    )
-                    for y in range(m)
-                ]
-                for z in range(o)
-            ]
-        return self._output
+        return self._get_table_list("output")
 
     @output.setter
     def output(self, value):
-        self._output = value
+        self._set_table_list("output", value)
+
+    @property
+    def output_array(self):
+        """Output curves as array of shape (<output channels>, <entries>)"""
+        return self._get_table_array("output")
+
+    @output_array.setter
+    def output_array(self, value):
+        self._set_table_array("output", value)
 
     @property
     def output_channels_count(self):
@@ -3568,7 +3866,16 @@ BEGIN_DATA
         return self._m or len(self.output[0])
 
     def smooth(self, diagpng=2, pcs=None, filename=None, logfile=None, debug_=0):
-        """Apply extra smoothing to the cLUT"""
+        """Apply extra smoothing to the cLUT
+
+        Each <grid steps> x <grid steps> plane of the cLUT is filtered with a
+        3x3 box filter (center weight 1.0, surround 2/3, corners 1/3), or a
+        "plus"-shaped filter where one channel is fully saturated. Dark
+        colors and the gray axis are left unchanged. If debug_ is 1 or 2,
+        the points that would be box or "plus" filtered are marked gray
+        instead of being smoothed.
+
+        """
         if not pcs:
             if self.profile:
                 pcs = self.profile.connectionColorSpace
@@ -3578,7 +3885,9 @@ BEGIN_DATA
         if not filename and self.profile:
             filename = self.profile.fileName
 
-        clutres = len(self.clut[0])
+        clut = numpy.array(self.clut_array, dtype=numpy.float64)
+        clutres = clut.shape[-2]
+        clut = clut.reshape((-1, clutres, clutres, clut.shape[-1]))
 
         sig = self.tagSignature or id(self)
 
@@ -3593,92 +3902,50 @@ BEGIN_DATA
 
         if logfile:
             logfile.write("Smoothing %s...\n" % sig)
-        # Create a list of <clutres> number of 2D grids, each one with a
-        # size of (width x height) <clutres> x <clutres>
-        grids = []
-        for i, block in enumerate(self.clut):
-            if i % clutres == 0:
-                grids.append([])
-            grids[-1].append([])
-            for RGB in block:
-                grids[-1][-1].append(RGB)
-        for i, grid in enumerate(grids):
-            for y in range(clutres):
-                for x in range(clutres):
-                    is_dark = sum(grid[y][x]) < 65535 * 0.03125 * 3
-                    if pcs == "XYZ":
-                        is_gray = x == y == i
-                    elif clutres // 2 != clutres / 2.0:
-                        # For CIELab cLUT, gray will only
-                        # fall on a cLUT point if uneven cLUT res
-                        is_gray = x == y == clutres // 2
-                    else:
-                        is_gray = False
-                    # print i, y, x, "%i %i %i" % tuple(v / 655.35 * 2.55 for v in grid[y][x]), is_dark, raw_input(is_gray) if is_gray else ''
-                    if is_dark or is_gray:
-                        # Don't smooth dark colors and gray axis
-                        continue
-                    RGB = [[v] for v in grid[y][x]]
-                    # Use either "plus"-shaped or box filter depending if one
-                    # channel is fully saturated
-                    if clutres - 1 in (y, x) or 0 in (x, y):
-                        # Filter with a "plus" (+) shape
-                        if pcs == "Lab" and i > clutres / 2.0:
-                            # Smoothing factor for L*a*b* -> RGB cLUT above 50%
-                            smooth = 0.25
-                        else:
-                            smooth = 0.5
-                        for j, c in enumerate((x, y)):
-                            # Omit corners and perpendicular axis
-                            if 0 < c < clutres - 1:
-                                for n in (-1, 1):
-                                    yi, xi = (y, y + n)[j], (x + n, x)[j]
-                                    if -1 < xi < clutres and -1 < yi < clutres:
-                                        RGBn = grid[yi][xi]
-                                        if debug_ == 2:
-                                            if i < clutres - 1 or grid[y][x] != [
-                                                16384,
-                                                16384,
-                                                16384,
-                                            ]:
-                                                grid[y][x] = [32768, 32768, 32768]
-                                            if x == y == clutres - 2:
-                                                RGBn[:] = [16384, 16384, 16384]
-                                        for k in range(3):
-                                            RGB[k].append(
-                                                RGBn[k] * smooth
-                                                + RGB[k][0] * (1 - smooth)
-                                            )
-                    else:
-                        # Box filter, 3x3
-                        # Center pixel weight = 1.0, surround = 2/3, corners = 1/3
-                        if debug_ == 1:
-                            grid[y][x] = [32768, 32768, 32768]
-                        for j in (0, 1):
-                            for n in (-1, 1):
-                                for yi, xi in [
-                                    ((y, y + n)[j], (x + n, x)[j]),
-                                    (y - n, (x + n, x - n)[j]),
-                                ]:
-                                    if -1 < xi < clutres and -1 < yi < clutres:
-                                        RGBn = grid[yi][xi]
-                                        if yi != y and xi != x:
-                                            smooth = 1 / 3.0
-                                        else:
-                                            smooth = 2 / 3.0
-                                        if debug_ == 1 and x == y == clutres - 2:
-                                            RGBn[:] = (v * (1 - smooth) for v in RGBn)
-                                        for k in range(3):
-                                            RGB[k].append(
-                                                RGBn[k] * smooth
-                                                + RGB[k][0] * (1 - smooth)
-                                            )
-                    if not debug_:
-                        grid[y][x] = [sum(v) / float(len(v)) for v in RGB]
-            for j, row in enumerate(grid):
-                self.clut[i * clutres + j] = [
-                    [min(v, 65535) for v in RGB] for RGB in row
-                ]
+
+        i, y, x = numpy.ogrid[: len(clut), :clutres, :clutres]
+        # Don't smooth dark colors and gray axis
+        skip = clut.sum(axis=-1) < 65535 * 0.03125 * 3
+        if pcs == "XYZ":
+            skip |= (x == y) & (y == i)
+        elif clutres // 2 != clutres / 2.0:
+            # For CIELab cLUT, gray will only
+            # fall on a cLUT point if uneven cLUT res
+            skip |= (x == clutres // 2) & (y == clutres // 2)
+        inner_x = (0 < x) & (x < clutres - 1)
+        inner_y = (0 < y) & (y < clutres - 1)
+        # Use either "plus"-shaped or box filter depending if one
+        # channel is fully saturated
+        plus = ~(inner_x & inner_y) & ~skip
+        box = inner_x & inner_y & ~skip
+        if debug_:
+            clut[..., :3][(box, plus)[debug_ == 2]] = 32768
+        else:
+            RGB = clut[..., :3]
+            padded = numpy.pad(RGB, ((0, 0), (1, 1), (1, 1), (0, 0)), mode="edge")
+            left, right = padded[:, 1:-1, :-2], padded[:, 1:-1, 2:]
+            up, down = padded[:, :-2, 1:-1], padded[:, 2:, 1:-1]
+            # Filter with a "plus" (+) shape, omitting corners and
+            # perpendicular axis
+            if pcs == "Lab":
+                # Smoothing factor for L*a*b* -> RGB cLUT above 50%
+                smooth = numpy.where(i > clutres / 2.0, 0.25, 0.5)[..., None]
+            else:
+                smooth = 0.5
+            count = 1 + 2 * (inner_x.astype(int) + inner_y)
+            neighbors = numpy.where(inner_x[..., None], left + right, 0)
+            neighbors += numpy.where(inner_y[..., None], up + down, 0)
+            total = RGB + neighbors * smooth
+            total += (count[..., None] - 1) * (1 - smooth) * RGB
+            smoothed = numpy.where(plus[..., None], total / count[..., None], RGB)
+            # Box filter, 3x3
+            # Center pixel weight = 1.0, surround = 2/3, corners = 1/3
+            # (separable [1, 2, 1] kernel, center adjusted)
+            kernel = padded[:, :, :-2] + 2 * padded[:, :, 1:-1] + padded[:, :, 2:]
+            kernel = kernel[:, :-2] + 2 * kernel[:, 1:-1] + kernel[:, 2:]
+            total = (kernel + 11 * RGB) / 27.0
+            clut[..., :3] = numpy.where(box[..., None], total, smoothed)
+        self.clut_array = numpy.minimum(clut, 65535).reshape(self.clut_array.shape)
 
         if diagpng and filename:
             self.clut_writepng(fname + ".%s.post.CLUT.smooth.png" % sig)
@@ -3691,7 +3958,12 @@ BEGIN_DATA
         logfile=None,
         window=(1 / 16.0, 1, 1 / 16.0),
     ):
-        """Apply extra smoothing to the cLUT"""
+        """Apply extra smoothing to the cLUT
+
+        The cLUT is smoothed along each of its axes in turn (see
+        colormath.smooth_avg), leaving black and the gray axis unchanged.
+
+        """
         if not pcs:
             if self.profile:
                 pcs = self.profile.connectionColorSpace
@@ -3701,7 +3973,12 @@ BEGIN_DATA
         if not filename and self.profile:
             filename = self.profile.fileName
 
-        clutres = len(self.clut[0])
+        clut = self.clut_array
+        if clut.ndim != 4:
+            raise NotImplementedError("input channels != 3")
+        clutres = clut.shape[0]
+        # Output channels first, so rows are contiguous
+        clut = numpy.moveaxis(clut, -1, 0).astype(numpy.float64)
 
         sig = self.tagSignature or id(self)
 
@@ -3717,6 +3994,7 @@ BEGIN_DATA
         if logfile:
             logfile.write("Smoothing %s...\n" % sig)
 
+        z, y, x = numpy.ogrid[:clutres, :clutres, :clutres]
         for i in range(3):
             state = ("original", "pass", "final")[i]
             if diagpng != 3 and i != 1:
@@ -3735,45 +4013,45 @@ BEGIN_DATA
                 if order:
                     if debug:
                         print("Shifting order to", channels)
-                    self.clut_shift_columns(order)
+                    # Alter slowest to fastest changing column
+                    order = (0,) + tuple(axis + 1 for axis in order)
+                    clut = numpy.ascontiguousarray(clut.transpose(order))
                 if i == 1 and j != 6:
                     if debug:
                         print("Smoothing")
-                    exclude = None
+                    # Protect black
+                    protect = (clut == 0).all(axis=0)
                     protect_gray_axis = True
                     if pcs == "Lab":
                         if clutres // 2 != clutres / 2.0:
                             # For CIELab cLUT, gray will only
                             # fall on a cLUT point if uneven cLUT res
                             if channels in ("RBG", "RGB"):
-                                exclude = [
-                                    ((clutres // 2 + 1) * (clutres - 1), col)
-                                    for col in range(clutres)
-                                ]
+                                protect |= (z * clutres + y) == (clutres // 2 + 1) * (
+                                    clutres - 1
+                                )
                                 protect_gray_axis = False
                             elif channels in ("BRG", "GRB"):
-                                exclude = [
-                                    ((clutres // 2) * clutres + y, clutres // 2)
-                                    for y in range(clutres)
-                                ]
+                                protect |= (z == clutres // 2) & (x == clutres // 2)
                                 protect_gray_axis = False
                         else:
                             protect_gray_axis = False
-                    self.clut_row_apply_per_channel(
-                        (0, 1, 2),
-                        colormath.smooth_avg,
-                        (),
-                        {"window": window},
-                        pcs,
-                        protect_gray_axis,
-                        exclude=exclude,
-                    )
+                    if protect_gray_axis:
+                        if pcs == "XYZ":
+                            gray = z
+                        else:
+                            # L*a*b*
+                            gray = clutres // 2
+                        protect |= (y == gray) & (x == gray)
+                    clut[:3] = _smooth_rows(clut[:3], window, protect)
                 if diagpng == 3 and filename and j != 6:
                     if debug:
                         print("Writing diagnostic PNG for", state, channels)
+                    self.clut_array = numpy.moveaxis(clut, 0, -1)
                     self.clut_writepng(
                         fname + ".%s.post.CLUT.%s.%s.png" % (sig, channels, state)
                     )
+        self.clut_array = numpy.ascontiguousarray(numpy.moveaxis(clut, 0, -1))
 
         if diagpng and filename:
             self.clut_writepng(fname + ".%s.post.CLUT.smooth.png" % sig)
@@ -3782,14 +4060,27 @@ BEGIN_DATA
     def tagData(self):
         """Return raw tag data."""
 
-        if (self._matrix, self._input, self._clut, self._output) == (None,) * 4:
+        if (self._matrix, self._input, self._clut, self._output) == (None,) * 4 and (
+            all(
+                getattr(self, "_%s_array" % name) is None
+                or getattr(self, "_%s_array" % name) is self._views.get(name)
+                for name in ("input", "clut", "output")
+            )
+        ):
             return self._tagData
+        version = self._get_version()
+        if self._encoded and version is not None and self._encoded[0] == version:
+            return self._encoded[1]
+        # Don't detach materialized lists, callers may still be holding them
+        input_array = self._get_table_array("input", False)
+        clut_array = self._get_table_array("clut", False)
+        output_array = self._get_table_array("output", False)
         tagData = [
             b"mft2",
             b"\0" * 4,
-            uInt8Number_tohex(len(self.input)),
-            uInt8Number_tohex(len(self.output)),
-            uInt8Number_tohex(len(self.clut and self.clut[0])),
+            uInt8Number_tohex(len(input_array)),
+            uInt8Number_tohex(len(output_array)),
+            uInt8Number_tohex(len(clut_array)),
             b"\0",
             s15Fixed16Number_tohex(self.matrix[0][0]),
             s15Fixed16Number_tohex(self.matrix[0][1]),
@@ -3800,21 +4091,255 @@ BEGIN_DATA
             s15Fixed16Number_tohex(self.matrix[2][0]),
             s15Fixed16Number_tohex(self.matrix[2][1]),
             s15Fixed16Number_tohex(self.matrix[2][2]),
-            uInt16Number_tohex(len(self.input and self.input[0])),
-            uInt16Number_tohex(len(self.output and self.output[0])),
+            uInt16Number_tohex(input_array.shape[-1] if input_array.size else 0),
+            uInt16Number_tohex(output_array.shape[-1] if output_array.size else 0),
+            uInt16Number_array_tohex(input_array),
+            uInt16Number_array_tohex(clut_array),
+            uInt16Number_array_tohex(output_array),
         ]
-        for entries in self.input:
-            tagData.extend(uInt16Number_tohex(v) for v in entries)
-        for block in self.clut:
-            for entries in block:
-                tagData.extend(uInt16Number_tohex(v) for v in entries)
-        for entries in self.output:
-            tagData.extend(uInt16Number_tohex(v) for v in entries)
+        tagData = b"".join(tagData)
+        if version is not None:
+            self._encoded = version, tagData
+        return tagData
+
+    @tagData.setter
+    def tagData(self, tagData):
+        self._tagData = tagData
+        self._version = getattr(self, "_version", 0) + 1
+
+
+def _curves_tohex(curves):
+    """Return tag data of a set of curves, each padded to 4-byte boundary"""
+    tagData = []
+    for curve in curves:
+        curveData = curve.tagData
+        tagData.append(curveData + b"\0" * (-len(curveData) % 4))
+    return b"".join(tagData)
+
+
+class LUTAToBType(ICCProfileTag):
+    """lutAToBType
+
+    Processing elements are parsed into a_curves, clut_array, m_curves,
+    matrix/offset and b_curves (in processing order). Curves are lists of
+    CurveType or ParametricCurveType (or None if absent), the cLUT is an array
+    of shape (<grid points>, ...) * <input channels> + (<output channels>,)
+    (a zero-copy view of the tag data until replaced) with clut_precision
+    bytes per value, the matrix is a Matrix3x3 with offset a list of three
+    values. All values are normalized to the range 0..1 for lookup.
+
+    The original tag data is returned as-is until an element is changed or
+    replaced.
+
+    """
+
+    typeSignature = b"mAB "
+    # Processing order of the elements
+    elements = ("a_curves", "clut_array", "m_curves", "matrix", "b_curves")
+
+    def __init__(self, tagData=None, tagSignature=None, profile=None):
+        ICCProfileTag.__init__(self, tagData, tagSignature)
+        self.profile = profile
+        self.a_curves = None
+        self.clut_array = None
+        self.clut_precision = 2
+        self.m_curves = None
+        self.matrix = None
+        self.offset = None
+        self.b_curves = None
+        if not tagData:
+            return
+        inputChannels = uInt8Number(tagData[8:9])
+        outputChannels = uInt8Number(tagData[9:10])
+        offsetB, offsetMatrix, offsetM, offsetCLUT, offsetA = uInt32Number_array(
+            tagData[12:32]
+        ).tolist()
+        if self.typeSignature == b"mAB ":
+            countA, countB = inputChannels, outputChannels
+        else:
+            countA, countB = outputChannels, inputChannels
+        if offsetB:
+            self.b_curves = self._parse_curves(tagData, offsetB, countB)
+        if offsetMatrix:
+            values = s15Fixed16Number_array(
+                tagData[offsetMatrix : offsetMatrix + 48]
+            ).tolist()
+            self.matrix = colormath.Matrix3x3([values[0:3], values[3:6], values[6:9]])
+            self.offset = values[9:12]
+        if offsetM:
+            self.m_curves = self._parse_curves(tagData, offsetM, countB)
+        if offsetCLUT:
+            grid = tuple(tagData[offsetCLUT : offsetCLUT + inputChannels])
+            self.clut_precision = tagData[offsetCLUT + 16]
+            dtype = {1: "u1", 2: ">u2"}.get(self.clut_precision)
+            if not dtype:
+                raise ValueError("Invalid cLUT precision %i" % self.clut_precision)
+            count = int(numpy.prod(grid)) * outputChannels
+            self.clut_array = numpy.frombuffer(
+                tagData, dtype, count, offsetCLUT + 20
+            ).reshape(grid + (outputChannels,))
+        if offsetA:
+            self.a_curves = self._parse_curves(tagData, offsetA, countA)
+        # The parsed elements, to detect changes (see _get_version)
+        self._parsed = self.clut_array, self._get_state()
+
+    def _get_state(self):
+        """Return a comparable state of the elements other than the cLUT"""
+        state = [self.typeSignature, self.clut_precision]
+        for name in ("a_curves", "m_curves", "b_curves"):
+            curves = getattr(self, name)
+            if curves is not None:
+                curves = tuple(
+                    (curve, curve._get_version() or curve.tagData) for curve in curves
+                )
+            state.append(curves)
+        if self.matrix is not None:
+            state.append(tuple(tuple(row) for row in self.matrix))
+        if self.offset is not None:
+            state.append(tuple(self.offset))
+        return state
+
+    def _get_version(self):
+        parsed = self._parsed
+        if parsed and parsed[0] is self.clut_array and parsed[1] == self._get_state():
+            # Unmodified, the version is the original tag data
+            return self._tagData
+        return None
+
+    def _parse_curves(self, tagData, offset, count):
+        curves = []
+        for _i in range(count):
+            typeSignature = tagData[offset : offset + 4]
+            if typeSignature == b"curv":
+                size = 12 + 2 * uInt32Number(tagData[offset + 8 : offset + 12])
+                curve = CurveType(tagData[offset : offset + size], profile=self.profile)
+            elif typeSignature == b"para":
+                fntype = uInt16Number(tagData[offset + 8 : offset + 10])
+                size = 12 + 4 * {0: 1, 1: 3, 2: 4, 3: 5, 4: 7}[fntype]
+                curve = ParametricCurveType(
+                    tagData[offset : offset + size], profile=self.profile
+                )
+            else:
+                raise ValueError("Invalid curve type %r" % typeSignature)
+            curves.append(curve)
+            # Curves are padded to 4-byte boundaries
+            offset += -(-size // 4) * 4
+        return curves
+
+    def _channels_count(self, elements, clut_channels):
+        """Return number of channels of the first element present"""
+        for name in elements:
+            element = getattr(self, name)
+            if element is None:
+                continue
+            if name == "clut_array":
+                return clut_channels(element)
+            if name == "matrix":
+                return 3
+            return len(element)
+        return 0
+
+    @property
+    def input_channels_count(self):
+        """Return number of input channels."""
+        return self._channels_count(self.elements, lambda clut: clut.ndim - 1)
+
+    @property
+    def output_channels_count(self):
+        """Return number of output channels."""
+        return self._channels_count(self.elements[::-1], lambda clut: clut.shape[-1])
+
+    def lookup(self, values, interpolation="tetrahedral"):
+        """Look up values of shape (..., <input channels>) in the range 0..1
+
+        Applies the processing elements present in the tag and returns the
+        output values as array of shape (..., <output channels>) in the range
+        0..1 (i.e. the encoded output values divided by 65535).
+
+        """
+        values = numpy.clip(numpy.asarray(values, dtype=numpy.float64), 0, 1)
+        for name in self.elements:
+            element = getattr(self, name)
+            if element is None:
+                continue
+            if name == "clut_array":
+                clut = element / (256.0**self.clut_precision - 1)
+                values = _interp_clut(clut, values, interpolation)
+            elif name == "matrix":
+                values = colormath.np.matmul(element, values) + self.offset
+                values = numpy.clip(values, 0, 1)
+            else:
+                values = numpy.stack(
+                    [
+                        _trc_lookup(curve, values[..., j])
+                        for j, curve in enumerate(element)
+                    ],
+                    axis=-1,
+                )
+        return values
+
+    @property
+    def tagData(self):
+        """Return raw tag data."""
+        if self._get_version() is not None:
+            return self._tagData
+        tagData = [b""]
+        offsets = {}
+        offset = 32
+        for name in self.elements:
+            element = getattr(self, name)
+            if element is None:
+                continue
+            if name == "clut_array":
+                grid = bytes(element.shape[:-1]).ljust(16, b"\0")
+                encode = {1: uInt8Number_array_tohex, 2: uInt16Number_array_tohex}
+                data = (
+                    grid
+                    + uInt8Number_tohex(self.clut_precision)
+                    + b"\0" * 3
+                    + encode[self.clut_precision](element)
+                )
+                data += b"\0" * (-len(data) % 4)
+            elif name == "matrix":
+                data = s15Fixed16Number_array_tohex(
+                    [v for row in element for v in row] + list(self.offset)
+                )
+            else:
+                data = _curves_tohex(element)
+            offsets[name] = offset
+            tagData.append(data)
+            offset += len(data)
+        tagData[0] = b"".join(
+            [
+                self.typeSignature,
+                b"\0" * 4,
+                uInt8Number_tohex(self.input_channels_count),
+                uInt8Number_tohex(self.output_channels_count),
+                b"\0" * 2,
+            ]
+            + [
+                uInt32Number_tohex(offsets.get(name, 0))
+                for name in ("b_curves", "matrix", "m_curves", "clut_array", "a_curves")
+            ]
+        )
         return b"".join(tagData)
 
     @tagData.setter
     def tagData(self, tagData):
         self._tagData = tagData
+        # Encode from the elements unless they are parsed from tagData
+        self._parsed = None
+
+
+class LUTBToAType(LUTAToBType):
+    """lutBToAType
+
+    Like lutAToBType, with the processing elements in reverse order.
+
+    """
+
+    typeSignature = b"mBA "
+    elements = ("b_curves", "matrix", "m_curves", "clut_array", "a_curves")
 
 
 class Observer(ADict):
@@ -3832,12 +4357,9 @@ class ChromaticityType(ICCProfileTag, Colorant):
             return
         deviceChannelsCount = uInt16Number(tagData[8:10])
         Colorant.__init__(self, uInt32Number_tohex(uInt16Number(tagData[10:12])))
-        channels = tagData[12:]
-        for _count in range(deviceChannelsCount):
-            self._channels.append(
-                [u16Fixed16Number(channels[:4]), u16Fixed16Number(channels[4:8])]
-            )
-            channels = channels[8:]
+        xy = u16Fixed16Number_array(tagData[12:], deviceChannelsCount * 2).tolist()
+        for i in range(0, len(xy), 2):
+            self._channels.append(xy[i : i + 2])
 
     __repr__ = Colorant.__repr__
 
@@ -3895,9 +4417,21 @@ class ColorantTableType(ICCProfileTag, AODict):
 
 
 class CurveType(ICCProfileTag, list):
+    """curveType
+
+    Curve entries are stored as list items. A float64 numpy array of the
+    entries (see the array property) and the encoded tag data are kept and
+    discarded whenever the curve is modified.
+
+    """
+
     def __init__(self, tagData=None, tagSignature=None, profile=None):
         ICCProfileTag.__init__(self, tagData, tagSignature)
         self.profile = profile
+        # Bumped on every modification
+        self._version = 0
+        # (version, tag data) of the last encoding
+        self._encoded = None
         self._reset()
         if not tagData:
             return
@@ -3908,9 +4442,7 @@ class CurveType(ICCProfileTag, list):
             self.append(u8Fixed8Number(curveEntries[:2]))
         elif curveEntriesCount:
             # Curve
-            for _count in range(curveEntriesCount):
-                self.append(uInt16Number(curveEntries[:2]))
-                curveEntries = curveEntries[2:]
+            self.extend(uInt16Number_array(curveEntries, curveEntriesCount).tolist())
         else:
             # Identity
             self.append(1.0)
@@ -3940,8 +4472,13 @@ class CurveType(ICCProfileTag, list):
         self._reset()
 
     def _reset(self):
+        self._array = None
         self._transfer_function = {}
         self._bt1886 = {}
+        self._version += 1
+
+    def _get_version(self):
+        return self._version
 
     def append(self, object):
         list.append(self, object)
@@ -3954,11 +4491,21 @@ class CurveType(ICCProfileTag, list):
         bp_in = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], self[0] / 65535.0)
         bp_out = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], black_Y_out)
         wp_out = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], self[-1] / 65535.0)
-        for i, v in enumerate(self):
-            X, Y, Z = colormath.xyY2XYZ(D50_xyY[0], D50_xyY[1], v / 65535.0)
-            self[i] = (
-                colormath.apply_bpc(X, Y, Z, bp_in, bp_out, wp_out, weight)[1] * 65535.0
-            )
+        XYZ = self._xyY2XYZ(D50_xyY[:2], self.array / 65535.0)
+        XYZ = colormath.np.apply_bpc(XYZ, bp_in, bp_out, wp_out, weight)
+        self[:] = (XYZ[:, 1] * 65535.0).tolist()
+
+    @property
+    def array(self):
+        """Return the curve entries as read-only float64 numpy array"""
+        if self._array is None:
+            self._array = numpy.array(self, dtype=numpy.float64)
+            self._array.flags.writeable = False
+        return self._array
+
+    def clear(self):
+        list.clear(self)
+        self._reset()
 
     def extend(self, iterable):
         list.extend(self, iterable)
@@ -3982,31 +4529,36 @@ class CurveType(ICCProfileTag, list):
             if average or least_squares:
                 return values[0]
             return [values[0]]
+        y = self.array
         if lstar_slice:
             start = slice[0] * 100
             end = slice[1] * 100
-            values = []
-            for i, y in enumerate(self):
-                n = colormath.XYZ2Lab(0, y / 65535.0 * 100, 0)[0]
-                if start <= n <= end:
-                    values.append((i / (len(self) - 1.0) * 65535.0, y))
+            zeros = numpy.zeros_like(y)
+            L = colormath.np.XYZ2Lab(
+                numpy.stack([zeros, y / 65535.0 * 100, zeros], axis=-1)
+            )[:, 0]
+            x = numpy.arange(len(y)) / (len(y) - 1.0) * 65535.0
+            mask = (start <= L) & (L <= end)
+            x, y = x[mask], y[mask]
         else:
             maxv = len(self) - 1.0
             maxi = int(maxv)
             starti = int(round(slice[0] * maxi))
             endi = int(round(slice[1] * maxi)) + 1
-            values = list(
-                zip(
-                    [(v / maxv) * 65535 for v in range(starti, endi)], self[starti:endi]
-                )
-            )
+            y = y[starti:endi]
+            x = numpy.arange(starti, starti + len(y)) / maxv * 65535
         vmin = 0
         vmax = 65535.0
         if use_vmin_vmax:
             if len(self) > 2:
                 vmin = self[0]
                 vmax = self[-1]
-        return colormath.get_gamma(values, 65535.0, vmin, vmax, average, least_squares)
+        gamma = colormath.np.get_gamma(
+            numpy.stack([x, y], axis=-1), 65535.0, vmin, vmax, average, least_squares
+        )
+        if not (average or least_squares):
+            gamma = gamma[~numpy.isnan(gamma)].tolist()
+        return gamma
 
     def get_transfer_function(
         self, best=True, slice=(0.05, 0.95), black_Y=None, outoffset=None
@@ -4063,6 +4615,10 @@ class CurveType(ICCProfileTag, list):
         if outoffset_unspecified and black_Y:
             for i in range(100):
                 tfs.append(("Gamma %.2f %i%%" % (round(gamma, 2), i), gamma, i / 100.0))
+        x = numpy.arange(len(self)) / (len(self) - 1.0) * 65535.0
+        in_slice = (slice[0] * len(self) <= numpy.arange(len(self))) & (
+            numpy.arange(len(self)) <= slice[1] * len(self)
+        )
         for name, exp, outoffset in tfs:
             if name in ("DICOM", "Rec. 1886", "SMPTE 2084", "HLG"):
                 try:
@@ -4086,37 +4642,26 @@ class CurveType(ICCProfileTag, list):
                 match[(name, exp, outoffset)] = 1.0
             else:
                 match[(name, exp, outoffset)] = 0.0
-                count = 0
-                start = slice[0] * len(self)
-                end = slice[1] * len(self)
-                for i, n in enumerate(otrc):
-                    # n = colormath.XYZ2Lab(0, n / 65535.0 * 100, 0)[0]
-                    if start <= i <= end:
-                        n = colormath.get_gamma(
-                            [(i / (len(self) - 1.0) * 65535.0, n)],
-                            65535.0,
-                            vmin,
-                            vmax,
-                            False,
-                        )
-                        if n:
-                            n = n[0]
-                            # n2 = colormath.XYZ2Lab(0, trc[i] / 65535.0 * 100, 0)[0]
-                            n2 = colormath.get_gamma(
-                                [(i / (len(self) - 1.0) * 65535.0, trc[i])],
-                                65535.0,
-                                vmin,
-                                vmax,
-                                False,
-                            )
-                            if n2 and n2[0]:
-                                n2 = n2[0]
-                                match[(name, exp, outoffset)] += 1 - (
-                                    max(n, n2) - min(n, n2)
-                                ) / ((n + n2) / 2.0)
-                                count += 1
-                if count:
-                    match[(name, exp, outoffset)] /= count
+                # Compare the gamma of each entry within the slice
+                n = colormath.np.get_gamma(
+                    numpy.stack([x, otrc.array], axis=-1), 65535.0, vmin, vmax, False
+                )
+                count = min(len(otrc), len(trc))
+                n2 = colormath.np.get_gamma(
+                    numpy.stack([x[:count], trc.array[:count]], axis=-1),
+                    65535.0,
+                    vmin,
+                    vmax,
+                    False,
+                )
+                n = n[:count]
+                mask = in_slice[:count] & ~numpy.isnan(n) & ~numpy.isnan(n2)
+                mask &= n2 != 0
+                n, n2 = n[mask], n2[mask]
+                if len(n):
+                    match[(name, exp, outoffset)] = float(
+                        numpy.sum(1 - numpy.abs(n - n2) / ((n + n2) / 2.0)) / len(n)
+                    )
         if not best:
             self._transfer_function[(best, slice)] = match
             return match
@@ -4173,9 +4718,8 @@ class CurveType(ICCProfileTag, list):
         bt1886 = colormath.BT1886(mtx, XYZbp, outoffset, gamma)
         self._bt1886[(gamma, black_Y, outoffset)] = bt1886
         self.set_trc(-709, size)
-        for i, v in enumerate(self):
-            X, Y, Z = colormath.xyY2XYZ(x, y, v / 65535.0)
-            self[i] = bt1886.apply(X, Y, Z)[1] * 65535.0
+        XYZ = self._xyY2XYZ((x, y), self.array / 65535.0)
+        self[:] = (colormath.np.BT1886_apply(bt1886, XYZ)[:, 1] * 65535.0).tolist()
 
     def set_dicom_trc(self, black_cdm2=0.05, white_cdm2=100, size=None):
         """Set the response to the DICOM Grayscale Standard Display Function
@@ -4205,7 +4749,7 @@ class CurveType(ICCProfileTag, list):
             size = len(self)
         if size < 2:
             size = 1024
-        self[:] = []
+        values = []
         for i in range(size):
             v = (
                 math.pow(
@@ -4216,7 +4760,8 @@ class CurveType(ICCProfileTag, list):
                 )
                 / white_dicomY
             )
-            self.append(v * 65535)
+            values.append(v * 65535)
+        self[:] = values
 
     def set_hlg_trc(
         self,
@@ -4356,20 +4901,26 @@ class CurveType(ICCProfileTag, list):
                 return
             else:
                 size = 1024
-        self[:] = []
-        if not callable(power):
-            exp = power
-
-            def power(a):
-                return colormath.specialpow(a, exp)
-
-        for i in range(0, size):
-            self.append(vmin + power(float(i) / (size - 1)) * (vmax - vmin))
+        if callable(power):
+            self[:] = [
+                vmin + power(float(i) / (size - 1)) * (vmax - vmin)
+                for i in range(0, size)
+            ]
+        else:
+            values = colormath.np.specialpow(numpy.arange(size) / (size - 1.0), power)
+            self[:] = (vmin + values * (vmax - vmin)).tolist()
 
     def smooth_cr(self, length=64):
         """Smooth curves (Catmull-Rom)."""
         raise NotImplementedError()
 
+    @staticmethod
+    def _xyY2XYZ(xy, Y):
+        """Return XYZ array for chromaticity xy and array of Y"""
+        return colormath.np.xyY2XYZ(
+            numpy.stack([numpy.full_like(Y, xy[0]), numpy.full_like(Y, xy[1]), Y], -1)
+        )
+
     def smooth_avg(self, passes=1, window=None):
         """Smooth curves (moving average).
 
@@ -4389,6 +4940,8 @@ class CurveType(ICCProfileTag, list):
     def tagData(self):
         """Return raw tag data."""
 
+        if self._encoded and self._encoded[0] == self._version:
+            return self._encoded[1]
         if len(self) == 1 and self[0] == 1.0:
             # Identity
             curveEntriesCount = 0
@@ -4400,9 +4953,10 @@ class CurveType(ICCProfileTag, list):
             tagData.append(u8Fixed8Number_tohex(self[0]))
         elif curveEntriesCount:
             # Curve
-            for curveEntry in self:
-                tagData.append(uInt16Number_tohex(curveEntry))
-        return b"".join(tagData)
+            tagData.append(uInt16Number_array_tohex(self))
+        tagData = b"".join(tagData)
+        self._encoded = self._version, tagData
+        return tagData
 
     @tagData.setter
     def tagData(self, tagData):
@@ -4418,8 +4972,9 @@ class ParametricCurveType(ICCProfileTag):
             return
         fntype = uInt16Number(tagData[8:10])
         numparams = {0: 1, 1: 3, 2: 4, 3: 5, 4: 7}.get(fntype)
-        for i, param in enumerate("gabcdef"[:numparams]):
-            self.params[param] = s15Fixed16Number(tagData[12 + i * 4 : 12 + i * 4 + 4])
+        names = "gabcdef"[:numparams]
+        values = s15Fixed16Number_array(tagData[12:], len(names)).tolist()
+        self.params.update(zip(names, values))
 
     def __apply(self, v):
         if len(self.params) == 1:
@@ -4951,18 +5506,12 @@ class s15Fixed16ArrayType(ICCProfileTag, list):
     def __init__(self, tagData=None, tagSignature=None):
         ICCProfileTag.__init__(self, tagData, tagSignature)
         if tagData:
-            data = tagData[8:]
-            while data:
-                self.append(s15Fixed16Number(data[0:4]))
-                data = data[4:]
+            self.extend(s15Fixed16Number_array(tagData[8:]).tolist())
 
     @property
     def tagData(self):
         """Return raw tag data."""
-        tag_data = [b"sf32", b"\0" * 4]
-        for value in self:
-            tag_data.append(s15Fixed16Number_tohex(value))
-        return b"".join(tag_data)
+        return b"".join([b"sf32", b"\0" * 4, s15Fixed16Number_array_tohex(self)])
 
     @tagData.setter
     def tagData(self, tag_data):
@@ -5401,36 +5950,37 @@ class VideoCardGammaTableType(VideoCardGammaType):
                 "data": [],
             }
         )
-        hex2int = {1: uInt8Number, 2: uInt16Number, 4: uInt32Number, 8: uInt64Number}
-        if entrySize not in hex2int:
+        hex2array = {
+            1: uInt8Number_array,
+            2: uInt16Number_array,
+            4: uInt32Number_array,
+            8: uInt64Number_array,
+        }
+        if entrySize not in hex2array:
             raise ValueError(
                 "Invalid VideoCardGammaTableType entry size %i" % entrySize
             )
-        i = 0
-        while i < channels:
-            self.data.append([])
-            j = 0
-            while j < entryCount:
-                index = 6 + i * entryCount * entrySize + j * entrySize
-                self.data[i].append(hex2int[entrySize](data[index : index + entrySize]))
-                j = j + 1
-            i = i + 1
+        values = hex2array[entrySize](data[6:], channels * entryCount)
+        for i in range(channels):
+            self.data.append(values[i * entryCount : (i + 1) * entryCount].tolist())
 
     def getNormalizedValues(self, amount=None):
         if amount is None:
             amount = self.entryCount
+        if not self.data:
+            return []
         maxValue = math.pow(256, self.entrySize) - 1
-        values = list(
-            zip(*[[entry / maxValue for entry in channel] for channel in self.data])
-        )
+        count = min(len(channel) for channel in self.data)
+        values = (
+            numpy.array([channel[:count] for channel in self.data], numpy.float64)
+            / maxValue
+        ).T
         if amount <= self.entryCount:
             step = self.entryCount / float(amount - 1)
-            all = values
-            values = []
-            for i, value in enumerate(all):
-                if i == 0 or (i + 1) % step < 1 or i + 1 == self.entryCount:
-                    values.append(value)
-        return values
+            i = numpy.arange(count)
+            mask = (i == 0) | ((i + 1) % step < 1) | (i + 1 == self.entryCount)
+            values = values[mask]
+        return [tuple(value) for value in values.tolist()]
 
     def getFormulaType(self):
         """Return formula representing gamma value at 50% input."""
@@ -5467,25 +6017,34 @@ class VideoCardGammaTableType(VideoCardGammaType):
             self.entrySize = int(bits / 8)
         bitv = 2.0**bits
         newmax = math.pow(256, self.entrySize) - 1
-        for _i, channel in enumerate(self.data):
+        # Vectorize the common quantizers (64-bit values would overflow int64)
+        ufunc = {
+            round: numpy.rint,
+            int: numpy.trunc,
+            math.floor: numpy.floor,
+            math.ceil: numpy.ceil,
+        }.get(quantizer)
+        for i, channel in enumerate(self.data):
+            if ufunc and self.entrySize < 8:
+                values = ufunc(numpy.asarray(channel, numpy.float64) / oldmax * bitv)
+                values = numpy.trunc(values / bitv * newmax).astype(numpy.int64)
+                channel[:] = values.tolist()
+                continue
             for j, value in enumerate(channel):
                 channel[j] = int(quantizer(value / oldmax * bitv) / bitv * newmax)
 
     def resize(self, length=128):
         data = [[], [], []]
         for i, channel in enumerate(self.data):
-            for j in range(0, length):
-                j *= (len(channel) - 1) / float(length - 1)
-                if int(j) != j:
-                    floor = channel[int(math.floor(j))]
-                    ceil = channel[min(int(math.ceil(j)), len(channel) - 1)]
-                    interpolated = range(floor, ceil + 1)
-                    fraction = j - int(j)
-                    index = int(round(fraction * (ceil - floor)))
-                    v = interpolated[index]
-                else:
-                    v = channel[int(j)]
-                data[i].append(v)
+            channel = numpy.asarray(channel)
+            j = numpy.arange(length) * ((len(channel) - 1) / float(length - 1))
+            floor = channel[numpy.floor(j).astype(numpy.intp)]
+            ceil = numpy.minimum(numpy.ceil(j), len(channel) - 1)
+            ceil = channel[ceil.astype(numpy.intp)]
+            fraction = j - numpy.trunc(j)
+            # Snap to the nearest integer step between neighbouring entries
+            v = floor + numpy.rint(fraction * (ceil - floor)).astype(channel.dtype)
+            data[i][:] = v.tolist()
         self.data = data
         self.entryCount = len(data[0])
 
@@ -5516,9 +6075,19 @@ class VideoCardGammaTableType(VideoCardGammaType):
             self.data[i] = colormath.smooth_avg(channel, passes, window)
         self.entryCount = len(self.data[0])
 
+    # (entryCount, entrySize, copy of data, tag data) of the last encoding
+    _encoded = None
+
     @property
     def tagData(self):
         """Return raw tag data."""
+        encoded = self._encoded
+        if (
+            encoded
+            and encoded[:2] == (self.entryCount, self.entrySize)
+            and encoded[2] == self.data
+        ):
+            return encoded[3]
         tagData = [
             b"vcgt",
             b"\0" * 4,
@@ -5527,16 +6096,24 @@ class VideoCardGammaTableType(VideoCardGammaType):
             uInt16Number_tohex(self.entryCount),
             uInt16Number_tohex(self.entrySize),
         ]
-        int2hex = {
-            1: uInt8Number_tohex,
-            2: uInt16Number_tohex,
-            4: uInt32Number_tohex,
-            8: uInt64Number_tohex,
+        array2hex = {
+            1: uInt8Number_array_tohex,
+            2: uInt16Number_array_tohex,
+            4: uInt32Number_array_tohex,
+            8: uInt64Number_array_tohex,
         }
         for channel in self.data:
-            for i in range(0, self.entryCount):
-                tagData.append(int2hex[self.entrySize](channel[i]))
-        return b"".join(tagData)
+            if len(channel) < self.entryCount:
+                raise IndexError("list index out of range")
+            tagData.append(array2hex[self.entrySize](channel[: self.entryCount]))
+        tagData = b"".join(tagData)
+        self._encoded = (
+            self.entryCount,
+            self.entrySize,
+            [list(channel) for channel in self.data],
+            tagData,
+        )
+        return tagData
 
     @tagData.setter
     def tagData(self, tagData):
@@ -5650,8 +6227,7 @@ class XYZNumber(AODict):
     def __init__(self, binaryString=b"\0" * 12):
         AODict.__init__(self)
         self.X, self.Y, self.Z = [
-            s15Fixed16Number(chunk)
-            for chunk in (binaryString[:4], binaryString[4:8], binaryString[8:12])
+            v / 65536.0 for v in struct.unpack(">3i", binaryString[:12])
         ]
 
     def __repr__(self):
@@ -5681,8 +6257,7 @@ class XYZNumber(AODict):
         return XYZ
 
     def tohex(self):
-        data = [s15Fixed16Number_tohex(n) for n in list(self.values())]
-        return b"".join(data)
+        return s15Fixed16Number_array_tohex(list(self.values()))
 
     @property
     def hex(self):
@@ -5808,15 +6383,9 @@ class chromaticAdaptionTag(colormath.Matrix3x3, s15Fixed16ArrayType):
     def __init__(self, tagData=None, tagSignature=None):
         ICCProfileTag.__init__(self, tagData, tagSignature)
         if tagData:
-            data = tagData[8:]
-            if data:
-                matrix = []
-                while data:
-                    if len(matrix) == 0 or len(matrix[-1]) == 3:
-                        matrix.append([])
-                    matrix[-1].append(s15Fixed16Number(data[0:4]))
-                    data = data[4:]
-                self.update(matrix)
+            values = s15Fixed16Number_array(tagData[8:]).tolist()
+            if values:
+                self.update([values[i : i + 3] for i in range(0, len(values), 3)])
         else:
             self._reset()
 
@@ -5826,8 +6395,7 @@ class chromaticAdaptionTag(colormath.Matrix3x3, s15Fixed16ArrayType):
 
         tagData = [b"sf32", b"\0" * 4]
         for row in self:
-            for column in row:
-                tagData.append(s15Fixed16Number_tohex(column))
+            tagData.append(s15Fixed16Number_array_tohex(row))
         return b"".join(tagData)
 
     @tagData.setter
@@ -5856,11 +6424,8 @@ class NamedColor2Value(object):
         if end < 0:
             end = 32
         self.rootName = valueData[0:end]
-        self.pcsvalues = [
-            uInt16Number(valueData[32:34]),
-            uInt16Number(valueData[34:36]),
-            uInt16Number(valueData[36:38]),
-        ]
+        values = uInt16Number_array(valueData[32:], 3 + max(deviceCoordCount, 0))
+        self.pcsvalues = values[:3].tolist()
 
         self.pcs = AODict()
         for i, pcsvalue in enumerate(self.pcsvalues):
@@ -5875,10 +6440,7 @@ class NamedColor2Value(object):
                 # X, Y, Z range 0..100 + (32767 / 32768.0)
                 self.pcs[pcs[i]] = pcsvalue / 32768.0 * 100
 
-        deviceCoords = []
-        if deviceCoordCount > 0:
-            for i in range(38, 38 + deviceCoordCount * 2, 2):
-                deviceCoords.append(uInt16Number(valueData[i : i + 2]))
+        deviceCoords = values[3:].tolist()
         self.devicevalues = deviceCoords
         if device == "Lab":
             # L* range 0..100 + (25500 / 65280.0)
@@ -6097,6 +6659,8 @@ typeSignature2Type = {
     b"dtim": DateTimeType,
     b"meas": MeasurementType,
     b"mluc": MultiLocalizedUnicodeType,  # ICC v4
+    b"mAB ": LUTAToBType,  # ICC v4
+    b"mBA ": LUTBToAType,  # ICC v4
     b"mft2": LUT16Type,
     b"mmod": MakeAndModelType,  # Apple private tag
     b"ncl2": NamedColor2Type,
@@ -6116,7 +6680,79 @@ class ICCProfileInvalidError(IOError):
     pass
 
 
-_iccprofilecache = WeakValueDictionary()
+class ICCProfileCache(object):
+    """Least recently used cache of ICCProfile instances
+
+    The cache holds at most maxsize bytes worth of profiles (by profile size).
+    Hits, misses and evictions are counted. The cache can be used from
+    multiple threads.
+
+    """
+
+    def __init__(self, maxsize=32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._profiles
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def get(self, key):
+        with self._lock:
+            item = self._profiles.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._profiles.move_to_end(key)
+            return item[0]
+
+    def add(self, key, profile):
+        with self._lock:
+            item = self._profiles.pop(key, None)
+            if item:
+                self.size -= item[1]
+            if profile.size > self.maxsize:
+                return
+            self._profiles[key] = (profile, profile.size)
+            self.size += profile.size
+            self._trim(self.maxsize)
+
+    def discard(self, profile):
+        """Remove profile from the cache if present"""
+        with self._lock:
+            item = self._profiles.get(profile._key)
+            if item and item[0] is profile:
+                del self._profiles[profile._key]
+                self.size -= item[1]
+
+    def trim(self, maxsize=None):
+        """Evict least recently used profiles until within maxsize bytes"""
+        if maxsize is None:
+            maxsize = self.maxsize
+        with self._lock:
+            self._trim(maxsize)
+
+    def _trim(self, maxsize):
+        while self._profiles and self.size > maxsize:
+            _key, (_profile, size) = self._profiles.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self.size = 0
+
+
+_iccprofilecache = ICCProfileCache()
 
 
 class ICCProfile(object):
@@ -6126,11 +6762,10 @@ class ICCProfile(object):
     a filename, or a file-like object. Also, if the 'load' keyword argument
     is False (default True), only the header will be read initially and
     loading of the tags will be deferred to when they are accessed the
-    first time.
+    first time. Then only the tag table is read, and the data of each tag is
+    read from the file when the tag itself is accessed.
     """
 
-    _recent = []
-
     def __new__(cls, profile=None, load=True, use_cache=False):
         key = None
         # the content of the profile should be passed as bytes in Python 3.
@@ -6166,7 +6801,13 @@ class ICCProfile(object):
         elif isinstance(profile, bytes):
             # Binary string
             if use_cache:
-                key = md5(profile).hexdigest()
+                if profile[84:100].strip(b"\0"):
+                    # The profile ID covers everything except the header fields
+                    # that are zeroed for its calculation, so the header is a
+                    # sufficient key
+                    key = profile[:128]
+                else:
+                    key = md5(profile).hexdigest()
 
         if use_cache:
             chk = _iccprofilecache.get(key)
@@ -6178,19 +6819,24 @@ class ICCProfile(object):
             profile = open(profile, "rb")
 
         self = super(ICCProfile, cls).__new__(cls)
+        self._key = key
+        self._layoutcache = None
+        self._serialized = None
+        self._serializedID = None
+        self._tagdatacache = {}
+        self._init(profile, load)
 
         if use_cache and key:
-            _iccprofilecache[key] = self
+            _iccprofilecache.add(key, self)
 
-            # Make sure most recent three are not garbage collected
-            if len(ICCProfile._recent) == 3:
-                ICCProfile._recent.pop(0)
-            ICCProfile._recent.append(self)
+        return self
 
-        self._key = key
+    def _init(self, profile, load):
         self.ID = b"\0" * 16
         self._data = b""
         self._file = None
+        self._lazy = not load
+        self._stat = None
         self._tagoffsets = []  # Original tag offsets
         self._tags = LazyLoadTagAODict(self)
         self.fileName = None
@@ -6206,6 +6852,12 @@ class ICCProfile(object):
                 # File object
                 self._file = profile
                 self.fileName = self._file.name
+                try:
+                    st = os.fstat(self._file.fileno())
+                except (AttributeError, OSError, ValueError):
+                    pass
+                else:
+                    self._stat = (st.st_mtime, st.st_size)
                 self._file.seek(0)
                 data = self._file.read(128)
                 self.close()
@@ -6316,7 +6968,7 @@ class ICCProfile(object):
                     if vcgt:
                         self.tags["vcgt"] = vcgt
                 self.size = len(self.data)
-                return self
+                return
 
             if data[36:40] != b"acsp":
                 raise ICCProfileInvalidError(
@@ -6373,8 +7025,6 @@ class ICCProfile(object):
         else:
             self.set_defaults()
 
-        return self
-
     def set_defaults(self):
         if not hasattr(self, "version"):
             # Default to RGB display device profile
@@ -6420,62 +7070,132 @@ class ICCProfile(object):
         """Get raw binary profile data.
 
         This will re-assemble the various profile parts (header, tag table and data)
-        on-the-fly.
+        on-the-fly. The result is cached and returned as-is as long as the header
+        is unchanged and no tags were added, removed, replaced or modified.
         """
+        tags, layout = self._layout()
+        tagTable, tagTableSize, tagDataSize, tagSignatures = layout
+        header = self.header(tagTableSize, tagDataSize)
+        if (
+            self._serialized
+            and self._serialized[0] is layout
+            and self._serialized[1] == header
+        ):
+            return self._serialized[2]
+        data = [header, tagTable]
+        for tagSignature in tagSignatures:
+            tagData = self._get_tag_data(tagSignature, *tags[tagSignature])
+            data.append(tagData)
+            if len(tagData) % 4:
+                data.append(b"\0" * (4 - len(tagData) % 4))
+        # Join allocates the output once at its final size
+        data = b"".join(data)
+        self._serialized = layout, header, data
+        return data
+
+    def _get_tag_versions(self):
+        """Return (tag signature, tag, version) of all tags in tag table order
+
+        Tags that don't track changes (see ICCProfileTag._get_version) are
+        serialized, and their tag data is used as version. The same goes for
+        unparsed tags.
+
+        """
+        versions = []
+        for tagSignature in self.tags:
+            tag = AODict.__getitem__(self.tags, tagSignature)
+            if isinstance(tag, ICCProfileTag):
+                version = tag._get_version()
+                if version is None:
+                    version = tag.tagData
+            else:
+                tag = self._get_tag_data_tuple(tagSignature)
+                version = tag[3]
+            versions.append((tagSignature, tag, version))
+        return versions
+
+    def _layout(self):
+        """Return tags and tag layout
+
+        Tags are returned as dictionary of (tag, version) tuples keyed by tag
+        signature. The layout is a tuple of tag count and tag table, tag table
+        size, tag data size, and the signatures of the tags whose data needs
+        to be written. It is cached as long as no tags were added, removed,
+        replaced or modified.
+
+        Identical tag data is detected by MD5 digest, so no more than one
+        tag's data is held at a time.
+
+        """
+        versions = self._get_tag_versions()
+        tags = {tagSignature: (tag, version) for tagSignature, tag, version in versions}
+        # The cache holds on to the tags, so their IDs can't be reused
+        key = [
+            (tagSignature, id(tag), version) for tagSignature, tag, version in versions
+        ]
+        cached = self._layoutcache
+        if cached and cached[0] == key and cached[2] == self._tagoffsets:
+            return tags, cached[3]
         # Assemble tag table and tag data
-        tagCount = len(self.tags)
+        tagCount = len(versions)
         tagTable = dict()
         tagTableSize = tagCount * 12
-        tagsData = []
-        tagsDataOffset = []
+        tagSignatures = []
+        # Offsets of unique tag data, keyed by (unpadded) tag data size and
+        # MD5 digest
+        tagsDataOffset = dict()
         tagDataOffset = 128 + 4 + tagTableSize
-        tags = []
+        tagoffsets = set(self._tagoffsets)
+        order = []
         # Order of tag table and actual tag data may be different.
         # Keep order of tags according to original offsets (if any).
         for _oOffset, tagSignature in sorted(self._tagoffsets):
-            if tagSignature in self.tags:
-                tags.append(tagSignature)
+            if tagSignature in tags:
+                order.append(tagSignature)
 
         # Keep tag table order
-        for tagSignature in self.tags:
+        for tagSignature, _tag, _version in versions:
             tagTable[tagSignature] = tagSignature.encode()
-            if tagSignature not in tags:
-                tags.append(tagSignature)
+            if tagSignature not in order:
+                order.append(tagSignature)
 
-        for tagSignature in tags:
-            tag = AODict.__getitem__(self.tags, tagSignature)
-            if isinstance(tag, ICCProfileTag):
-                tagData = self.tags[tagSignature].tagData
-            else:
-                tagData = tag[3]
+        for tagSignature in order:
+            tagData = self._get_tag_data(tagSignature, *tags[tagSignature])
             tagDataSize = len(tagData)
-            # Pad all data with binary zeros, so it lies on 4-byte boundaries
-            padding = int(math.ceil(tagDataSize / 4.0)) * 4 - tagDataSize
-            tagData += b"\0" * padding
+            tagDataKey = tagDataSize, md5(tagData).digest()
             if (
                 tagDataOffset,
                 tagSignature,
-            ) not in self._tagoffsets and tagData in tagsData:
-                tagTable[tagSignature] += uInt32Number_tohex(
-                    tagsDataOffset[tagsData.index(tagData)]
-                )
+            ) not in tagoffsets and tagDataKey in tagsDataOffset:
+                tagTable[tagSignature] += uInt32Number_tohex(tagsDataOffset[tagDataKey])
             else:
                 tagTable[tagSignature] += uInt32Number_tohex(tagDataOffset)
-                tagsData.append(tagData)
-                tagsDataOffset.append(tagDataOffset)
-                tagDataOffset += tagDataSize + padding
+                tagSignatures.append(tagSignature)
+                tagsDataOffset.setdefault(tagDataKey, tagDataOffset)
+                # Pad all data with binary zeros, so it lies on 4-byte boundaries
+                tagDataOffset += -(-tagDataSize // 4) * 4
             tagTable[tagSignature] += uInt32Number_tohex(tagDataSize)
-        tagsData = b"".join(tagsData)
-        header = self.header(tagTableSize, len(tagsData))
-        data = b"".join(
-            [
-                header,
-                uInt32Number_tohex(tagCount),
-                b"".join(list(tagTable.values())),
-                tagsData,
-            ]
+        tagTable = uInt32Number_tohex(tagCount) + b"".join(list(tagTable.values()))
+        layout = (
+            tagTable,
+            tagTableSize,
+            tagDataOffset - 128 - 4 - tagTableSize,
+            tagSignatures,
         )
-        return data
+        self._layoutcache = key, versions, list(self._tagoffsets), layout
+        return tags, layout
+
+    def _get_tag_data(self, tagSignature, tag, version):
+        """Return tag data, serializing tags only if their version changed"""
+        if isinstance(version, bytes):
+            # Untracked or unparsed tag, version is the tag data
+            return version
+        cached = self._tagdatacache.get(tagSignature)
+        if cached and cached[0] is tag and cached[1] == version:
+            return cached[2]
+        tagData = tag.tagData
+        self._tagdatacache[tagSignature] = tag, version, tagData
+        return tagData
 
     def header(self, tagTableSize, tagDataSize):
         """Profile Header"""
@@ -6549,7 +7269,15 @@ class ICCProfile(object):
     def tags(self):
         """Profile Tag Table"""
         if not self._tags:
-            self.load()
+            lazy = self._lazy and not self.is_loaded and self._file
+            if lazy:
+                # Only read the tag table, tag data is read on first access
+                tagCount = self._read(128, 4)
+                if len(tagCount) == 4:
+                    self._data = self._data[:128] + tagCount
+                    self._data += self._read(132, uInt32Number(tagCount) * 12)
+            else:
+                self.load()
             if self._data and len(self._data) > 131:
                 # tag table and tagged element data
                 tagCount = uInt32Number(self._data[128:132])
@@ -6589,6 +7317,13 @@ class ICCProfile(object):
                                 print(
                                     "    tagDataOffset and tagDataSize indicate shared tag"
                                 )
+                        elif lazy:
+                            tags[(tagDataOffset, tagDataSize)] = (
+                                None,
+                                tagDataOffset,
+                                tagDataSize,
+                                None,
+                            )
                         else:
                             start = tagDataOffset - discard_len
                             if debug:
@@ -6598,33 +7333,11 @@ class ICCProfile(object):
                             if debug:
                                 print("    tagData end:", end)
 
-                            tagData = self._data[start:end]
-                            if len(tagData) < tagDataSize:
-                                print(
-                                    "Warning: Tag data for tag %r is truncated (offset %i, expected size %i, "
-                                    "actual size %i)"
-                                    % (
-                                        tagSignature,
-                                        tagDataOffset,
-                                        tagDataSize,
-                                        len(tagData),
-                                    )
-                                )
-                                tagDataSize = len(tagData)
-                            typeSignature = tagData[:4]
-                            if len(typeSignature) < 4:
-                                print(
-                                    "Warning: Tag type signature for tag %r is truncated (offset %i, size %i)"
-                                    % (tagSignature, tagDataOffset, tagDataSize)
-                                )
-                                typeSignature = typeSignature.ljust(4, b" ")
-                            if debug:
-                                print("    typeSignature:", typeSignature)
-                            tags[(tagDataOffset, tagDataSize)] = (
-                                typeSignature,
+                            tags[(tagDataOffset, tagDataSize)] = self._tag_data_tuple(
+                                tagSignature,
                                 tagDataOffset,
                                 tagDataSize,
-                                tagData,
+                                self._data[start:end],
                             )
                         self._tags[tagSignature] = tags[(tagDataOffset, tagDataSize)]
                     tagTable = tagTable[12:]
@@ -6632,11 +7345,65 @@ class ICCProfile(object):
                 self._data = self._data[:128]
         return self._tags
 
+    def _tag_data_tuple(self, tagSignature, tagDataOffset, tagDataSize, tagData):
+        """Return (type signature, offset, size, data) tuple for raw tag data"""
+        if len(tagData) < tagDataSize:
+            print(
+                "Warning: Tag data for tag %r is truncated (offset %i, expected size %i, "
+                "actual size %i)"
+                % (
+                    tagSignature,
+                    tagDataOffset,
+                    tagDataSize,
+                    len(tagData),
+                )
+            )
+            tagDataSize = len(tagData)
+        typeSignature = tagData[:4]
+        if len(typeSignature) < 4:
+            print(
+                "Warning: Tag type signature for tag %r is truncated (offset %i, size %i)"
+                % (tagSignature, tagDataOffset, tagDataSize)
+            )
+            typeSignature = typeSignature.ljust(4, b" ")
+        if debug:
+            print("    typeSignature:", typeSignature)
+        return typeSignature, tagDataOffset, tagDataSize, tagData
+
+    def _get_tag_data_tuple(self, tagSignature):
+        """Return (type signature, offset, size, data) tuple for an unparsed
+        tag, reading its data from the file if it was loaded lazily"""
+        tag = AODict.__getitem__(self._tags, tagSignature)
+        if tag[3] is None:
+            tagDataOffset, tagDataSize = tag[1:3]
+            tag = self._tag_data_tuple(
+                tagSignature,
+                tagDataOffset,
+                tagDataSize,
+                self._read(tagDataOffset, tagDataSize),
+            )
+            AODict.__setitem__(self._tags, tagSignature, tag)
+        return tag
+
+    def _read(self, offset, size):
+        """Read size bytes at offset from the profile's file"""
+        if self._file.closed:
+            with open(self._file.name, "rb") as stream:
+                st = os.fstat(stream.fileno())
+                if self._stat and self._stat != (st.st_mtime, st.st_size):
+                    raise ICCProfileInvalidError(
+                        "Profile file has changed: %s" % self._file.name
+                    )
+                stream.seek(offset)
+                return stream.read(size)
+        self._file.seek(offset)
+        return self._file.read(size)
+
     def calculateID(self, setID=True):
         """Calculates, sets, and returns the profile's ID (checksum).
 
-        Calling this function always recalculates the checksum on-the-fly,
-        in contrast to just accessing the ID property.
+        Calling this function recalculates the checksum on-the-fly if the
+        profile data changed, in contrast to just accessing the ID property.
 
         The entire profile, based on the size field in the header, is used
         to calculate the ID after the values in the Profile Flags field
@@ -6644,17 +7411,37 @@ class ICCProfile(object):
         Profile ID field (bytes 84 to 99) in the profile header have been
         temporarily replaced with zeros.
         """
-        data = self.data
-        data = (
-            data[:44]
-            + b"\0\0\0\0"
-            + data[48:64]
-            + b"\0\0\0\0"
-            + data[68:84]
-            + b"\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
-            + data[100:]
+        tags, layout = self._layout()
+        tagTable, tagTableSize, tagDataSize, tagSignatures = layout
+        header = self.header(tagTableSize, tagDataSize)
+        header = b"".join(
+            [
+                header[:44],
+                b"\0\0\0\0",
+                header[48:64],
+                b"\0\0\0\0",
+                header[68:84],
+                b"\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0",
+                header[100:],
+            ]
         )
-        ID = md5(data).digest()
+        if (
+            self._serializedID
+            and self._serializedID[0] is layout
+            and self._serializedID[1] == header
+        ):
+            ID = self._serializedID[2]
+        else:
+            # Hash tag by tag instead of assembling the profile data
+            checksum = md5(header)
+            checksum.update(tagTable)
+            for tagSignature in tagSignatures:
+                tagData = self._get_tag_data(tagSignature, *tags[tagSignature])
+                checksum.update(tagData)
+                if len(tagData) % 4:
+                    checksum.update(b"\0" * (4 - len(tagData) % 4))
+            ID = checksum.digest()
+            self._serializedID = layout, header, ID
         if setID:
             if ID != self.ID:
                 # No longer reflects original profile
@@ -7328,13 +8115,138 @@ class ICCProfile(object):
         nothing if the profile was passed in as a binary string).
         """
         if not self.is_loaded and self._file:
-            if self._file.closed:
-                self._file = open(self._file.name, "rb")
-                self._file.seek(len(self._data))
-            self._data += self._file.read(self.size - len(self._data))
+            if self._tags:
+                # Tag table has been read lazily, read remaining tag data
+                for tagSignature in list(self._tags.keys()):
+                    if not isinstance(
+                        AODict.__getitem__(self._tags, tagSignature), ICCProfileTag
+                    ):
+                        self._get_tag_data_tuple(tagSignature)
+            else:
+                if self._file.closed:
+                    self._file = open(self._file.name, "rb")
+                    self._file.seek(len(self._data))
+                self._data += self._file.read(self.size - len(self._data))
             self._file.close()
             self.is_loaded = True
 
+    def lookup(self, data, intent="r", direction="f", pcs=None):
+        """Look up device values in-process (without calling ArgyllCMS)
+
+        Equivalent to a forward xicclu lookup in natural order. data is an
+        array-like of device values in the range 0..1 with shape
+        (..., <device channels>), the result is an array of PCS values with
+        shape (..., 3).
+
+        intent: "p", "r", "s" or "a". Absolute colorimetric is only supported
+                if no chromatic adaptation is involved, i.e. if the media
+                white point is the PCS illuminant.
+        pcs: None (profile PCS), "x" (XYZ 0..1), "X" (XYZ 0..100),
+             "l" (L*a*b*) or "L" (LCh).
+
+        Raises NotImplementedError if the profile, intent, direction or PCS
+        can't be handled, so callers can fall back to ArgyllCMS.
+
+        """
+        if direction != "f":
+            raise NotImplementedError(
+                "ICCProfile.lookup: Unsupported direction %r" % direction
+            )
+        if intent not in ("p", "r", "s", "a"):
+            raise NotImplementedError(
+                "ICCProfile.lookup: Unsupported intent %r" % intent
+            )
+        if pcs not in (None, "x", "X", "l", "L"):
+            raise NotImplementedError("ICCProfile.lookup: Unsupported PCS %r" % pcs)
+        if self.profileClass in (b"abst", b"link", b"nmcl"):
+            raise NotImplementedError(
+                "ICCProfile.lookup: Unsupported profile class %r" % self.profileClass
+            )
+        if intent == "a":
+            wtpt = self.tags.get("wtpt")
+            if (
+                not isinstance(wtpt, XYZType)
+                or "chad" in self.tags
+                or any(
+                    abs(v - w) > 1 / 32768.0
+                    for v, w in zip(wtpt.values(), self.illuminant.values())
+                )
+            ):
+                raise NotImplementedError(
+                    "ICCProfile.lookup: Absolute colorimetric intent needs "
+                    "chromatic adaptation"
+                )
+        data = numpy.asarray(data, dtype=numpy.float64)
+        tagnames = {"p": ("A2B0",), "s": ("A2B2", "A2B0")}.get(intent, ("A2B1", "A2B0"))
+        table = None
+        for tagname in tagnames:
+            if tagname in self.tags:
+                table = self.tags[tagname]
+                break
+        XYZ = Lab = None
+        if table is not None:
+            if not isinstance(table, (LUT16Type, LUTAToBType)):
+                raise NotImplementedError(
+                    "ICCProfile.lookup: Unsupported tag type %s"
+                    % table.__class__.__name__
+                )
+            channels = table.input_channels_count
+        elif all(
+            "%s%s" % (channel, tagname) in self.tags
+            for channel in "rgb"
+            for tagname in ("XYZ", "TRC")
+        ):
+            channels = 3
+        elif "kTRC" in self.tags:
+            channels = 1
+        else:
+            raise NotImplementedError("ICCProfile.lookup: Unsupported profile")
+        if data.shape[-1:] != (channels,):
+            raise ValueError(
+                "ICCProfile.lookup: Expected %i device channels, got data of "
+                "shape %r" % (channels, data.shape)
+            )
+        D50 = colormath.get_whitepoint("D50")
+        if table is not None:
+            values = table.lookup(data) * 65535
+            if self.connectionColorSpace == b"Lab":
+                if isinstance(table, LUTAToBType):
+                    uInt16_to_dec = PCSLab_uInt16_to_dec
+                else:
+                    uInt16_to_dec = legacy_PCSLab_uInt16_to_dec
+                Lab = numpy.stack(
+                    uInt16_to_dec(*numpy.moveaxis(values, -1, 0)), axis=-1
+                )
+            else:
+                XYZ = values / 32768.0
+        elif channels == 3:
+            matrix = colormath.Matrix3x3(
+                [list(self.tags["%sXYZ" % channel].values()) for channel in "rgb"]
+            ).transposed()
+            linear = numpy.stack(
+                [
+                    _trc_lookup(self.tags["%sTRC" % channel], data[..., i])
+                    for i, channel in enumerate("rgb")
+                ],
+                axis=-1,
+            )
+            XYZ = colormath.np.matmul(matrix, linear)
+        else:
+            XYZ = _trc_lookup(self.tags.kTRC, data[..., 0])[
+                ..., numpy.newaxis
+            ] * numpy.asarray(D50)
+        if pcs in ("l", "L") or (not pcs and self.connectionColorSpace == b"Lab"):
+            if Lab is None:
+                Lab = colormath.np.XYZ2Lab(XYZ, D50)
+            if pcs == "L":
+                return colormath.np.Lab2LCHab(Lab)
+            return Lab
+        if XYZ is None:
+            XYZ = colormath.np.Lab2XYZ(Lab, D50)
+        if pcs == "X":
+            return XYZ * 100
+        return XYZ
+
     def print_info(self):
         print("=" * 80)
         print("ICC profile information")
@@ -8042,22 +8954,37 @@ class ICCProfile(object):
         """Write profile to stream.
 
         This will re-assemble the various profile parts (header,
-        tag table and data) on-the-fly.
+        tag table and data) on-the-fly. Tag data is written one tag at a time
+        after the tag offsets have been determined, so the whole profile is
+        never held in memory at once.
         """
         if not stream_or_filename:
             if self._file:
                 if not self._file.closed:
                     self.close()
             stream_or_filename = self.fileName
+        # Lay out tag data before opening the file, tag data may still need to
+        # be read from it
+        tags, layout = self._layout()
+        tagTable, tagTableSize, tagDataSize, tagSignatures = layout
+        header = self.header(tagTableSize, tagDataSize)
         if isinstance(stream_or_filename, str):
             stream = open(stream_or_filename, "wb")
             if not self.fileName:
                 self.fileName = stream_or_filename
         else:
             stream = stream_or_filename
-        stream.write(self.data)
-        if isinstance(stream_or_filename, str):
-            stream.close()
+        try:
+            stream.write(header)
+            stream.write(tagTable)
+            for tagSignature in tagSignatures:
+                tagData = self._get_tag_data(tagSignature, *tags[tagSignature])
+                stream.write(tagData)
+                if len(tagData) % 4:
+                    stream.write(b"\0" * (4 - len(tagData) % 4))
+        finally:
+            if isinstance(stream_or_filename, str):
+                stream.close()
 
     def __getattribute__(self, name):
         if name == "write" or name.startswith("set") or name.startswith("apply"):
@@ -8066,10 +8993,5 @@ class ICCProfile(object):
         return object.__getattribute__(self, name)
 
     def _delfromcache(self):
-        # Make double sure to remove ourselves from the cache
-        if self._key and self._key in _iccprofilecache:
-            try:
-                del _iccprofilecache[self._key]
-            except KeyError:
-                # GC was faster
-                pass
+        if self._key:
+            _iccprofilecache.discard(self)
@@ -4139,6 +4139,16 @@ if "--debug-caches" in sys.argv[1:]:
     atexit.register(debug_caches)
 
 
+def __getattr__(name):
+    # Array API (colormath.np) is loaded lazily so importing colormath does
+    # not require numpy
+    if name == "np":
+        from DisplayCAL import colormath_np
+
+        return colormath_np
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
 def test():
     for i in range(4):
         if i == 0:
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""
+Array versions of the color mathematical functions in colormath.
+
+The functions in this module mirror their scalar counterparts in colormath
+(same names, same keyword arguments and defaults), but instead of taking three
+scalars and returning a tuple, they take array-likes of shape (..., 3) and
+return numpy arrays of the same shape. This allows converting whole grids
+(e.g. a 65x65x65 cLUT) with a handful of array operations instead of one
+interpreted call per value.
+
+This module is also available as ``colormath.np``.
+
+Note:
+
+Callables passed as ``eotf``/``oetf`` need to accept and return arrays.
+
+"""
+
+import math
+
+import numpy
+
+from DisplayCAL import colormath
+from DisplayCAL.colormath import (
+    LSTAR_E,
+    LSTAR_K,
+    REC709_K0,
+    REC709_P,
+    SMPTE240M_K0,
+    SMPTE240M_P,
+    SMPTE2084_C1,
+    SMPTE2084_C2,
+    SMPTE2084_C3,
+    SMPTE2084_M1,
+    SMPTE2084_M2,
+    SRGB_K0,
+    SRGB_P,
+    get_rgb_space,
+    get_whitepoint,
+    wp_adaption_matrix,
+)
+
+
+def asarray(values):
+    """Return values as float64 numpy array (no copy if already one)"""
+    return numpy.asarray(values, dtype=numpy.float64)
+
+
+def matmul(matrix, values):
+    """Multiply every 3-vector in values (shape (..., 3)) with a 3x3 matrix
+
+    Equivalent to ``Matrix3x3 * (X, Y, Z)`` applied to each vector.
+
+    """
+    return numpy.matmul(asarray(values), asarray(matrix).T)
+
+
+def _split(values):
+    values = asarray(values)
+    if values.shape[-1:] != (3,):
+        raise ValueError("Expected array of shape (..., 3), got %r" % (values.shape,))
+    return values[..., 0], values[..., 1], values[..., 2]
+
+
+def _stack(a, b, c):
+    return numpy.stack(numpy.broadcast_arrays(a, b, c), axis=-1)
+
+
+def specialpow(a, b, slope_limit=0):
+    """Array version of colormath.specialpow
+
+    Positive b = power, -2.4 = sRGB, -3.0 = L*, -240 = SMPTE 240M,
+    -601 = Rec. 601, -709 = Rec. 709 (Rec. 601 and 709 transfer functions are
+    identical), -2084 = SMPTE 2084
+
+    """
+    a = asarray(a)
+    negative = a < 0.0
+    a_abs = numpy.abs(a)
+    if b >= 0.0:
+        # Power curve
+        v = numpy.where(negative, -numpy.power(a_abs, b), numpy.power(a_abs, b))
+        if slope_limit:
+            v = numpy.where(
+                negative,
+                numpy.minimum(v, a / slope_limit),
+                numpy.maximum(v, a / slope_limit),
+            )
+        return v
+    a = a_abs
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        if b in (1.0 / -601, 1.0 / -709):
+            # XYZ -> RGB, Rec. 601/709 TRC
+            v = numpy.where(
+                a < REC709_K0 / REC709_P,
+                a * REC709_P,
+                1.099 * numpy.power(a, 0.45) - 0.099,
+            )
+        elif b == 1.0 / -240:
+            # XYZ -> RGB, SMPTE 240M TRC
+            v = numpy.where(
+                a < SMPTE240M_K0 / SMPTE240M_P,
+                a * SMPTE240M_P,
+                1.1115 * numpy.power(a, 0.45) - 0.1115,
+            )
+        elif b == 1.0 / -3.0:
+            # XYZ -> RGB, L* TRC
+            v = numpy.where(
+                a <= LSTAR_E,
+                0.01 * a * LSTAR_K,
+                1.16 * numpy.power(a, 1.0 / 3.0) - 0.16,
+            )
+        elif b == 1.0 / -2.4:
+            # XYZ -> RGB, sRGB TRC
+            v = numpy.where(
+                a <= SRGB_K0 / SRGB_P,
+                a * SRGB_P,
+                1.055 * numpy.power(a, 1.0 / 2.4) - 0.055,
+            )
+        elif b == 1.0 / -2084:
+            # XYZ -> RGB, SMPTE 2084 (PQ)
+            am1 = numpy.power(a, SMPTE2084_M1)
+            v = numpy.power((2413.0 * am1 + 107) / (2392.0 * am1 + 128), SMPTE2084_M2)
+        elif b == -2.4:
+            # RGB -> XYZ, sRGB TRC
+            v = numpy.where(
+                a <= SRGB_K0, a / SRGB_P, numpy.power((a + 0.055) / 1.055, 2.4)
+            )
+        elif b == -3.0:
+            # RGB -> XYZ, L* TRC
+            v = numpy.where(
+                a <= 0.08, 100.0 * a / LSTAR_K, numpy.power((a + 0.16) / 1.16, 3.0)
+            )
+        elif b == -240:
+            # RGB -> XYZ, SMPTE 240M TRC
+            v = numpy.where(
+                a < SMPTE240M_K0,
+                a / SMPTE240M_P,
+                numpy.power((0.1115 + a) / 1.1115, 1.0 / 0.45),
+            )
+        elif b in (-601, -709):
+            # RGB -> XYZ, Rec. 601/709 TRC
+            v = numpy.where(
+                a < REC709_K0,
+                a / REC709_P,
+                numpy.power((a + 0.099) / 1.099, 1.0 / 0.45),
+            )
+        elif b == -2084:
+            # RGB -> XYZ, SMPTE 2084 (PQ)
+            am2 = numpy.power(a, 1.0 / SMPTE2084_M2)
+            v = numpy.power(
+                numpy.maximum(am2 - SMPTE2084_C1, 0)
+                / (SMPTE2084_C2 - SMPTE2084_C3 * am2),
+                1.0 / SMPTE2084_M1,
+            )
+        else:
+            raise ValueError("Invalid gamma %r" % b)
+    return numpy.where(negative, -v, v)
+
+
+def adapt(XYZ, whitepoint_source=None, whitepoint_destination=None, cat="Bradford"):
+    """Transform XYZ under source illuminant to XYZ under destination illuminant"""
+    return matmul(
+        wp_adaption_matrix(whitepoint_source, whitepoint_destination, cat), XYZ
+    )
+
+
+def apply_bpc(
+    XYZ, bp_in=None, bp_out=None, wp_out="D50", weight=False, pin_chromaticity=False
+):
+    """Apply black point compensation"""
+    X, Y, Z = _split(XYZ)
+    if not bp_in:
+        bp_in = (0, 0, 0)
+    if not bp_out:
+        bp_out = (0, 0, 0)
+    wp_out = get_whitepoint(wp_out)
+    bp_in = asarray(bp_in)
+    bp_out = asarray(bp_out)
+    if weight:
+        L = XYZ2Lab(asarray(XYZ) * 100)[..., 0]
+        bp_in_Lab = asarray(colormath.XYZ2Lab(*[v * 100 for v in bp_in]))
+        bp_out_Lab = asarray(colormath.XYZ2Lab(*[v * 100 for v in bp_out]))
+        vv = (L - bp_in_Lab[0]) / (100.0 - bp_in_Lab[0])  # 0 at bp, 1 at wp
+        vv = numpy.clip(1.0 - vv, 0.0, 1.0)
+        vv = numpy.power(
+            vv, min(40.0, 40.0 / (max(bp_in_Lab[0], bp_out_Lab[0]) or 1.0))
+        )[..., numpy.newaxis]
+        bp_in = Lab2XYZ(bp_in_Lab * vv)
+        bp_out = Lab2XYZ(bp_out_Lab * vv)
+    if pin_chromaticity:
+        xyY = XYZ2xyY(XYZ, wp_out)
+        Y = (
+            (wp_out[1] - bp_out[..., 1]) * Y
+            - wp_out[1] * (bp_in[..., 1] - bp_out[..., 1])
+        ) / (wp_out[1] - bp_in[..., 1])
+        return xyY2XYZ(_stack(xyY[..., 0], xyY[..., 1], Y))
+    wp_out = asarray(wp_out)
+    return ((wp_out - bp_out) * XYZ - wp_out * (bp_in - bp_out)) / (wp_out - bp_in)
+
+
+def BT1886_apply(bt1886, XYZ):
+    """Array version of colormath.BT1886.apply"""
+    out = matmul(bt1886.bwd_matrix, XYZ)
+    if bt1886.apply_trc:
+        # Convert linear light to Rec709 transfer curve
+        out = numpy.where(
+            out < 0.018,
+            4.5 * out,
+            1.099 * numpy.power(numpy.maximum(out, 0.018), 0.45) - 0.099,
+        )
+    # Apply input offset
+    out = out + bt1886.ingo
+    # Apply power and scale
+    positive = out > 0.0
+    if bt1886.apply_trc:
+        scaled = bt1886.outsc * numpy.power(numpy.where(positive, out, 0), bt1886.gamma)
+    else:
+        scaled = out * bt1886.outsc
+    out = numpy.where(positive, scaled, out)
+    # Apply output portion of offset
+    out = matmul(bt1886.fwd_matrix, out + bt1886.outo)
+    Lab = XYZ2Lab(out * 100)
+    # Blend ab to required black point offset as L approaches black
+    vv = (Lab[..., 0] - bt1886.outL) / (100.0 - bt1886.outL)  # 0 at bp, 1 at wp
+    vv = numpy.power(numpy.clip(1.0 - vv, 0.0, 1.0), 40.0)
+    Lab += vv[..., numpy.newaxis] * asarray(bt1886.tab)
+    return Lab2XYZ(Lab)
+
+
+def blend_ab(XYZ, bp, wp, power=40.0, signscale=1):
+    """Array version of colormath.blend_ab"""
+    XYZ = asarray(XYZ)
+    Lab = XYZ2Lab(XYZ, whitepoint=wp)
+    bpL, bpa, bpb = colormath.XYZ2Lab(*bp, whitepoint=wp)
+    if bpL == 100:
+        raise ValueError("Black L* is 100!")
+    vv = (Lab[..., 0] - bpL) / (100.0 - bpL)  # 0 at bp, 1 at wp
+    vv = numpy.clip(1.0 - vv, 0.0, 1.0)  # 1 at bp, 0 at wp
+    vv = numpy.power(vv, power) * signscale
+    Lab[..., 1] += vv * bpa
+    Lab[..., 2] += vv * bpb
+    result = Lab2XYZ(Lab, whitepoint=wp)
+    result[XYZ[..., 1] < 0] = 0
+    return result
+
+
+def blend_blackpoint(
+    XYZ, bp_in=None, bp_out=None, wp=None, power=40.0, pin_chromaticity=False
+):
+    """Blend to destination black as L approaches black, optionally compensating
+    for input black first
+
+    """
+    XYZ = asarray(XYZ)
+    wp = get_whitepoint(wp)
+
+    for i, bp in enumerate((bp_in, bp_out)):
+        if not bp or tuple(bp) == (0, 0, 0):
+            continue
+        bp_wp = tuple(v / wp[1] * bp[1] for v in wp)
+        if i == 0:
+            XYZ = blend_ab(XYZ, bp, wp, power, -1)
+            XYZ = apply_bpc(XYZ, bp_wp, None, wp, pin_chromaticity)
+        else:
+            XYZ = apply_bpc(XYZ, None, bp_wp, wp, pin_chromaticity)
+            XYZ = blend_ab(XYZ, bp, wp, power, 1)
+
+    return XYZ
+
+
+def delta(
+    Lab1,
+    Lab2,
+    method="1976",
+    p1=None,
+    p2=None,
+    p3=None,
+    cie94_use_symmetric_chrominance=True,
+):
+    """Compute the deltas of two sets of samples in one pass
+
+    Lab1 and Lab2 are array-likes of shape (..., 3) (they are broadcast against
+    each other, so one of them can be a single reference value). Method and
+    p1, p2, p3 have the same meaning as for colormath.delta.
+
+    Returns a dict with the same keys as colormath.delta, with arrays of shape
+    (...) as values.
+
+    """
+    L1, a1, b1 = _split(Lab1)
+    L2, a2, b2 = _split(Lab2)
+    if isinstance(method, str):
+        method = method.lower()
+    else:
+        method = str(int(method))
+    C1 = numpy.hypot(a1, b1)
+    C2 = numpy.hypot(a2, b2)
+    if method in ("00", "2k", "2000", "cie00", "cie2k", "cie2000"):
+        pow25_7 = math.pow(25, 7)
+        k_L = p1 if isinstance(p1, (float, int)) else 1.0
+        k_C = p2 if isinstance(p2, (float, int)) else 1.0
+        k_H = p3 if isinstance(p3, (float, int)) else 1.0
+        C_avg = (C1 + C2) / 2.0
+        G = 0.5 * (1 - numpy.sqrt(C_avg**7 / (C_avg**7 + pow25_7)))
+        a1_ = (1 + G) * a1
+        a2_ = (1 + G) * a2
+        C1_ = numpy.hypot(a1_, b1)
+        C2_ = numpy.hypot(a2_, b2)
+        h1_ = numpy.degrees(numpy.arctan2(b1, a1_))
+        h1_ = numpy.where(b1 >= 0, h1_, h1_ + 360.0)
+        h1_ = numpy.where((a1_ == 0) & (b1 == 0), 0.0, h1_)
+        h2_ = numpy.degrees(numpy.arctan2(b2, a2_))
+        h2_ = numpy.where(b2 >= 0, h2_, h2_ + 360.0)
+        h2_ = numpy.where((a2_ == 0) & (b2 == 0), 0.0, h2_)
+        dh_ = h2_ - h1_
+        dh_ = numpy.where(
+            dh_ > 180, dh_ - 360.0, numpy.where(dh_ < -180, dh_ + 360.0, dh_)
+        )
+        dL = L2 - L1
+        dC = C2_ - C1_
+        dH = 2 * numpy.sqrt(C1_ * C2_) * numpy.sin(numpy.radians(dh_ / 2.0))
+        L__avg = (L1 + L2) / 2.0
+        C__avg = (C1_ + C2_) / 2.0
+        h_sum = h1_ + h2_
+        h__avg = numpy.where(
+            C1_ * C2_ == 0,
+            h_sum,
+            numpy.where(
+                numpy.abs(h2_ - h1_) <= 180,
+                h_sum / 2.0,
+                numpy.where(h_sum < 360, h_sum / 2.0 + 180.0, h_sum / 2.0 - 180.0),
+            ),
+        )
+        AB = (L__avg - 50.0) ** 2  # (L'_ave-50)^2
+        S_L = 1 + 0.015 * AB / numpy.sqrt(20.0 + AB)
+        S_C = 1 + 0.045 * C__avg
+        T = (
+            1
+            - 0.17 * numpy.cos(numpy.radians(h__avg - 30.0))
+            + 0.24 * numpy.cos(numpy.radians(2.0 * h__avg))
+            + 0.32 * numpy.cos(numpy.radians(3.0 * h__avg + 6.0))
+            - 0.2 * numpy.cos(numpy.radians(4 * h__avg - 63.0))
+        )
+        S_H = 1 + 0.015 * C__avg * T
+        dTheta = 30.0 * numpy.exp(-1 * ((h__avg - 275.0) / 25.0) ** 2)
+        R_C = 2.0 * numpy.sqrt(C__avg**7 / (C__avg**7 + pow25_7))
+        R_T = -numpy.sin(numpy.radians(2.0 * dTheta)) * R_C
+        dLw = dL / S_L / k_L
+        dCw = dC / S_C / k_C
+        dHw = dH / S_H / k_H
+        dE = numpy.sqrt(dLw**2 + dCw**2 + dHw**2 + R_T * dCw * dHw)
+    else:
+        dL = L2 - L1
+        dC = C2 - C1
+        dH2 = (a1 - a2) ** 2 + (b1 - b2) ** 2 - dC**2
+        dH = numpy.sqrt(numpy.maximum(dH2, 0))
+        if method in ("94", "1994", "cie94", "cie1994"):
+            textiles = p1
+            SL = 1.0
+            K1 = 0.048 if textiles else 0.045
+            K2 = 0.014 if textiles else 0.015
+            if cie94_use_symmetric_chrominance:
+                C_ = numpy.sqrt(C1 * C2)
+            else:
+                C_ = C1
+            SC = 1.0 + K1 * C_
+            SH = 1.0 + K2 * C_
+            KL = 2.0 if textiles else 1.0
+            dLw, dCw, dHw = dL / (KL * SL), dC / SC, dH / SH
+            dE = numpy.sqrt(dLw**2 + dCw**2 + dHw**2)
+        elif method in ("cmc(2:1)", "cmc21", "cmc(1:1)", "cmc11", "cmc"):
+            if method in ("cmc(2:1)", "cmc21"):
+                p1 = 2.0
+            l = p1 if isinstance(p1, (float, int)) else 1.0
+            c = p2 if isinstance(p2, (float, int)) else 1.0
+            SL = numpy.where(L1 < 16, 0.511, (0.040975 * L1) / (1 + 0.01765 * L1))
+            SC = (0.0638 * C1) / (1 + 0.0131 * C1) + 0.638
+            F = numpy.sqrt(C1**4 / (C1**4 + 1900.0))
+            H1 = numpy.degrees(numpy.arctan2(b1, a1))
+            H1 = numpy.where(b1 >= 0, H1, H1 + 360.0)
+            T = numpy.where(
+                (164 <= H1) & (H1 <= 345),
+                0.56 + numpy.abs(0.2 * numpy.cos(numpy.radians(H1 + 168.0))),
+                0.36 + numpy.abs(0.4 * numpy.cos(numpy.radians(H1 + 35))),
+            )
+            SH = SC * (F * T + 1 - F)
+            dLw, dCw, dHw = dL / (l * SL), dC / (c * SC), dH / SH
+            dE = numpy.sqrt(dLw**2 + dCw**2 + dHw**2)
+        else:
+            # dE 1976
+            dLw, dCw, dHw = dL, dC, dH
+            dE = numpy.sqrt(dL**2 + (a1 - a2) ** 2 + (b1 - b2) ** 2)
+
+    return {
+        "E": dE,
+        "L": dL,
+        "C": dC,
+        "H": dH,
+        "a": a1 - a2,
+        "b": b1 - b2,
+        # Weighted
+        "Lw": dLw,
+        "Cw": dCw,
+        "Hw": dHw,
+    }
+
+
+def get_gamma(values, scale=1.0, vmin=0.0, vmax=1.0, average=True, least_squares=False):
+    """Array version of colormath.get_gamma
+
+    values is an array-like of (x, y) pairs (shape (..., 2)). If neither
+    average nor least_squares, the gamma of each pair is returned with NaN
+    where it is undefined (instead of a list of only the defined ones).
+
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    vmin /= scale
+    vmax /= scale
+    x = values[..., 0] / scale
+    y = (values[..., 1] / scale - vmin) * (vmax + vmin)
+    valid = (0 < x) & (x < 1) & (y > 0)
+    logx = numpy.log(numpy.where(valid, x, 0.5))
+    logy = numpy.log(numpy.where(valid, y, 1.0))
+    if least_squares:
+        if not valid.any():
+            return 0
+        return float(numpy.sum((logx * logy)[valid]) / numpy.sum((logx**2)[valid]))
+    gammas = numpy.where(valid, logy / logx, numpy.nan)
+    if average:
+        if not valid.any():
+            return 0
+        return float(numpy.mean(gammas[valid]))
+    return gammas
+
+
+def LCHab2Lab(LCH):
+    L, C, H = _split(LCH)
+    return _stack(
+        L, C * numpy.cos(H * math.pi / 180.0), C * numpy.sin(H * math.pi / 180.0)
+    )
+
+
+def Lab2LCHab(Lab):
+    L, a, b = _split(Lab)
+    C = numpy.hypot(a, b)
+    H = 180.0 * numpy.arctan2(b, a) / math.pi
+    H = numpy.where(H < 0.0, H + 360.0, H)
+    return _stack(L, C, H)
+
+
+def Lab2XYZ(Lab, whitepoint=None, scale=1.0):
+    """Convert from Lab to XYZ.
+
+    The input L value needs to be in the nominal range [0.0, 100.0] and
+    other input values scaled accordingly.
+    The output XYZ values are in the nominal range [0.0, scale].
+
+    """
+    L, a, b = _split(Lab)
+    fy = (L + 16) / 116.0
+    fx = a / 500.0 + fy
+    fz = fy - b / 200.0
+
+    fx3 = fx**3.0
+    xr = numpy.where(fx3 > LSTAR_E, fx3, (116.0 * fx - 16) / LSTAR_K)
+    yr = numpy.where(L > LSTAR_K * LSTAR_E, fy**3.0, L / LSTAR_K)
+    fz3 = fz**3.0
+    zr = numpy.where(fz3 > LSTAR_E, fz3, (116.0 * fz - 16) / LSTAR_K)
+
+    return _stack(xr, yr, zr) * asarray(get_whitepoint(whitepoint, scale))
+
+
+def LinearRGB2ICtCp(RGB, oetf=lambda FD: specialpow(FD, 1.0 / -2084)):
+    """Rec. 2020 linear RGB to non-linear ICtCp"""
+    LMS = matmul(colormath.LinearRGB2LMS_matrix, RGB)
+    return matmul(colormath.L_M_S_2ICtCp_matrix, oetf(LMS))
+
+
+def ICtCp2LinearRGB(ICtCp, eotf=lambda v: specialpow(v, -2084)):
+    """Non-linear ICtCp to Rec. 2020 linear RGB"""
+    L_M_S_ = matmul(colormath.ICtCp2L_M_S__matrix, ICtCp)
+    return matmul(colormath.LMS2LinearRGB_matrix, eotf(L_M_S_))
+
+
+def XYZ2ICtCp(XYZ, clamp=False, oetf=lambda E: specialpow(E, 1.0 / -2084)):
+    RGB = XYZ2RGB(XYZ, "Rec. 2020", clamp=clamp, oetf=lambda v: v)
+    return LinearRGB2ICtCp(RGB, oetf)
+
+
+def ICtCp2XYZ(ICtCp, eotf=lambda v: specialpow(v, -2084)):
+    RGB = ICtCp2LinearRGB(ICtCp, eotf)
+    return RGB2XYZ(RGB, "Rec. 2020", eotf=lambda v: v)
+
+
+def RGB2XYZ(RGB, rgb_space=None, scale=1.0, eotf=None):
+    """Convert from RGB to XYZ (see colormath.RGB2XYZ)"""
+    trc, whitepoint, rxyY, gxyY, bxyY, matrix = get_rgb_space(rgb_space)
+    RGB = asarray(RGB)
+    if eotf:
+        RGB = eotf(RGB)
+    else:
+        RGB = _apply_trc(RGB, trc, False)
+    return matmul(matrix, RGB) * scale
+
+
+def XYZ2RGB(XYZ, rgb_space=None, scale=1.0, round_=False, clamp=True, oetf=None):
+    """Convert from XYZ to RGB (see colormath.XYZ2RGB)"""
+    trc, whitepoint, rxyY, gxyY, bxyY, matrix = get_rgb_space(rgb_space)
+    RGB = matmul(matrix.inverted(), XYZ)
+    if clamp:
+        RGB = numpy.clip(RGB, 0.0, 1.0)
+    if oetf:
+        RGB = oetf(RGB)
+    else:
+        RGB = _apply_trc(RGB, trc, True)
+    RGB = RGB * scale
+    if round_ is not False:
+        RGB = numpy.round(RGB, round_)
+    return RGB
+
+
+def _apply_trc(RGB, trc, inverse):
+    """Apply the tone response of a RGB space to every channel
+
+    Follows the same rules as the scalar RGB2XYZ/XYZ2RGB: trc can be a single
+    gamma/specialpow exponent, or a per-channel sequence of those or of curves.
+
+    """
+    if not isinstance(trc, (list, tuple)):
+        return specialpow(RGB, 1.0 / trc if inverse else trc)
+    result = numpy.empty_like(RGB)
+    for i in range(3):
+        gamma = trc[i]
+        if isinstance(gamma, (list, tuple)):
+            x = numpy.linspace(0.0, 1.0, len(gamma))
+            if inverse:
+                result[..., i] = numpy.interp(RGB[..., i], gamma, x)
+            else:
+                result[..., i] = numpy.interp(RGB[..., i], x, gamma)
+        else:
+            result[..., i] = specialpow(RGB[..., i], 1.0 / gamma if inverse else gamma)
+    return result
+
+
+def XYZ2Lab(XYZ, whitepoint=None, scale=100):
+    """Convert from XYZ to Lab.
+
+    The input Y value needs to be in the nominal range [0.0, scale] and
+    other input values scaled accordingly.
+    The output L value is in the nominal range [0.0, 100.0].
+
+    """
+    r = asarray(XYZ) / asarray(get_whitepoint(whitepoint, scale))
+    f = numpy.where(r > LSTAR_E, numpy.cbrt(r), (LSTAR_K * r + 16) / 116.0)
+    fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+    return _stack(116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def XYZ2xyY(XYZ, whitepoint=None):
+    """Convert from XYZ to xyY.
+
+    Where X + Y + Z = 0, x and y are set to the chromaticity coordinates of the
+    reference whitepoint.
+
+    """
+    X, Y, Z = _split(XYZ)
+    XYZsum = X + Y + Z
+    black = XYZsum == 0
+    wx, wy, wY = colormath.XYZ2xyY(*get_whitepoint(whitepoint))
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        x = numpy.where(black, wx, X / XYZsum)
+        y = numpy.where(black, wy, Y / XYZsum)
+    return _stack(x, y, numpy.where(black, 0.0, Y))
+
+
+def xyY2XYZ(xyY):
+    """Convert from xyY to XYZ.
+
+    Where y = 0, X = Y = Z = 0 is returned.
+
+    """
+    x, y, Y = _split(xyY)
+    zero = y == 0
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        X = numpy.where(zero, 0.0, x * Y / y)
+        Z = numpy.where(zero, 0.0, (1 - x - y) * Y / y)
+    return _stack(X, numpy.where(zero, 0.0, Y), Z)
@@ -1592,11 +1592,12 @@ def get_display_profile(display_no=None):
 
 
 standard_profiles = []
+standard_profile_paths = []
 
 
 def get_standard_profiles(paths_only=False):
-    if not standard_profiles:
-        from DisplayCAL import ICCProfile as ICCP
+    if not standard_profile_paths:
+        from DisplayCAL.profile_index import profile_index
 
         # Reference profiles (Argyll + DisplayCAL)
         ref_icc = get_data_path("ref", r"\.ic[cm]$") or []
@@ -1640,7 +1641,22 @@ def get_standard_profiles(paths_only=False):
                         )
                     ):
                         other_icc.append(os.path.join(dirpath, basename))
-        for path in ref_icc + other_icc:
+        # Header fields come from the persistent profile index, so only new
+        # or changed profiles need to be read
+        for entry in profile_index.get(ref_icc + other_icc):
+            if (
+                entry.version < 4
+                and entry.profileClass != b"nmcl"
+                and entry.colorSpace != b"GRAY"
+                and entry.connectionColorSpace in (b"Lab", b"XYZ")
+            ):
+                standard_profile_paths.append(entry.fileName)
+    if paths_only:
+        return list(standard_profile_paths)
+    if not standard_profiles:
+        from DisplayCAL import ICCProfile as ICCP
+
+        for path in standard_profile_paths:
             try:
                 profile = ICCP.ICCProfile(path, load=False, use_cache=True)
             except EnvironmentError:
@@ -1648,15 +1664,7 @@ def get_standard_profiles(paths_only=False):
             except Exception as exception:
                 print(exception)
             else:
-                if (
-                    profile.version < 4
-                    and profile.profileClass != b"nmcl"
-                    and profile.colorSpace != b"GRAY"
-                    and profile.connectionColorSpace in (b"Lab", b"XYZ")
-                ):
-                    standard_profiles.append(profile)
-    if paths_only:
-        return [profile.fileName for profile in standard_profiles]
+                standard_profiles.append(profile)
     return standard_profiles
 
 
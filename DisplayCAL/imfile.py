@@ -7,6 +7,8 @@ import struct
 import time
 import zlib
 
+import numpy
+
 from DisplayCAL.meta import name as appname, version
 from DisplayCAL.util_str import safe_str
 
@@ -129,6 +131,23 @@ class Image(object):
             raise ValueError("Unsupported bitdepth: %r" % self.bitdepth)
         return data
 
+    def _pack_scanlines(self):
+        """Pack numpy array image data of shape (<height>, <width>,
+        <samples per pixel>) in one go, each scanline prefixed with filter
+        type 0"""
+        data = numpy.rint(self.data)
+        if self.bitdepth == 16:
+            dtype = ">u2"
+        elif self.bitdepth == 8:
+            dtype = "u1"
+        else:
+            raise ValueError("Unsupported bitdepth: %r" % self.bitdepth)
+        if data.size and (data.min() < 0 or data.max() > 2**self.bitdepth - 1):
+            raise ValueError("Value out of range for bitdepth %i" % self.bitdepth)
+        scanlines = data.astype(dtype).reshape(len(data), -1).view(numpy.uint8)
+        filters = numpy.zeros((len(data), 1), dtype=numpy.uint8)
+        return numpy.hstack((filters, scanlines)).tobytes()
+
     def _write_dpx(self, stream, dimensions=None):
         # Very helpful: http://www.fileformat.info/format/dpx/egff.htm
         # http://www.simplesystems.org/users/bfriesen/dpx/S268M_Revised.pdf
@@ -354,16 +373,19 @@ class Image(object):
         stream.write(ihdr)
         stream.write(struct.pack(">I", zlib.crc32(ihdr) & 0xFFFFFFFF))
         # IDAT image data chunk type
-        imgdata = []
-        for _i, scanline in enumerate(self.data):
-            # Add a scanline, filter type 0
-            imgdata.append(b"\0")
-            for RGB in scanline:
-                RGB = b"".join(self._pack(v) for v in RGB)
-                if optimize:
-                    RGB *= dimensions[0]
-                imgdata.append(RGB)
-        imgdata = b"".join(imgdata)
+        if isinstance(self.data, numpy.ndarray) and not optimize:
+            imgdata = self._pack_scanlines()
+        else:
+            imgdata = []
+            for _i, scanline in enumerate(self.data):
+                # Add a scanline, filter type 0
+                imgdata.append(b"\0")
+                for RGB in scanline:
+                    RGB = b"".join(self._pack(v) for v in RGB)
+                    if optimize:
+                        RGB *= dimensions[0]
+                    imgdata.append(RGB)
+            imgdata = b"".join(imgdata)
         if optimize:
             imgdata *= dimensions[1]
         imgdata = zlib.compress(imgdata, 9)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from multiprocessing import shared_memory
 from queue import Empty
 import atexit
 import errno
@@ -7,8 +8,13 @@ import logging
 import math
 import multiprocessing as mp
 import multiprocessing.pool
+import multiprocessing.util
+import os
 import sys
 import threading
+import time
+
+import numpy
 
 
 def cpu_count(limit_by_total_vmem=True):
@@ -43,6 +49,116 @@ def cpu_count(limit_by_total_vmem=True):
         return 1
 
 
+_pool = None
+_pool_pid = None
+_pool_size = None
+_pool_lock = threading.Lock()
+# Pools that were replaced by a pool of a different size and still need to
+# be shut down
+_closed_pools = []
+
+
+def get_pool():
+    """Return the worker pool shared by all callers, starting it on first use
+
+    The pool is sized by cpu_count() and the multiprocessing.max_cpus
+    setting, and replaced by a new pool if the size changes. Replaced pools
+    finish the jobs already submitted to them and are joined by a later call
+    once all their workers have exited. The pool is shut down at exit.
+
+    """
+    global _pool, _pool_pid, _pool_size
+    size = _get_slicing(sys.maxsize)[0]
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            # Don't use a pool inherited from a parent process
+            _pool = None
+            del _closed_pools[:]
+        # Reap replaced pools that finished their remaining jobs
+        for pool in list(_closed_pools):
+            if not pool._cache and all(
+                process.exitcode is not None for process in list(pool._pool)
+            ):
+                pool.join()
+                _closed_pools.remove(pool)
+        if _pool is not None and _pool_size != size:
+            # Jobs that were already submitted are finished by the old pool
+            _pool.close()
+            _closed_pools.append(_pool)
+            _pool = None
+        if _pool is None:
+            if os.name == "posix":
+                # Workers need to share our resource tracker, otherwise they
+                # start their own which would unlink our shared memory when
+                # they exit
+                from multiprocessing import resource_tracker
+
+                resource_tracker.ensure_running()
+            _pool = NonDaemonicPool(size, _init_worker)
+            _pool_pid = os.getpid()
+            _pool_size = size
+        return _pool
+
+
+def shutdown_pool(timeout=5):
+    """Shut down the shared worker pool (if it was started)
+
+    Workers are given timeout seconds to finish their current chunk and exit
+    normally, so they can run their exit handlers (see _worker_exit). Workers
+    that are still busy after that are terminated.
+
+    """
+    global _pool
+    with _pool_lock:
+        if _pool_pid == os.getpid():
+            pools = _closed_pools + [_pool] if _pool is not None else _closed_pools
+            for pool in pools:
+                pool.close()
+            end = time.time() + timeout
+            for pool in pools:
+                for process in list(pool._pool):
+                    process.join(max(end - time.time(), 0))
+            for pool in pools:
+                pool.terminate()
+                pool.join()
+        _pool = None
+        del _closed_pools[:]
+
+
+atexit.register(shutdown_pool)
+
+
+def _init_worker():
+    """Initialize a worker process of the shared pool"""
+    global _pool_lock
+    # Workers are started by get_pool while the lock is held
+    _pool_lock = threading.Lock()
+    # Exit handlers registered with atexit will not run when a worker process
+    # exits, but multiprocessing finalizers do
+    mp.util.Finalize(None, _worker_exit, exitpriority=0)
+
+
+def _worker_exit():
+    """Clean up when a worker process of the shared pool exits"""
+    print("Exiting worker process", mp.current_process().name)
+    # Pools started by pool_slice calls inside the worker
+    shutdown_pool()
+    if sys.platform == "win32":
+        # We are only interested in our own exit handler.
+        # Note all of this only applies to Windows, as it doesn't have fork().
+        for func, targs, kargs in getattr(atexit, "_exithandlers", []):
+            # Find our lockfile removal exit handler
+            if targs and isinstance(targs[0], str) and targs[0].endswith(".lock"):
+                print("Removing lockfile", targs[0])
+                try:
+                    func(*targs, **kargs)
+                except Exception as exception:
+                    print("Could not remove lockfile:", exception)
+        # Logging is normally shutdown by atexit, as well. Do it explicitly
+        # instead.
+        logging.shutdown()
+
+
 def pool_slice(
     func,
     data_in,
@@ -61,10 +177,11 @@ def pool_slice(
     finished (FIFO).
 
     Progress percentage is written to optional logfile using a background
-    thread that monitors a queue.
-    Note that 'func' is supposed to periodically check thread_abort.event
-    which is passed as the first argument to 'func', and put its progress
-    percentage into the queue which is passed as the second argument to 'func'.
+    thread that monitors the job (see PoolJob.monitor).
+    Note that 'func' is supposed to periodically check the event-like abort
+    flag which is passed as the second argument to 'func', and put its
+    progress percentage into the queue-like counter which is passed as the
+    third argument to 'func'.
 
     """
     if args is None:
@@ -73,11 +190,37 @@ def pool_slice(
     if kwds is None:
         kwds = {}
 
+    num_workers, num_batches, chunksize = _get_slicing(
+        len(data_in), num_workers, num_batches
+    )
+
+    chunks = []
+    start = 0
+    for i in range(num_workers * num_batches):
+        end = int(math.ceil(chunksize * (i + 1)))
+        chunks.append(data_in[start:end])
+        start = end
+
+    if num_workers > 1:
+        pool = get_pool()
+    else:
+        # Do it all in in the main thread of the current instance
+        pool = FakePool()
+
+    job = PoolJob(func, chunks, args, kwds, pool)
+    job.monitor(thread_abort, logfile, progress)
+    job.start()
+    return job.get()
+
+
+def _get_slicing(count, num_workers=None, num_batches=1):
+    """Return number of workers, number of batches and chunksize for
+    processing count items"""
     from DisplayCAL.config import getcfg
 
     if num_workers is None:
         num_workers = cpu_count()
-    num_workers = max(min(int(num_workers), len(data_in)), 1)
+    num_workers = max(min(int(num_workers), count), 1)
     max_workers = getcfg("multiprocessing.max_cpus")
     if max_workers:
         num_workers = min(num_workers, max_workers)
@@ -87,117 +230,362 @@ def pool_slice(
         # multiple workers
         num_batches = 1
 
-    chunksize = float(len(data_in)) / (num_workers * num_batches)
+    chunksize = float(count) / (num_workers * num_batches)
     if chunksize < 1:
         num_batches = 1
-        chunksize = float(len(data_in)) / num_workers
+        chunksize = float(count) / num_workers
+
+    return num_workers, num_batches, chunksize
+
+
+def pool_slice_shared(
+    func,
+    data_in,
+    channels=None,
+    args=None,
+    kwds=None,
+    num_workers=None,
+    thread_abort=None,
+    logfile=None,
+    num_batches=1,
+    progress=0,
+    dtype=numpy.float64,
+):
+    """Process an array in slices using a pool of workers and return the
+    results as array.
+
+    Works like pool_slice, but input and output data live in shared memory,
+    so workers only receive offsets into the input array and write their
+    results in place instead of pickling slices back and forth.
+
+    'func' is called with a slice of the input array (rows along the first
+    axis) instead of a list, and needs to return a result that can be
+    assigned to an array of shape (<slice length>, channels). If channels is
+    None, the output has the same shape as the input.
+
+    """
+    if args is None:
+        args = ()
+
+    if kwds is None:
+        kwds = {}
+
+    data_in = numpy.asarray(data_in, dtype=dtype)
+    if channels is None:
+        shape_out = data_in.shape
+    else:
+        shape_out = (len(data_in), channels)
+
+    num_workers, num_batches, chunksize = _get_slicing(
+        len(data_in), num_workers, num_batches
+    )
+
+    chunks = []
+    start = 0
+    for i in range(num_workers * num_batches):
+        end = int(math.ceil(chunksize * (i + 1)))
+        chunks.append((start, end))
+        start = end
 
     if num_workers > 1:
-        Pool = NonDaemonicPool
-        manager = mp.Manager()
-        if thread_abort is not None and not isinstance(
-            thread_abort.event, mp.managers.EventProxy
-        ):
-            # Replace the event with a managed instance that is compatible
-            # with pool
-            event = thread_abort.event
-            thread_abort.event = manager.Event()
-            if event.is_set():
-                thread_abort.event.set()
-        else:
-            event = None
-        Queue = manager.Queue
+        pool = get_pool()
     else:
         # Do it all in in the main thread of the current instance
-        Pool = FakePool
-        manager = None
-        Queue = FakeQueue
+        pool = FakePool()
 
-    if thread_abort is not None:
-        thread_abort_event = thread_abort.event
-    else:
-        thread_abort_event = None
+    dtype = data_in.dtype
+    shm_in = shared_memory.SharedMemory(create=True, size=max(data_in.nbytes, 1))
+    shm_out = shared_memory.SharedMemory(
+        create=True, size=max(int(numpy.prod(shape_out)) * dtype.itemsize, 1)
+    )
+    try:
+        array_in = numpy.ndarray(data_in.shape, dtype, shm_in.buf)
+        array_in[:] = data_in
+        del array_in
+        job = PoolJob(
+            SharedArrayFunc(func),
+            chunks,
+            ((shm_in.name, data_in.shape), (shm_out.name, shape_out), dtype.str)
+            + tuple(args),
+            kwds,
+            pool,
+        )
+        job.monitor(thread_abort, logfile, progress)
+        job.start()
+        job.get()
+        return numpy.ndarray(shape_out, dtype, shm_out.buf).copy()
+    finally:
+        for shm in (shm_in, shm_out):
+            shm.close()
+            shm.unlink()
+
+
+class PoolJob(object):
+    """Process chunks of data with a pool of workers
+
+    Each chunk is passed to 'func' as first argument, followed by an
+    event-like abort flag (SharedEvent), a queue-like progress counter
+    (SharedProgress), 'args' and 'kwds'. 'func' is supposed to periodically
+    check the abort flag and put its progress percentage into the counter.
+    Abort flag and progress counters live in shared memory, so they can be
+    observed while the job is running without a manager process.
 
-    progress_queue = Queue()
+    """
 
-    if logfile:
+    def __init__(self, func, chunks, args=(), kwds=None, pool=None):
+        from DisplayCAL import config
 
-        def progress_logger(num_workers, progress=0.0):
-            eof_count = 0
-            prevperc = -1
-            while progress < 100 * num_workers:
-                try:
-                    inc = progress_queue.get(True, 0.1)
-                    if isinstance(inc, Exception):
-                        raise inc
-                    progress += inc
-                except Empty:
-                    continue
-                except IOError:
-                    break
-                except EOFError:
-                    eof_count += 1
-                    if eof_count == num_workers:
-                        break
-                perc = round(progress / num_workers)
-                if perc > prevperc:
-                    logfile.write("\r%i%%" % perc)
-                    prevperc = perc
-
-        threading.Thread(
-            target=progress_logger,
-            args=(num_workers * num_batches, progress * num_workers * num_batches),
-            name="ProcessProgressLogger",
-            group=None,
-        ).start()
-
-    pool = Pool(num_workers)
-    results = []
-    start = 0
-    for batch in range(num_batches):
-        for i in range(batch * num_workers, (batch + 1) * num_workers):
-            end = int(math.ceil(chunksize * (i + 1)))
+        if kwds is None:
+            kwds = {}
+        if pool is None:
+            pool = get_pool()
+        self.func = func
+        self.chunks = chunks
+        self.args = tuple(args)
+        self.kwds = kwds
+        self.pool = pool
+        # Workers of a long-lived pool need to see the current configuration
+        self._cfg = dict(config.cfg.items(config.configparser.DEFAULTSECT))
+        self._results = None
+        self._monitor = None
+        # Abort flag followed by progress percentage of each chunk
+        self._shm = shared_memory.SharedMemory(create=True, size=8 * (1 + len(chunks)))
+        self._control = numpy.ndarray((1 + len(chunks),), numpy.float64, self._shm.buf)
+        self._control[:] = 0
+
+    def abort(self):
+        """Ask the workers to abort"""
+        if self._control is not None:
+            self._control[0] = 1
+
+    @property
+    def progress(self):
+        """Average progress percentage of all chunks"""
+        if self._control is None or not self.chunks:
+            return 100.0
+        return float(self._control[1:].sum()) / len(self.chunks)
+
+    def start(self):
+        """Submit the chunks to the pool"""
+        results = []
+        for i, chunk in enumerate(self.chunks):
             results.append(
-                pool.apply_async(
-                    WorkerFunc(func, batch == num_batches - 1),
-                    (data_in[start:end], thread_abort_event, progress_queue) + args,
-                    kwds,
+                self.pool.apply_async(
+                    PoolWorkerFunc(self.func, self._cfg),
+                    (chunk, (self._shm.name, len(self.chunks), i)) + self.args,
+                    self.kwds,
                 )
             )
-            start = end
+        self._results = results
+
+    def ready(self):
+        """Return whether all chunks have been processed"""
+        return self._results is not None and all(
+            result.ready() for result in self._results
+        )
+
+    def wait(self, timeout=None):
+        """Wait until all chunks have been processed or timeout seconds have
+        passed. Return whether all chunks have been processed"""
+        if timeout is not None:
+            end = time.time() + timeout
+        while self._results is None and (timeout is None or time.time() < end):
+            time.sleep(0.01)
+        for result in self._results or []:
+            if timeout is None:
+                result.wait()
+            else:
+                result.wait(max(end - time.time(), 0))
+        return self.ready()
+
+    def get(self):
+        """Wait until all chunks have been processed and return the results
+        in the same order as the chunks
+
+        Shared memory is released afterwards. If a worker returned an
+        exception, it is raised.
+
+        """
+        try:
+            self.wait()
+            exception = None
+            data_out = []
+            for result in self._results:
+                result = result.get()
+                if isinstance(result, Exception):
+                    exception = result
+                    continue
+                data_out.append(result)
+            if exception:
+                raise exception
+            return data_out
+        finally:
+            self.close()
+
+    def monitor(self, thread_abort=None, logfile=None, progress=0):
+        """Start a background thread that passes on abort requests from
+        thread_abort to the workers and writes progress percentage (offset
+        by progress) to logfile until all chunks have been processed"""
+
+        def monitor():
+            prevperc = -1
+            while True:
+                done = self.wait(0.1)
+                if thread_abort is not None and thread_abort.event.is_set():
+                    self.abort()
+                if logfile:
+                    perc = round(min(progress + self.progress, 100))
+                    if perc > prevperc:
+                        logfile.write("\r%i%%" % perc)
+                        prevperc = perc
+                if done:
+                    break
+
+        if thread_abort is not None and thread_abort.event.is_set():
+            self.abort()
+        self._monitor = threading.Thread(
+            target=monitor, name="ProcessProgressLogger", group=None
+        )
+        self._monitor.daemon = True
+        self._monitor.start()
+
+    def close(self):
+        """Release shared memory"""
+        if self._monitor:
+            self._monitor.join()
+            self._monitor = None
+        if self._control is not None:
+            self._control = None
+            self._shm.close()
+            self._shm.unlink()
+
+
+def _attach_shared_memory(name):
+    try:
+        # Don't let the resource tracker of worker processes unlink shared
+        # memory owned by the parent process
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Python < 3.13
+        return shared_memory.SharedMemory(name)
+
+
+def _sync_config(options):
+    """Make the configuration of a worker process match options"""
+    from DisplayCAL import config
+
+    section = config.configparser.DEFAULTSECT
+    if dict(config.cfg.items(section)) == options:
+        return
+    for name in list(config.cfg.defaults()):
+        if name not in options:
+            config.cfg.remove_option(section, name)
+    for name, value in options.items():
+        config.cfg.set(section, name, value)
+
 
-    # Get results
-    exception = None
-    data_out = []
-    for result in results:
-        result = result.get()
-        if isinstance(result, Exception):
-            exception = result
-            continue
-        data_out.append(result)
+class SharedEvent(object):
+    """Event-like abort flag in a shared array"""
 
-    pool.close()
-    pool.join()
+    def __init__(self, array, index=0):
+        self.array = array
+        self.index = index
 
-    if manager:
-        # Need to shutdown manager so it doesn't hold files in use
-        if event:
-            # Restore original event
-            if thread_abort.event.is_set():
-                event.set()
-            thread_abort.event = event
-        manager.shutdown()
+    def clear(self):
+        self.array[self.index] = 0
 
-    if exception:
-        raise exception
+    def is_set(self):
+        return bool(self.array[self.index])
 
-    return data_out
+    def set(self):
+        self.array[self.index] = 1
+
+
+class SharedProgress(object):
+    """Queue-like progress counter in a shared array
+
+    Numbers put into the 'queue' are added to the counter, anything else is
+    ignored.
+
+    """
+
+    def __init__(self, array, index):
+        self.array = array
+        self.index = index
+
+    def put(self, item, block=True, timeout=None):
+        if isinstance(item, (int, float)):
+            self.array[self.index] += item
+
+
+class PoolWorkerFunc(object):
+    """Attach to the shared job control block and call 'func' with a chunk,
+    the abort flag and the chunk's progress counter"""
+
+    def __init__(self, func, cfg=None):
+        self.func = WorkerFunc(func)
+        self.cfg = cfg
+
+    def __call__(self, chunk, control, *args, **kwds):
+        name, num_chunks, index = control
+        if self.cfg is not None and mp.current_process().name != "MainProcess":
+            _sync_config(self.cfg)
+        shm = _attach_shared_memory(name)
+        try:
+            control = numpy.ndarray((1 + num_chunks,), numpy.float64, shm.buf)
+            return self.func(
+                chunk,
+                SharedEvent(control),
+                SharedProgress(control, 1 + index),
+                *args,
+                **kwds
+            )
+        finally:
+            # Views need to be released before the shared memory can be closed
+            control = None
+            shm.close()
+
+
+class SharedArrayFunc(object):
+    """Call 'func' with a slice of an array in shared memory and write its
+    result to an output array in shared memory"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(
+        self,
+        chunk,
+        thread_abort_event,
+        progress_queue,
+        data_in,
+        data_out,
+        dtype,
+        *args,
+        **kwds
+    ):
+        start, end = chunk
+        (name_in, shape_in), (name_out, shape_out) = data_in, data_out
+        shm_in = _attach_shared_memory(name_in)
+        shm_out = _attach_shared_memory(name_out)
+        try:
+            array_in = numpy.ndarray(shape_in, dtype, shm_in.buf)[start:end]
+            result = self.func(
+                array_in, thread_abort_event, progress_queue, *args, **kwds
+            )
+            if isinstance(result, Exception):
+                return result
+            array_out = numpy.ndarray(shape_out, dtype, shm_out.buf)[start:end]
+            array_out[:] = result
+        finally:
+            array_in = array_out = None
+            shm_in.close()
+            shm_out.close()
 
 
 class WorkerFunc(object):
-    def __init__(self, func, exit=False):
+    def __init__(self, func):
         self.func = func
-        self.exit = exit
 
     def __call__(self, data, thread_abort_event, progress_queue, *args, **kwds):
         try:
@@ -214,29 +602,6 @@ class WorkerFunc(object):
             return exception
         finally:
             progress_queue.put(EOFError())
-            if mp.current_process().name != "MainProcess":
-                print("Exiting worker process", mp.current_process().name)
-                if sys.platform == "win32" and self.exit:
-                    # Exit handlers registered with atexit will not normally
-                    # run when a multiprocessing subprocess exits. We are only
-                    # interested in our own exit handler though.
-                    # Note all of this only applies to Windows, as it doesn't
-                    # have fork().
-                    for func, targs, kargs in atexit._exithandlers:
-                        # Find our lockfile removal exit handler
-                        if (
-                            targs
-                            and isinstance(targs[0], str)
-                            and targs[0].endswith(".lock")
-                        ):
-                            print("Removing lockfile", targs[0])
-                            try:
-                                func(*targs, **kargs)
-                            except Exception as exception:
-                                print("Could not remove lockfile:", exception)
-                    # Logging is normally shutdown by atexit, as well. Do
-                    # it explicitly instead.
-                    logging.shutdown()
 
 
 class Mapper(object):
@@ -339,6 +704,12 @@ class Result(object):
     def __init__(self, result):
         self.result = result
 
+    def ready(self):
+        return True
+
+    def wait(self, timeout=None):
+        pass
+
     def get(self):
         """Return result.
 
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent index of ICC profile headers.
+
+Populating profile lists needs the header fields (and description) of every
+profile in the system profile directories. The index keeps those in an SQLite
+database in the cache directory, keyed by path. Entries are refreshed by
+comparing each file's mtime, size and inode, so only new or changed profiles
+need to be opened.
+
+"""
+
+import os
+import sqlite3
+import threading
+
+from DisplayCAL.defaultpaths import cache
+from DisplayCAL.meta import name as appname
+
+
+class ProfileIndexEntry(object):
+    """Header fields and description of an indexed profile
+
+    Attribute names are the same as the ones of ICCProfile, so entries can be
+    filtered like profiles.
+
+    """
+
+    __slots__ = (
+        "fileName",
+        "profileClass",
+        "colorSpace",
+        "connectionColorSpace",
+        "version",
+        "ID",
+        "description",
+    )
+
+    def __init__(
+        self,
+        fileName,
+        profileClass,
+        colorSpace,
+        connectionColorSpace,
+        version,
+        ID,
+        description,
+    ):
+        self.fileName = fileName
+        self.profileClass = profileClass
+        self.colorSpace = colorSpace
+        self.connectionColorSpace = connectionColorSpace
+        self.version = version
+        self.ID = ID
+        self.description = description
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.fileName)
+
+    def getDescription(self):
+        return self.description
+
+
+class ProfileIndex(object):
+    """SQLite backed index of ICC profile headers"""
+
+    def __init__(self, path=None):
+        if not path:
+            path = os.path.join(cache, appname, "profile_index.sqlite")
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        dirname = os.path.dirname(self.path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, inode INTEGER, "
+            "class BLOB, colorspace BLOB, pcs BLOB, version REAL, id BLOB, "
+            "description TEXT)"
+        )
+        return conn
+
+    def get(self, paths):
+        """Return index entries for the profiles at paths
+
+        Entries of new or changed files are refreshed by reading the profile
+        header and description. Entries are returned in the same order as
+        paths; files that can't be read or are not valid profiles are skipped.
+
+        """
+        with self._lock:
+            try:
+                conn = self._connect()
+            except (EnvironmentError, sqlite3.Error) as exception:
+                print("Warning - profile index could not be opened:", exception)
+                conn = None
+            try:
+                return self._get(conn, paths)
+            finally:
+                if conn:
+                    conn.close()
+
+    def _get(self, conn, paths):
+        rows = {}
+        if conn:
+            try:
+                for row in conn.execute("SELECT * FROM profiles"):
+                    rows[row[0]] = row
+            except sqlite3.Error as exception:
+                print("Warning - profile index could not be read:", exception)
+                conn = None
+        entries = []
+        updates = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except EnvironmentError:
+                continue
+            stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+            row = rows.pop(path, None)
+            if not row or tuple(row[1:4]) != stat:
+                row = self._read(path, stat)
+                if not row:
+                    continue
+                updates.append(row)
+            if row[4] is not None:
+                entries.append(ProfileIndexEntry(path, *row[4:]))
+        if conn:
+            # Remove entries of profiles that no longer exist
+            removed = [(path,) for path in rows if not os.path.isfile(path)]
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO profiles VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        updates,
+                    )
+                    conn.executemany("DELETE FROM profiles WHERE path = ?", removed)
+            except sqlite3.Error as exception:
+                print("Warning - profile index could not be updated:", exception)
+        return entries
+
+    def _read(self, path, stat):
+        """Read header and description of a profile and return an index row
+
+        Invalid profiles get a row without header fields, so they're not read
+        again unless they change. Return None if the file can't be read.
+
+        """
+        from DisplayCAL import ICCProfile as ICCP
+
+        try:
+            profile = ICCP.ICCProfile(path, load=False)
+            fields = (
+                profile.profileClass,
+                profile.colorSpace,
+                profile.connectionColorSpace,
+                profile.version,
+                profile.ID,
+                profile.getDescription(),
+            )
+        except ICCP.ICCProfileInvalidError as exception:
+            print(exception)
+            fields = (None,) * 6
+        except EnvironmentError:
+            return None
+        except Exception as exception:
+            print(exception)
+            fields = (None,) * 6
+        return (path,) + stat + fields
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM profiles")
+                conn.close()
+            except (EnvironmentError, sqlite3.Error) as exception:
+                print("Warning - profile index could not be cleared:", exception)
+
+
+profile_index = ProfileIndex()
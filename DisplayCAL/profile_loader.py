@@ -58,6 +58,7 @@ if sys.platform == "win32":
     from DisplayCAL.debughelpers import Error, UnloggedError, handle_error
     from DisplayCAL.edid import get_edid
     from DisplayCAL.meta import DOMAIN
+    from DisplayCAL.profile_index import profile_index
 
     from DisplayCAL.systrayicon import Menu, MenuItem, SysTrayIcon
     from DisplayCAL.util_list import natsort_key_factory
@@ -895,19 +896,16 @@ if sys.platform == "win32":
             list_ctrl.Bind(wx.EVT_LIST_ITEM_DESELECTED, lambda e: dlg.ok.Disable())
             list_ctrl.Bind(wx.EVT_LIST_ITEM_ACTIVATED, lambda e: dlg.EndModal(wx.ID_OK))
             profiles = []
-            for pth in safe_glob(os.path.join(iccprofiles[0], "*.ic[cm]")) + safe_glob(
+            paths = safe_glob(os.path.join(iccprofiles[0], "*.ic[cm]")) + safe_glob(
                 os.path.join(iccprofiles[0], "*.cdmp")
-            ):
-                try:
-                    profile = ICCP.ICCProfile(pth)
-                except ICCP.ICCProfileInvalidError as exception:
-                    print("%s:" % pth, exception)
-                    continue
-                except IOError as exception:
-                    print(exception)
-                    continue
-                if profile.profileClass == b"mntr":
-                    profiles.append((profile.getDescription(), os.path.basename(pth)))
+            )
+            # Header fields and descriptions come from the persistent profile
+            # index, so only new or changed profiles need to be read
+            for entry in profile_index.get(paths):
+                if entry.profileClass == b"mntr":
+                    profiles.append(
+                        (entry.getDescription(), os.path.basename(entry.fileName))
+                    )
             natsort_key = natsort_key_factory()
             profiles.sort(key=lambda item: natsort_key(item[0]))
             for i, (desc, profile) in enumerate(profiles):
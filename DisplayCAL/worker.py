@@ -149,7 +149,7 @@ from DisplayCAL.edid import WMIError, get_edid
 from DisplayCAL.log import DummyLogger, LogFile, get_file_logger, log
 from DisplayCAL import madvr
 from DisplayCAL.meta import VERSION, VERSION_BASE, DOMAIN, name as appname, version
-from DisplayCAL.multiprocess import cpu_count, pool_slice
+from DisplayCAL.multiprocess import cpu_count, pool_slice, pool_slice_shared
 from DisplayCAL.options import (
     always_fail_download,
     debug,
@@ -256,6 +256,7 @@ from DisplayCAL.worker_base import (
     get_argyll_version_string as base_get_argyll_version_string,
     parse_argyll_version_string,
     printcmdline,
+    xicclu_pool,
 )
 from DisplayCAL.wxaddons import BetterCallLater, BetterWindowDisabler, wx
 from DisplayCAL.wxwindows import (
@@ -4696,10 +4697,10 @@ END_DATA
                     "Creating device link from %s lookup "
                     "(%i workers)...\n" % (direction, num_workers)
                 )
-                RGB_dst_out = []
-                for slices in pool_slice(
+                RGB_dst_out = pool_slice_shared(
                     _mp_xicclu,
                     XYZ_src_out,
+                    None,
                     (profile_out.fileName, intent[0], "b" if use_b2a else "if"),
                     {
                         "pcs": "x",
@@ -4710,8 +4711,7 @@ END_DATA
                     self.thread_abort,
                     logfiles,
                     num_batches=num_batches,
-                ):
-                    RGB_dst_out.extend(slices)
+                ).tolist()
                 del XYZ_src_out
                 logfiles.write("\n")
                 logfiles.write("Filling cLUT...\n")
@@ -11401,25 +11401,25 @@ usage: spotread [-options] [logfile]
                                 num_workers = 1
                             else:
                                 num_workers = None
-                            table.clut = sum(
-                                pool_slice(
-                                    ICCP._mp_apply,
-                                    table.clut,
-                                    (
-                                        profile.connectionColorSpace,
-                                        colormath.matmul,
-                                        (m4, m2),
-                                        D50,
-                                        interp,
-                                        rinterp,
-                                        lang.getstr("aborted"),
-                                    ),
-                                    {},
-                                    num_workers,
-                                    self.thread_abort,
+                            clut = []
+                            for slices in pool_slice(
+                                ICCP._mp_apply,
+                                table.clut,
+                                (
+                                    profile.connectionColorSpace,
+                                    colormath.matmul,
+                                    (m4, m2),
+                                    D50,
+                                    interp,
+                                    rinterp,
+                                    lang.getstr("aborted"),
                                 ),
-                                [],
-                            )
+                                {},
+                                num_workers,
+                                self.thread_abort,
+                            ):
+                                clut.extend(slices)
+                            table.clut = clut
 
                 # A2B processing
                 process_A2B = (
@@ -11652,16 +11652,16 @@ usage: spotread [-options] [logfile]
                 options_dispcal = get_options_from_cal(cgats)[0]
                 is_hq_cal = "qh" in options_dispcal
 
-        dEs = []
         RGB_XYZ = dict_sort(RGB_XYZ)
-        for X, Y, Z in RGB_XYZ.values():
-            if Y >= 1:
-                X, Y, Z = colormath.adapt(X, Y, Z, RGB_XYZ[(100, 100, 100)], cat=cat)
-                L, a, b = colormath.XYZ2Lab(X, Y, Z)
-                dE = colormath.delta(L, 0, 0, L, a, b, "00")["E"]
-                dEs.append(dE)
-                if debug or verbose > 1:
-                    self.log("L* %5.2f a* %5.2f b* %5.2f dE*00 %4.2f" % (L, a, b, dE))
+        gray_XYZ = [XYZ for XYZ in RGB_XYZ.values() if XYZ[1] >= 1]
+        gray_Lab = colormath.np.XYZ2Lab(
+            colormath.np.adapt(gray_XYZ, RGB_XYZ[(100, 100, 100)], cat=cat)
+        )
+        # Compare against neutral (a* = b* = 0) at the same L*
+        dEs = colormath.np.delta(gray_Lab * (1, 0, 0), gray_Lab, "00")["E"].tolist()
+        if debug or verbose > 1:
+            for (L, a, b), dE in zip(gray_Lab.tolist(), dEs):
+                self.log("L* %5.2f a* %5.2f b* %5.2f dE*00 %4.2f" % (L, a, b, dE))
         dE_avg = sum(dEs) / len(dEs)
         dE_max = max(dEs)
         self.log("R=G=B (>= 1% luminance) dE*00 avg", dE_avg, "peak", dE_max)
@@ -15646,9 +15646,7 @@ BEGIN_DATA
                 cgats = CGATS.CGATS(cgats, True)
             else:
                 # Always make a copy and do not alter a passed in CGATS instance!
-                cgats_filename = cgats.filename
-                cgats = CGATS.CGATS(bytes(cgats))
-                cgats.filename = cgats_filename
+                cgats = cgats.copy()
             if 0 in cgats:
                 # only look at the first section
                 cgats[0].filename = cgats.filename
@@ -16075,7 +16073,7 @@ BEGIN_DATA
         ti3_filename = ti3.filename
         if copy:
             # Make a copy and do not alter a passed in CGATS instance!
-            ti3 = CGATS.CGATS(bytes(ti3))
+            ti3 = ti3.copy()
 
         if fields == "XYZ":
             labels = ("XYZ_X", "XYZ_Y", "XYZ_Z")
@@ -16801,6 +16799,9 @@ BEGIN_DATA
             print("[D] wrapup(copy=%s, remove=%s)" % (copy, remove))
         if not self.tempdir or not os.path.isdir(self.tempdir):
             return  # nothing to do
+        # End pooled xicclu processes, which may still have files in the
+        # temporary directory open
+        xicclu_pool.clear()
         if (
             isinstance(copy, Exception)
             and not isinstance(copy, (UnloggedError, UnloggedInfo, UnloggedWarning))
@@ -3,6 +3,7 @@
 
 from binascii import hexlify
 import atexit
+import hashlib
 import math
 import os
 import pipes
@@ -13,8 +14,12 @@ import subprocess as sp
 import sys
 import tempfile
 import textwrap
+import threading
+import time
 import traceback
 
+import numpy
+
 if sys.platform == "win32":
     import win32api
 
@@ -38,6 +43,7 @@ from DisplayCAL.debughelpers import (
     UnloggedWarning,
     Warn,
 )
+from DisplayCAL.defaultpaths import cache as cachepath
 from DisplayCAL.log import LogFile
 from DisplayCAL.meta import name as appname
 from DisplayCAL.multiprocess import mp, pool_slice
@@ -534,26 +540,100 @@ class WorkerBase(object):
         output data will be returned in same format, or as list of strings
         if 'raw' is true.
 
+        Forward lookups through profiles that ICCProfile.lookup supports are
+        done in-process without spawning xicclu. Otherwise, xicclu processes
+        are kept running and reused for subsequent lookups through the same
+        profile with the same options (see XiccluPool), and results are
+        cached on disk (see XiccluCache).
+
         """
-        with Xicclu(
+        if isinstance(profile, str) and not profile.lower().endswith(".cal"):
+            profile = ICCP.ICCProfile(profile)
+        if (
+            direction == "f"
+            and order == "n"
+            and not (raw or use_icclu or use_cam_clipping or get_clip)
+            and input_encoding in (None, "n")
+            and output_encoding in (None, "n")
+        ):
+            odata = self._lookup(profile, idata, intent, pcs, scale)
+            if odata is not None:
+                return odata
+        key = None
+        if not (raw or get_clip):
+            key = xicclu_cache.key(
+                profile,
+                idata,
+                intent,
+                direction,
+                order,
+                pcs,
+                scale,
+                use_icclu,
+                use_cam_clipping,
+                show_actual_if_clipped,
+                input_encoding,
+                output_encoding,
+            )
+        if key:
+            odata = xicclu_cache.get(key)
+            if odata is not None:
+                return odata
+        odata = xicclu_pool.xicclu(
             profile,
-            intent,
-            direction,
-            order,
-            pcs,
-            scale,
-            cwd,
-            startupinfo,
-            use_icclu,
-            use_cam_clipping,
-            logfile,
-            self,
-            show_actual_if_clipped,
-            input_encoding,
-            output_encoding,
-        ) as xicclu:
-            xicclu(idata)
-        return xicclu.get(raw, get_clip)
+            idata,
+            raw,
+            get_clip,
+            intent=intent,
+            direction=direction,
+            order=order,
+            pcs=pcs,
+            scale=scale,
+            cwd=cwd,
+            startupinfo=startupinfo,
+            use_icclu=use_icclu,
+            use_cam_clipping=use_cam_clipping,
+            logfile=logfile,
+            worker=self,
+            show_actual_if_clipped=show_actual_if_clipped,
+            input_encoding=input_encoding,
+            output_encoding=output_encoding,
+        )
+        if key:
+            xicclu_cache.set(key, odata)
+        return odata
+
+    def _lookup(self, profile, idata, intent="r", pcs=None, scale=1):
+        """Forward lookup using ICCProfile.lookup
+
+        Return None if the profile or data is not supported, in which case
+        xicclu needs to be used.
+
+        """
+        if isinstance(profile, str) and not profile.lower().endswith(".cal"):
+            profile = ICCP.ICCProfile(profile)
+        if not isinstance(profile, ICCP.ICCProfile) or isinstance(idata, str):
+            return None
+        idata = list(idata)
+        if idata and isinstance(idata[0], (float, int)):
+            idata = [idata]
+        if not idata or any(isinstance(v, str) for v in idata):
+            return None
+        try:
+            odata = profile.lookup(
+                [[n / float(scale) for n in v] for v in idata], intent, "f", pcs
+            )
+        except (NotImplementedError, ValueError) as exception:
+            if debug or verbose > 1:
+                self.log(exception)
+            return None
+        return odata.tolist()
+
+
+# Paths of temporary profiles written by Xicclu that haven't been removed yet.
+# They are never reused for another Xicclu instance, because the profile may
+# have changed in memory in the meantime.
+xicclu_temp_files = set()
 
 
 class Xicclu(WorkerBase):
@@ -585,6 +665,7 @@ class Xicclu(WorkerBase):
         self.logfile = logfile
         self.worker = worker
         self.temp = False
+        self.temp_fileName = None
         utilname = "icclu" if use_icclu else "xicclu"
         xicclu = get_argyll_util(utilname)
         if not xicclu:
@@ -605,8 +686,12 @@ class Xicclu(WorkerBase):
                     [lang.getstr("profile.iccv4.unsupported"), profile.getDescription()]
                 )
             )
-        if not profile.fileName or not os.path.isfile(profile.fileName):
-            if profile.fileName:
+        if (
+            not profile.fileName
+            or not os.path.isfile(profile.fileName)
+            or profile.fileName in xicclu_temp_files
+        ):
+            if profile.fileName and profile.fileName not in xicclu_temp_files:
                 prefix = os.path.basename(profile.fileName)
             elif is_profile:
                 prefix = (
@@ -624,7 +709,9 @@ class Xicclu(WorkerBase):
             fd, profile.fileName = tempfile.mkstemp("", prefix, dir=cwd)
             with os.fdopen(fd, "wb") as stream:
                 profile.write(stream)
+            xicclu_temp_files.add(profile.fileName)
             self.temp = True
+            self.temp_fileName = profile.fileName
         elif not cwd:
             cwd = os.path.dirname(profile.fileName)
         profile_basename = os.path.basename(profile.fileName)
@@ -720,18 +807,112 @@ class Xicclu(WorkerBase):
 
     def spawn(self):
         self.closed = False
-        self.output = []
         self.errors = []
-        self.stdout = tempfile.SpooledTemporaryFile()
+        self._output_lock = threading.Lock()
+        self._synced = threading.Event()
+        self._marker = None
+        self._syncs = 0
+        self.reset()
         self.stderr = tempfile.SpooledTemporaryFile()
         self.subprocess = sp.Popen(
             self.args,
             stdin=sp.PIPE,
-            stdout=self.stdout,
+            stdout=sp.PIPE,
             stderr=self.stderr,
             cwd=self.cwd,
             startupinfo=self.startupinfo,
         )
+        # Read output concurrently so we can write input in large chunks
+        # without xicclu blocking on a full stdout pipe
+        self._reader = threading.Thread(
+            target=self._read_output, name="XiccluOutputReader"
+        )
+        self._reader.daemon = True
+        self._reader.start()
+
+    def reset(self):
+        """Reset output and throughput counters for the next batch of input"""
+        self.output = []
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed = 0
+        self._start = time.time()
+        self._output_chunks = []
+        self._output_data = b""
+
+    def _read_output(self):
+        stdout = self.subprocess.stdout
+        tail = b""
+        while True:
+            data = stdout.read1(65536)
+            if not data:
+                break
+            with self._output_lock:
+                self._output_chunks.append(data)
+                self.bytes_out += len(data)
+                if self._marker:
+                    tail += data
+                    if self._marker in tail:
+                        self._synced.set()
+                    tail = tail[-len(self._marker) :]
+        # EOF, wake up sync() if it is waiting
+        self._synced.set()
+
+    def sync(self, timeout=2):
+        """Wait until all input written so far has been processed and make
+        the output available to get() without ending the xicclu process
+
+        A comment line is written after the input, which xicclu echoes back
+        after processing all preceding lines. If the echo doesn't arrive
+        and no output has been received for <timeout> seconds (e.g. because
+        xicclu's output is block buffered), the process is closed instead.
+
+        Return True if the process is still alive and can be fed more input.
+
+        """
+        if self.closed:
+            return False
+        p = self.subprocess
+        self._syncs += 1
+        marker = b"#sync%i" % self._syncs
+        with self._output_lock:
+            self._marker = marker
+            self._synced.clear()
+        try:
+            p.stdin.write(marker + b"\n")
+            p.stdin.flush()
+        except IOError:
+            pass
+        bytes_out = -1
+        while not self._synced.wait(timeout):
+            if self.bytes_out == bytes_out:
+                break
+            bytes_out = self.bytes_out
+        with self._output_lock:
+            data = b"".join(self._output_chunks)
+            alive = marker in data and p.poll() is None
+            if alive:
+                self._output_chunks = []
+                self._marker = None
+        if not alive:
+            self.close()
+            data = self._output_data
+        self.elapsed = time.time() - self._start
+        # Remove the echoed comment line and any blank line left over from
+        # the previous sync
+        self._output_data = data.partition(marker)[0].lstrip(b"\r\n")
+        self.output = self._output_data.splitlines(True)
+        return alive
+
+    @property
+    def throughput(self):
+        """Return number of input rows processed per second"""
+        elapsed = self.elapsed or time.time() - self._start
+        if not elapsed:
+            return 0.0
+        return self.rows_in / elapsed
 
     def devi_devip(self, n):
         if n > 236 / 256.0:
@@ -739,36 +920,33 @@ class Xicclu(WorkerBase):
         return VidRGB_to_cLUT65(eeColor_to_VidRGB(n))
 
     def __call__(self, idata):
-        if not isinstance(idata, str):
-            verbose = self.verbose
-            if self.convert_video_rgb_to_clut65:
-                devi_devip = self.devi_devip
-            else:
-                devi_devip = lambda v: v
-            scale = float(self.scale)
-            idata = list(idata)  # Make a copy
-            for i, v in enumerate(idata):
-                if isinstance(v, (float, int)):
-                    self([idata])
-                    return
-                if not isinstance(v, str):
-                    if verbose:
-                        for n in v:
-                            if not isinstance(n, (float, int)):
-                                raise TypeError(
-                                    "xicclu: Expecting list of "
-                                    "strings or n-tuples with "
-                                    "floats"
-                                )
-                    idata[i] = " ".join(str(devi_devip(n / scale) * scale) for n in v)
-        else:
+        if isinstance(idata, str):
             idata = idata.splitlines()
+        else:
+            idata = list(idata)  # Make a copy
+            if any(isinstance(v, (float, int)) for v in idata):
+                self([idata])
+                return
         numrows = len(idata)
-        chunklen = 1000
-        i = 0
+        chunks = None
+        if (
+            not self.convert_video_rgb_to_clut65
+            and idata
+            and not any(isinstance(v, str) for v in idata)
+        ):
+            try:
+                array = numpy.asarray(idata, dtype=numpy.float64)
+            except (TypeError, ValueError):
+                pass
+            else:
+                if array.ndim == 2:
+                    chunks = self._format_array(array)
+        if chunks is None:
+            chunks = self._format_rows(idata)
         p = self.subprocess
         prevperc = -1
-        while True:
+        rows_written = 0
+        for rows, data in chunks:
             # Process in chunks to prevent broken pipe if input data is too
             # large
             if getattr(sys, "_sigbreak", False) and not self.subprocess_abort:
@@ -783,19 +961,60 @@ class Xicclu(WorkerBase):
             if p.poll() is None:
                 # We don't use communicate() because it will end the
                 # process
-                joined_data = "\n".join(idata[chunklen * i: chunklen * (i + 1)]) + "\n"
-                p.stdin.write(joined_data.encode())
+                p.stdin.write(data)
                 p.stdin.flush()
+                self.bytes_in += len(data)
             else:
                 # Error
                 break
-            perc = round(chunklen * (i + 1) / float(numrows) * 100)
+            rows_written += rows
+            self.rows_in += rows
+            perc = round(rows_written / float(numrows) * 100)
             if perc > prevperc and self.logfile:
                 self.logfile.write("\r%i%%" % min(perc, 100))
                 prevperc = perc
-            if chunklen * (i + 1) > numrows - 1:
-                break
-            i += 1
+
+    def _format_array(self, array, chunklen=10000):
+        """Yield (number of rows, bytes) chunks of formatted input rows
+
+        Rows are passed through unchanged (video RGB to cLUT65 conversion
+        uses _format_rows).
+
+        """
+        # Format a whole chunk with a single string formatting operation.
+        # 17 significant digits round-trip any double exactly
+        fmt = " ".join(["%.17g"] * array.shape[1]) + "\n"
+        for i in range(0, len(array), chunklen):
+            chunk = array[i : i + chunklen]
+            data = (fmt * len(chunk)) % tuple(chunk.ravel().tolist())
+            yield len(chunk), data.encode()
+
+    def _format_rows(self, idata, chunklen=1000):
+        """Yield (number of rows, bytes) chunks of formatted input rows
+
+        Slow path for string rows and video RGB to cLUT65 conversion.
+
+        """
+        verbose = self.verbose
+        if self.convert_video_rgb_to_clut65:
+            devi_devip = self.devi_devip
+        else:
+            devi_devip = lambda v: v
+        scale = float(self.scale)
+        for i, v in enumerate(idata):
+            if not isinstance(v, str):
+                if verbose:
+                    for n in v:
+                        if not isinstance(n, (float, int)):
+                            raise TypeError(
+                                "xicclu: Expecting list of "
+                                "strings or n-tuples with "
+                                "floats"
+                            )
+                idata[i] = " ".join(str(devi_devip(n / scale) * scale) for n in v)
+        for i in range(0, max(len(idata), 1), chunklen):
+            chunk = idata[i : i + chunklen]
+            yield len(chunk), ("\n".join(chunk) + "\n").encode()
 
     def __enter__(self):
         return self
@@ -816,14 +1035,28 @@ class Xicclu(WorkerBase):
                 pass
             p.stdin.close()
         p.wait()
-        self.stdout.seek(0)
-        self.output = self.stdout.readlines()
-        self.stdout.close()
+        self._reader.join()
+        p.stdout.close()
+        self.elapsed = time.time() - self._start
+        self._output_data = b"".join(self._output_chunks)
+        self._output_chunks = []
+        self.output = self._output_data.splitlines(True)
         self.stderr.seek(0)
         self.errors = self.stderr.readlines()
         self.stderr.close()
-        if self.sessionlogfile and self.errors:
-            self.sessionlogfile.write("\n".join(self.errors))
+        if self.sessionlogfile:
+            if self.errors:
+                self.sessionlogfile.write("\n".join(self.errors))
+            self.sessionlogfile.write(
+                "%i rows, %i bytes in, %i bytes out, %.3fs (%.0f rows/s)"
+                % (
+                    self.rows_in,
+                    self.bytes_in,
+                    self.bytes_out,
+                    self.elapsed,
+                    self.throughput,
+                )
+            )
         if self.logfile:
             self.logfile.write("\n")
         self.closed = True
@@ -835,6 +1068,7 @@ class Xicclu(WorkerBase):
         self.close(raise_exception)
         if self.temp and os.path.isfile(self.profile_path):
             os.remove(self.profile_path)
+            xicclu_temp_files.discard(self.temp_fileName)
             if self.tempdir and not os.listdir(self.tempdir):
                 try:
                     shutil.rmtree(self.tempdir, True)
@@ -850,6 +1084,10 @@ class Xicclu(WorkerBase):
                 self.sessionlogfile.write("\n".join(self.output))
                 self.sessionlogfile.close()
             return self.output
+        if not self.sessionlogfile and not (get_clip and self.show_actual_if_clipped):
+            parsed = self._get_fast(get_clip, output_format, reverse)
+            if parsed is not None:
+                return parsed
         parsed = []
         j = 0
         verbose = self.verbose
@@ -910,6 +1148,108 @@ class Xicclu(WorkerBase):
             self.sessionlogfile.close()
         return parsed
 
+    def _get_fast(self, get_clip=False, output_format=None, reverse=False):
+        """Array based implementation of get()
+
+        Return None if the slow path needs to be used.
+
+        """
+        try:
+            values, clip = self._parse_output(get_clip)
+        except ValueError:
+            # Inconsistent number of values per line
+            return None
+        if reverse:
+            values = values[:, ::-1]
+        if output_format:
+            return self._pack_array(values, output_format)
+        values = values / float(self.output_scale)
+        if self.convert_video_rgb_to_clut65:
+            values = VidRGB_to_eeColor(values)
+        parsed = values.tolist()
+        if get_clip:
+            if clip is None:
+                clip = [None] * len(parsed)
+            else:
+                clip = clip.tolist()
+            for row, row_clip in zip(parsed, clip):
+                row.append(row_clip)
+        return parsed
+
+    def _parse_output(self, get_clip=False):
+        """Parse xicclu output with a bulk float conversion
+
+        Return a tuple of the raw output values as array of shape
+        (<rows>, <channels>) and an array of clip flags (None if clip flags
+        were not requested or xicclu was not verbose).
+
+        """
+        data = self._output_data
+        clip = None
+        if self.verbose:
+            # Output values are after the last "->", followed by the color
+            # space and optional clip indicator, e.g.
+            # 0.5 0.5 0.5 [RGB] -> Lut -> 21.04 21.75 18.22 [XYZ] (clip)
+            lines = [
+                line.rpartition(b"->")[2].rstrip()
+                for line in data.splitlines()
+                if b"->" in line and not line.lstrip().startswith(b"[")
+            ]
+            if get_clip:
+                clip = numpy.array([line.endswith(b"(clip)") for line in lines])
+            lines = [line.rpartition(b"[")[0] for line in lines]
+        else:
+            lines = [line for line in data.splitlines() if line.strip()]
+        channels = len(lines[0].split()) if lines else 0
+        values = numpy.fromstring(b" ".join(lines), sep=" ")
+        if values.size != len(lines) * channels:
+            raise ValueError("Unexpected xicclu output")
+        values = values.reshape(-1, channels or 1)[:, :channels]
+        self.rows_out = len(values)
+        return values, clip
+
+    def get_array(self, get_clip=False):
+        """Return xicclu output as array of shape (<rows>, <channels>)
+
+        Values are scaled like the ones returned by get(). If get_clip is
+        True, return a tuple of the array and a boolean array of clip flags
+        (None if xicclu was not verbose).
+
+        """
+        values, clip = self._parse_output(get_clip)
+        values = values / float(self.output_scale)
+        if self.convert_video_rgb_to_clut65:
+            values = VidRGB_to_eeColor(values)
+        if get_clip:
+            return values, clip
+        return values
+
+    def _pack_array(self, values, output_format):
+        """Pack raw output values with output_format into one bytes object
+        per row
+
+        Return None if the format can't be handled with numpy or values are
+        out of range, so the slow path (which raises struct.error in that
+        case) can be used.
+
+        """
+        fmt, maxv = output_format
+        try:
+            dtype = numpy.dtype(fmt)
+        except TypeError:
+            return None
+        values = values / float(self.scale)
+        if self.convert_video_rgb_to_clut65:
+            values = VidRGB_to_eeColor(values)
+        values = numpy.rint(values * maxv)
+        if dtype.kind in "iu" and values.size:
+            info = numpy.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max:
+                return None
+        data = values.astype(dtype).tobytes()
+        rowlen = values.shape[1] * dtype.itemsize
+        return [data[i : i + rowlen] for i in range(0, len(data), rowlen)]
+
     @property
     def subprocess_abort(self):
         if self.worker:
@@ -1025,3 +1365,342 @@ class MP_Xicclu(Xicclu):
             else:
                 self._out.extend(slices)
         return self._out
+
+
+class XiccluPool(object):
+    """Pool of persistent xicclu processes
+
+    Processes are keyed by profile ID, intent, direction, PCS and order (plus
+    the remaining xicclu options) and are kept running for reuse until they
+    have been idle for idle_timeout seconds.
+
+    """
+
+    def __init__(self, idle_timeout=30, maxsize=8, sync_timeout=2):
+        self.idle_timeout = idle_timeout
+        self.maxsize = maxsize
+        self.sync_timeout = sync_timeout
+        # Disabled if xicclu doesn't echo sync markers
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._idle = []  # (key, xicclu, last used) tuples, oldest first
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def key(self, profile, *options):
+        """Return the pool key for profile and xicclu options, or None if
+        the profile can't be used with a pooled process"""
+        if not isinstance(profile, ICCP.ICCProfile):
+            return None
+        if (
+            not profile.fileName
+            or profile.fileName in xicclu_temp_files
+            or not os.path.isfile(profile.fileName)
+        ):
+            # Xicclu writes the profile to a new temporary file, so the
+            # process uses the profile as it is in memory
+            return (hashlib.md5(profile.data).hexdigest(), None) + options
+        # xicclu reads the profile from disk if it exists, so make sure a
+        # changed file results in a different key
+        st = os.stat(profile.fileName)
+        stat = (profile.fileName, st.st_mtime, st.st_size)
+        return (profile.calculateID(False), stat) + options
+
+    def acquire(
+        self,
+        profile,
+        intent="r",
+        direction="f",
+        order="n",
+        pcs=None,
+        scale=1,
+        cwd=None,
+        startupinfo=None,
+        use_icclu=False,
+        use_cam_clipping=False,
+        logfile=None,
+        worker=None,
+        show_actual_if_clipped=False,
+        input_encoding=None,
+        output_encoding=None,
+    ):
+        """Return a tuple of a Xicclu instance and its pool key
+
+        The key is None if the instance should not be returned to the pool.
+
+        """
+        if isinstance(profile, str) and not profile.lower().endswith(".cal"):
+            profile = ICCP.ICCProfile(profile)
+        options = (
+            intent,
+            direction,
+            pcs,
+            order,
+            scale,
+            use_icclu,
+            use_cam_clipping,
+            show_actual_if_clipped,
+            input_encoding,
+            output_encoding,
+        )
+        key = None
+        # Session logfiles are closed by Xicclu.get(), and icclu is not
+        # known to echo sync markers
+        if self.enabled and not (debug or verbose > 1 or use_icclu):
+            key = self.key(profile, *options)
+        if key:
+            with self._lock:
+                for i, (idle_key, xicclu, last_used) in enumerate(self._idle):
+                    if idle_key == key:
+                        del self._idle[i]
+                        break
+                else:
+                    xicclu = None
+            if xicclu and xicclu.isalive():
+                self.hits += 1
+                xicclu.reset()
+                xicclu.logfile = logfile
+                xicclu.worker = worker
+                return xicclu, key
+            if xicclu:
+                xicclu.exit(raise_exception=False)
+            self.misses += 1
+        xicclu = Xicclu(
+            profile,
+            intent,
+            direction,
+            order,
+            pcs,
+            scale,
+            cwd,
+            startupinfo,
+            use_icclu,
+            use_cam_clipping,
+            logfile,
+            worker,
+            show_actual_if_clipped,
+            input_encoding,
+            output_encoding,
+        )
+        return xicclu, key
+
+    def release(self, key, xicclu):
+        """Return a Xicclu instance to the pool"""
+        xicclu.logfile = None
+        xicclu.worker = None
+        with self._lock:
+            self._idle.append((key, xicclu, time.time()))
+            excess = self._idle[: max(len(self._idle) - self.maxsize, 0)]
+            del self._idle[: len(excess)]
+            if not self._timer:
+                self._timer = threading.Timer(self.idle_timeout, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        for key, xicclu, last_used in excess:
+            xicclu.exit(raise_exception=False)
+
+    def xicclu(self, profile, idata, raw=False, get_clip=False, **kwargs):
+        """Look up idata through profile using a pooled xicclu process if
+        possible and return the output like WorkerBase.xicclu
+
+        Remaining keyword arguments are passed to acquire().
+
+        """
+        xicclu, key = self.acquire(profile, **kwargs)
+        if not key:
+            with xicclu:
+                xicclu(idata)
+            return xicclu.get(raw, get_clip)
+        try:
+            xicclu(idata)
+            alive = xicclu.sync(self.sync_timeout)
+        except BaseException:
+            xicclu.exit(raise_exception=False)
+            raise
+        odata = xicclu.get(raw, get_clip)
+        if alive:
+            self.release(key, xicclu)
+        else:
+            if not xicclu.subprocess.returncode:
+                # Sync marker was not echoed, don't try again
+                self.enabled = False
+            xicclu.exit()
+        return odata
+
+    def evict(self, max_idle=None):
+        """End processes that have been idle for more than max_idle seconds
+        (all idle processes if max_idle is None)"""
+        now = time.time()
+        with self._lock:
+            evicted = [
+                entry
+                for entry in self._idle
+                if max_idle is None or now - entry[2] > max_idle
+            ]
+            self._idle = [entry for entry in self._idle if entry not in evicted]
+        for key, xicclu, last_used in evicted:
+            xicclu.exit(raise_exception=False)
+        return len(evicted)
+
+    def clear(self):
+        """End all idle processes"""
+        self.evict()
+
+    def _on_timer(self):
+        self.evict(self.idle_timeout)
+        with self._lock:
+            self._timer = None
+            if self._idle:
+                self._timer = threading.Timer(self.idle_timeout, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+
+class XiccluCache(object):
+    """On-disk cache of xicclu lookup results
+
+    Results are stored as NumPy arrays named after a hash of the profile,
+    the lookup options and the input values. If the total size of the cache
+    exceeds maxsize bytes, least recently used entries are removed.
+
+    """
+
+    def __init__(self, path=None, maxsize=64 * 1024 * 1024):
+        if not path:
+            path = os.path.join(cachepath, appname, "xicclu")
+        self.path = path
+        self.maxsize = maxsize
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        profile,
+        idata,
+        intent="r",
+        direction="f",
+        order="n",
+        pcs=None,
+        scale=1,
+        use_icclu=False,
+        use_cam_clipping=False,
+        show_actual_if_clipped=False,
+        input_encoding=None,
+        output_encoding=None,
+    ):
+        """Return the cache key for a lookup, or None if the lookup can't be
+        cached"""
+        if (
+            not self.enabled
+            or not isinstance(profile, ICCP.ICCProfile)
+            or isinstance(idata, str)
+        ):
+            return None
+        try:
+            idata = numpy.asarray(idata, dtype=numpy.float64)
+        except (TypeError, ValueError):
+            return None
+        if idata.ndim == 1:
+            idata = idata.reshape((1, -1))
+        if idata.ndim != 2 or not idata.size:
+            return None
+        # xicclu reads the profile from disk if it exists
+        if profile.fileName and os.path.isfile(profile.fileName):
+            with open(profile.fileName, "rb") as profile_file:
+                profile_md5 = hashlib.md5(profile_file.read()).hexdigest()
+        else:
+            profile_md5 = hashlib.md5(profile.data).hexdigest()
+        # Results also depend on the ArgyllCMS version
+        exe = get_argyll_util("icclu" if use_icclu else "xicclu")
+        exe_stat = None
+        if exe and os.path.isfile(exe):
+            st = os.stat(exe)
+            exe_stat = (exe, st.st_mtime, st.st_size)
+        md5 = hashlib.md5(
+            repr(
+                (
+                    profile_md5,
+                    exe_stat,
+                    intent,
+                    direction,
+                    order,
+                    pcs,
+                    scale,
+                    use_icclu,
+                    use_cam_clipping,
+                    show_actual_if_clipped,
+                    input_encoding,
+                    output_encoding,
+                    idata.shape,
+                )
+            ).encode()
+        )
+        md5.update(idata.tobytes())
+        return md5.hexdigest()
+
+    def get(self, key):
+        """Return cached output for key as list of lists, or None"""
+        path = os.path.join(self.path, key + ".npy")
+        try:
+            odata = numpy.load(path, allow_pickle=False)
+            # Mark as recently used
+            os.utime(path)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return odata.tolist()
+
+    def set(self, key, odata):
+        """Store output for key"""
+        try:
+            odata = numpy.asarray(odata, dtype=numpy.float64)
+        except (TypeError, ValueError):
+            return
+        if odata.ndim != 2:
+            return
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            fd, tmp_path = tempfile.mkstemp(".tmp", key, dir=self.path)
+            with os.fdopen(fd, "wb") as stream:
+                numpy.save(stream, odata, allow_pickle=False)
+            os.replace(tmp_path, os.path.join(self.path, key + ".npy"))
+        except (IOError, OSError) as exception:
+            print("Warning - xicclu cache could not be written:", exception)
+            return
+        self.trim()
+
+    def trim(self, maxsize=None):
+        """Remove least recently used entries until the cache doesn't
+        exceed maxsize bytes (default self.maxsize)"""
+        if maxsize is None:
+            maxsize = self.maxsize
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.path)
+                if entry.name.endswith(".npy")
+            ]
+        except (IOError, OSError):
+            return
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, path in sorted(entries):
+            if size <= maxsize:
+                break
+            try:
+                os.remove(path)
+            except (IOError, OSError):
+                pass
+            size -= entry_size
+
+    def clear(self):
+        """Remove all entries"""
+        self.trim(0)
+
+
+xicclu_pool = XiccluPool()
+atexit.register(xicclu_pool.clear)
+xicclu_cache = XiccluCache()
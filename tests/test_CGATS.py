@@ -1100,3 +1100,250 @@ def test_fix_zero_measurements(
     assert len(cgats[0]["DATA"]) == unfiltered_sets if warn else filtered_sets
     if not warn:
         assert cgats[0]["DATA"][0] == result
+
+
+def test_cgats_data_samples_are_created_on_access(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA samples parsed into columns."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    assert len(data) == 3
+    assert not cgats.modified
+    # Queries only create the samples that match
+    white = cgats.queryi1({"RGB_R": 100, "RGB_G": 100, "RGB_B": 100})
+    assert white is data[0]
+    assert dict.get(data, 1) is CGATS.LAZY_SAMPLE
+    sample = data[1]
+    assert sample == {
+        "SAMPLE_ID": 2,
+        "RGB_R": 0.0,
+        "RGB_G": 0.0,
+        "RGB_B": 0.0,
+        "XYZ_X": 0.119951,
+        "XYZ_Y": 0.129559,
+        "XYZ_Z": 0.239291,
+    }
+    assert sample.key == 1
+    assert sample.parent is data
+    assert sample.root is cgats
+    assert sample.type == b"SAMPLE"
+    assert data[1] is sample
+    assert not cgats.modified
+
+
+def test_cgats_data_columns_are_updated(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA sample changes with columns."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    data[2]["XYZ_Y"] = 0.5
+    assert cgats.modified
+    assert cgats.queryi1({"XYZ_Y": 0.5}) is data[2]
+    data.remove(0)
+    assert list(data.keys()) == [0, 1]
+    assert data[1]["XYZ_Y"] == 0.5
+    assert data[1]["RGB_R"] == 6.25
+    assert b"\n2 6.250000 6.250000 6.250000 0.321875 0.500000 0.479568\n" in bytes(
+        cgats
+    )
+
+
+def test_cgats_data_sample_update_and_setdefault(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` sample update and setdefault with
+    columns."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    white = cgats.queryi({"RGB_R": 100, "RGB_G": 100, "RGB_B": 100})
+    for i in white:
+        white[i].update({"XYZ_X": 95.0, "XYZ_Y": 99.0, "XYZ_Z": 108.0})
+    assert data.column("XYZ_Y").tolist()[0] == 99.0
+    assert b"\n1 100.0000 100.0000 100.0000 95.00000 99.00000 108.0000\n" in bytes(
+        cgats
+    )
+    assert data[1].setdefault("XYZ_Y", 1.0) == 0.129559
+    assert data[2].setdefault("XYZ_Y") == 0.348479
+    assert data.setdefault(2) is data[2]
+    assert dict.get(data, 1) is not CGATS.LAZY_SAMPLE
+    data[1].update(XYZ_Y=0.25)
+    assert data.column("XYZ_Y").tolist() == [99.0, 0.25, 0.348479]
+
+
+def test_cgats_data_dict_creates_samples(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA samples kept in columns don't leak
+    as placeholders."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    samples = dict(data)
+    assert samples[1] is data[1]
+    assert {**data}[2] is data[2]
+    assert CGATS.LAZY_SAMPLE not in dict.values(data)
+
+
+def test_cgats_data_with_wrong_number_of_values() -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA with a malformed sample."""
+    with pytest.raises(CGATS.CGATSTypeError):
+        CGATS.CGATS(
+            b"CTI1\n\nBEGIN_DATA_FORMAT\nSAMPLE_ID RGB_R\nEND_DATA_FORMAT\n"
+            b"BEGIN_DATA\n1 0\n2\nEND_DATA\n"
+        )
+
+
+def test_cgats_data_column(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA column and columns methods."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    Y = data.column("XYZ_Y")
+    assert Y.tolist() == [100.0, 0.129559, 0.348479]
+    with pytest.raises(ValueError):
+        Y[0] = 50.0
+    data[0]["XYZ_Y"] = 50.0
+    assert Y[0] == 50.0
+    assert data.columns(("RGB_R", "RGB_G", "RGB_B")).shape == (3, 3)
+    assert data.columns(("RGB_R", "XYZ_Y")).tolist()[2] == [6.25, 0.348479]
+    with pytest.raises(CGATS.CGATSKeyError):
+        data.column("LAB_L")
+    with pytest.raises(CGATS.CGATSInvalidOperationError):
+        cgats[0].column("XYZ_Y")
+    assert dict.get(data, 1) is CGATS.LAZY_SAMPLE
+
+
+def test_cgats_data_set_column(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA set_column and set_columns methods."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    sample = data[2]
+    data.set_columns(("RGB_R", "RGB_G"), [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    assert cgats.modified
+    assert sample["RGB_G"] == 6.0
+    assert data[1]["RGB_R"] == 3.0
+    assert data.column("RGB_R").tolist() == [1.0, 3.0, 5.0]
+    with pytest.raises(CGATS.CGATSValueError):
+        data.set_column("RGB_B", [1.0, 2.0])
+    assert b"\n3 5.000000 6.000000 6.250000 " in bytes(cgats)
+
+
+@pytest.mark.parametrize("columns", (True, False), ids=("columns", "samples"))
+def test_cgats_bytes_data(columns: bool) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA output of unusual values."""
+    cgats = CGATS.CGATS(
+        b"CTI1\n\nBEGIN_DATA_FORMAT\nSAMPLE_ID RGB_R XYZ_X XYZ_Y\nEND_DATA_FORMAT\n"
+        b"BEGIN_DATA\n1 0 -0.5 1e-05\n2 100 12345.678 nan\n3 1.5e-05 -0 1e16\n"
+        b"END_DATA\n"
+    )
+    if not columns:
+        # Only keep the values in the samples
+        cgats[0]["DATA"]._create_samples(True)
+    assert bytes(cgats).endswith(
+        b"BEGIN_DATA\n"
+        b"1 0.000000000000000 -0.500000000000000 1e-05\n"
+        b"2 100.0000000000000 12345.67800000000 nan\n"
+        b"3 0.000000000000000 -0.00000000000000 1e+16\n"
+        b"END_DATA\n"
+    )
+
+
+def test_cgats_bytes_data_reads_samples(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` DATA output uses the values of created
+    samples."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    data = cgats[0]["DATA"]
+    dict.__setitem__(data[1], "XYZ_Y", 0.5)
+    dict.__setitem__(data[2], "RGB_R", 7)
+    assert data._columns is not None
+    assert b"\n2 0.000000 0.000000 0.000000 0.119951 0.500000 0.239291\n" in bytes(
+        cgats
+    )
+    assert b"\n3 7 6.250000 6.250000 0.321875 0.348479 0.479568\n" in bytes(cgats)
+    assert data.column("XYZ_Y").tolist() == [100.0, 0.129559, 0.348479]
+
+
+def test_cgats_copy(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` copy method."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    cgats[0]["DATA"][1]["XYZ_Y"]
+    copy = cgats.copy()
+    assert copy == cgats
+    assert bytes(copy) == bytes(cgats)
+    assert copy.filename == cgats.filename
+    assert copy[0].parent is copy
+    assert copy[0]["DATA"].root is copy
+    assert copy[0]["DATA"][1] is not cgats[0]["DATA"][1]
+    assert copy[0]["DATA"][1].parent is copy[0]["DATA"]
+    # Changes to either one don't affect the other
+    copy[0]["DATA"][1]["XYZ_Y"] = 0.5
+    cgats[0]["DATA"][2]["XYZ_Y"] = 0.25
+    copy[0].add_keyword("COPIED", "YES")
+    assert cgats[0]["DATA"].column("XYZ_Y").tolist() == [100.0, 0.129559, 0.25]
+    assert copy[0]["DATA"].column("XYZ_Y").tolist() == [100.0, 0.5, 0.348479]
+    assert "COPIED" not in cgats[0]
+    assert copy.modified
+    assert cgats.modified
+
+
+def test_cgats_copy_section(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` copy method with a section."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    cgats.queryi1({"RGB_R": 100})
+    copy = cgats[0].copy()
+    assert copy == cgats[0]
+    assert bytes(copy) == bytes(cgats[0])
+    assert copy.parent is None
+    assert copy.root is copy
+    assert copy["DATA_FORMAT"].root is copy
+    assert copy.__dict__.get("_index") is None
+    copy.DATA[0]["RGB_R"] = 50.0
+    assert cgats[0]["DATA"][0]["RGB_R"] == 100.0
+    assert not cgats.modified
+    assert copy.modified
+    assert cgats.queryi1({"RGB_R": 50}) is None
+
+
+def test_cgats_copy_file_identifier() -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` copy keeps the file identifier."""
+    cgats = CGATS.CGATS(
+        b"BEGIN_DATA_FORMAT\nSAMPLE_ID RGB_R\nEND_DATA_FORMAT\n"
+        b"BEGIN_DATA\n1 0\nEND_DATA\n",
+        file_identifier=b"CAL",
+    )
+    copy = cgats.copy()
+    assert copy.file_identifier == b"CAL"
+    assert copy["DATA"].column("RGB_R").tolist() == [0.0]
+    assert bytes(copy) == bytes(cgats)
+
+
+def test_cgats_query_after_changes(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` query after keywords and fields were
+    added or removed."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    assert cgats.queryv1("QUERIED") is None
+    assert cgats.queryi1({"RGB_R": 50.0}) is None
+    cgats[1].add_keyword("QUERIED", b"YES")
+    assert cgats.queryv1("QUERIED") == b"YES"
+    cgats[0]["DATA"][2]["RGB_R"] = 50.0
+    assert cgats.queryi1({"RGB_R": 50.0}) is cgats[0]["DATA"][2]
+    cgats[0]["DATA"][1]["QUERIED"] = b"NO"
+    assert cgats.queryv("QUERIED") == {0: b"NO", 1: b"YES"}
+    del cgats[0]["DATA"][1]["QUERIED"]
+    assert cgats.queryv("QUERIED") == {0: b"YES"}
+    cgats[1].remove_keyword("QUERIED")
+    assert cgats.queryv1("QUERIED") is None
+
+
+def test_cgats_query_duplicates(data_files) -> None:
+    """Test ``DisplayCAL.CGATS.CGATS`` query only returns the first of equal
+    values from different sections."""
+    path = data_files["0_16_proper.ti3"].absolute()
+    cgats = CGATS.CGATS(cgats=path)
+    values = list(cgats.queryv("RGB_R").values())
+    assert values[:4] == [100.0, 0.0, 6.25, 0.00392157]
+    assert len(values) == len(set(values)) == 258
+    cgats[0]["DATA"][2]["RGB_R"] = 100.0
+    assert list(cgats.queryv("RGB_R").values())[:3] == [100.0, 0.0, 0.00392157]
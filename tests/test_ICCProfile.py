@@ -2,15 +2,28 @@
 """Tests for the DisplayCAL.ICCProfile module."""
 import binascii
 import datetime
+from hashlib import md5
+import struct
 import sys
 from time import strftime
 
+import numpy
+import pytest
+
 from DisplayCAL import ICCProfile, colormath
 from DisplayCAL.ICCProfile import (
     uInt8Number_tohex,
     uInt32Number_tohex,
     s15Fixed16Number_tohex,
     uInt16Number_tohex,
+    uInt16Number_array_tohex,
+    s15Fixed16Number,
+    s15Fixed16Number_array,
+    s15Fixed16Number_array_tohex,
+    uInt16Number,
+    uInt16Number_array,
+    uInt8Number_array_tohex,
+    uInt32Number_array_tohex,
     DictType,
     hexrepr,
     cmms,
@@ -303,6 +316,39 @@ def test_uInt16Number_tohex_tohex_is_working_properly():
     assert result == expected_value
 
 
+def test_uInt16Number_array_tohex_is_working_properly():
+    """Testing if uInt16Number_array_tohex matches uInt16Number_tohex."""
+    test_values = [0, 0.5, 1.5, 12123, 12123.4, 65535]
+    result = uInt16Number_array_tohex(test_values)
+    assert result == b"".join(uInt16Number_tohex(v) for v in test_values)
+    with pytest.raises(struct.error):
+        uInt16Number_array_tohex([0, 65536])
+    with pytest.raises(struct.error):
+        uInt16Number_array_tohex([-1])
+
+
+def test_number_arrays_match_single_value_functions():
+    """Testing if the array decoders/encoders match the single value ones."""
+    test_values = [-32768, -1.5, -0.00001, 0, 0.5, 123.12, 32767.99998]
+    data = b"".join(s15Fixed16Number_tohex(v) for v in test_values)
+    assert s15Fixed16Number_array_tohex(test_values) == data
+    assert s15Fixed16Number_array(data).tolist() == [
+        s15Fixed16Number(data[i : i + 4]) for i in range(0, len(data), 4)
+    ]
+    assert uInt16Number_array(b"/[\0\1\xff\xff").tolist() == [
+        uInt16Number(b"/["),
+        1,
+        65535,
+    ]
+    assert uInt8Number_array_tohex([0, 1.5, 255]) == b"\0\2\xff"
+    assert uInt32Number_array_tohex([132123]) == uInt32Number_tohex(132123)
+    with pytest.raises(struct.error):
+        s15Fixed16Number_array_tohex([32768])
+    # Truncated data
+    with pytest.raises(ValueError):
+        uInt16Number_array(b"\0\1\2", 2)
+
+
 def test_dict_type():
     """Testing the DictType."""
     d = DictType()
@@ -835,3 +881,616 @@ def test_issue_185_parsing_of_ref_srgb_profile_from_argyllcms(argyll):
     icc_profile = ICCProfile.ICCProfile(srgb_profile_path)
     # the following should not raise an error
     info = icc_profile.get_info()
+
+
+def test_lut16_type_table_arrays(data_files):
+    """Testing the array views of LUT16Type tables."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    tag = icc_profile.tags.A2B0
+    tag_data = tag.tagData
+    assert tag.clut_array.shape == (33, 33, 33, 3)
+    assert tag.input_array.shape == (3, 2049)
+    assert tag.output_array.shape == (3, 2)
+    # Unmodified tables are serialized from the original tag data
+    assert tag.tagData is tag_data
+    # Legacy nested list view
+    last = tag.clut_array[-1, -1, -1].tolist()
+    clut = tag.clut
+    assert len(clut) == 33 * 33
+    assert len(clut[0]) == 33
+    assert clut[-1][-1] == last
+    assert tag.tagData == tag_data
+    # Modifying the list view is reflected by the array view
+    clut[0][0] = [1, 2, 3]
+    assert tag.clut_array[0, 0, 0].tolist() == [1, 2, 3]
+    assert tag.tagData != tag_data
+    # Assigning an array
+    array = numpy.zeros((33, 33, 33, 3))
+    array[0, 0, 0] = 1, 2, 3
+    tag.clut_array = array
+    assert tag.clut[0][0] == [1.0, 2.0, 3.0]
+    assert len(tag.tagData) == len(tag_data)
+    # Empty table
+    assert ICCProfile.LUT16Type(None, "A2B0").clut_array.size == 0
+
+
+def test_lut16_type_apply_bpc(data_files):
+    """Testing LUT16Type.apply_bpc against the scalar colormath.apply_bpc."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    tag = icc_profile.tags.B2A0
+    clut = tag.clut_array.reshape(-1, 3) / 32768.0
+    bp = clut[0].tolist()
+    wp = clut[-1].tolist()
+    # With zero black output, the cLUT is processed without the output curves
+    bp_out = (0, 0, 0)
+    tag.apply_bpc(bp_out)
+    result = tag.clut_array.reshape(-1, 3)
+    assert result.shape == clut.shape
+    for i in (0, 1, 100, 1000, len(clut) - 1):
+        expected = colormath.apply_bpc(*clut[i], bp, bp_out, wp)
+        assert result[i].tolist() == pytest.approx(
+            [min(max(0, v) * 32768.0, 65535) for v in expected]
+        )
+
+
+def test_lut16_type_apply_black_offset_lab(data_files):
+    """Testing LUT16Type.apply_black_offset with a L*a*b* PCS."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    icc_profile.connectionColorSpace = b"Lab"
+    tag = icc_profile.tags.A2B0
+    # Replace the cLUT with a neutral L* ramp from L* 0 to 100
+    L = numpy.linspace(0, 100, 5)
+    Lab = numpy.stack([L, numpy.zeros(5), numpy.zeros(5)], axis=-1)
+    tag.clut_array = numpy.array(
+        [ICCProfile.legacy_PCSLab_dec_to_uInt16(*v) for v in Lab]
+    ).reshape(5, 1, 1, 3)
+    tag.output_array = numpy.array([[0, 65535]] * 3)
+    XYZbp = (0.0032, 0.0035, 0.003)
+    tag.apply_black_offset(XYZbp)
+    result = [
+        ICCProfile.legacy_PCSLab_uInt16_to_dec(*v)
+        for v in tag.clut_array.reshape(-1, 3).tolist()
+    ]
+    # Black is mapped to the target black, white stays white
+    assert colormath.Lab2XYZ(*result[0]) == pytest.approx(XYZbp, abs=1e-6)
+    assert result[-1] == pytest.approx([100, 0, 0], abs=1e-6)
+
+
+def test_lut16_type_lookup_interpolation(data_files):
+    """Testing LUT16Type.lookup tetrahedral and trilinear interpolation."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    tag = icc_profile.tags.A2B1
+    # Identity curves, so grid points can be checked against the cLUT
+    tag.input_array = numpy.array([[0, 65535]] * 3)
+    tag.output_array = numpy.array([[0, 65535]] * 3)
+    nodes = numpy.array([[0, 0, 0], [3, 5, 7], [32, 0, 16], [32, 32, 32]])
+    expected = tag.clut_array[tuple(nodes.T)] / 65535.0
+    for interpolation in ("tetrahedral", "trilinear"):
+        result = tag.lookup(nodes / 32.0, interpolation)
+        assert result == pytest.approx(expected, abs=1e-9)
+    # Midway between two grid points on the gray axis, tetrahedral
+    # interpolation only uses the two grid points on the diagonal, trilinear
+    # interpolation all eight corners of the cell
+    cell = tag.clut_array[3:5, 3:5, 3:5] / 65535.0
+    gray = (cell[0, 0, 0] + cell[1, 1, 1]) / 2
+    result = tag.lookup([3.5 / 32] * 3, "tetrahedral")
+    assert result == pytest.approx(gray)
+    result = tag.lookup([3.5 / 32] * 3, "trilinear")
+    assert result == pytest.approx(cell.reshape(-1, 3).mean(axis=0))
+    with pytest.raises(ValueError):
+        tag.lookup([0, 0, 0], "cubic")
+
+
+def test_lut16_type_smooth2(data_files):
+    """Testing LUT16Type.smooth2 against smoothing the cLUT rows one by one."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    tag = icc_profile.tags.B2A0
+    reference = ICCProfile.LUT16Type(tag.tagData, "B2A0")
+    window = (1 / 16.0, 1, 1 / 16.0)
+    for order in (None, (1, 2, 0), (0, 2, 1), (2, 1, 0), (0, 2, 1), (2, 0, 1)):
+        if order:
+            reference.clut_shift_columns(order)
+        reference.clut_row_apply_per_channel(
+            (0, 1, 2), colormath.smooth_avg, (), {"window": window}, "XYZ"
+        )
+    reference.clut_shift_columns((0, 2, 1))
+    tag.smooth2(0, "XYZ", window=window)
+    expected = numpy.array(reference.clut).reshape(tag.clut_array.shape)
+    assert tag.clut_array == pytest.approx(expected, abs=1e-6)
+    assert tag.tagData == reference.tagData
+
+
+def test_lut16_type_smooth():
+    """Testing LUT16Type.smooth box and "plus"-shaped filters."""
+    tag = ICCProfile.LUT16Type(None, "B2A0")
+    tag.output = [[0, 65535]] * 3
+    steps = numpy.linspace(0, 65535, 9)
+    grid = numpy.stack(numpy.meshgrid(steps, steps, steps, indexing="ij"), axis=-1)
+    # Linear ramps are left unchanged
+    tag.clut_array = grid
+    tag.smooth(0, "XYZ")
+    assert tag.clut_array == pytest.approx(grid)
+    # Center pixel weight = 1.0, surround = 2/3, corners = 1/3
+    clut = grid.copy()
+    clut[4, 3, 5] += 2700
+    clut[4, 0, 5] += 2700
+    tag.clut_array = clut
+    tag.smooth(0, "XYZ")
+    result = tag.clut_array - grid
+    assert result[4, 3, 5] == pytest.approx([1500] * 3)
+    assert result[4, 3, 4] == pytest.approx([200] * 3)
+    assert result[4, 2, 4] == pytest.approx([100] * 3)
+    # "Plus"-shaped filter along the saturated edge
+    assert result[4, 0, 5] == pytest.approx([1800] * 3)
+    assert result[4, 0, 4] == pytest.approx([450] * 3)
+    assert result[4, 1, 5] == pytest.approx([200] * 3)
+    # Gray axis is protected
+    assert result[4, 4, 4] == pytest.approx([0] * 3)
+
+
+def test_lut_atob_type_matches_lut16_type(data_files):
+    """Testing LUTAToBType parsing, serialization and lookup."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    lut16 = icc_profile.tags.A2B0
+    tag = ICCProfile.LUTAToBType(None, "A2B0", icc_profile)
+    tag.a_curves = [ICCProfile.CurveType() for curve in lut16.input_array]
+    for curve, values in zip(tag.a_curves, lut16.input_array.tolist()):
+        curve[:] = values
+    tag.clut_array = lut16.clut_array
+    tag.b_curves = [ICCProfile.CurveType() for curve in lut16.output_array]
+    for curve, values in zip(tag.b_curves, lut16.output_array.tolist()):
+        curve[:] = values
+    tagData = tag.tagData
+    assert tagData[:4] == b"mAB "
+    tag = ICCProfile.LUTAToBType(tagData, "A2B0", icc_profile)
+    assert tag.tagData == tagData
+    assert (tag.input_channels_count, tag.output_channels_count) == (3, 3)
+    assert tag.clut_array.shape == (33, 33, 33, 3)
+    assert tag.m_curves is None and tag.matrix is None
+    values = numpy.random.RandomState(0).rand(100, 3)
+    for interpolation in ("tetrahedral", "trilinear"):
+        assert tag.lookup(values, interpolation) == pytest.approx(
+            lut16.lookup(values, interpolation)
+        )
+    # Profile lookup
+    expected = icc_profile.lookup(values, "p")
+    icc_profile.tags.A2B0 = tag
+    icc_profile = ICCProfile.ICCProfile(icc_profile.data)
+    assert isinstance(icc_profile.tags.A2B0, ICCProfile.LUTAToBType)
+    assert icc_profile.lookup(values, "p") == pytest.approx(expected)
+
+
+def test_lut_btoa_type():
+    """Testing LUTBToAType parsing and lookup."""
+    tagData = [
+        b"mBA \0\0\0\0",
+        bytes([3, 2, 0, 0]),
+        # Offsets of B curves, matrix, M curves, cLUT, A curves
+        uInt32Number_array_tohex([32, 88, 136, 172, 208]),
+    ]
+    # B curves: gamma 2.0, identity, parametric gamma 1.0 with offset
+    tagData.append(b"curv\0\0\0\0" + uInt32Number_tohex(1) + b"\x02\0\0\0")
+    tagData.append(b"curv\0\0\0\0" + uInt32Number_tohex(0))
+    params = s15Fixed16Number_array_tohex([1.0, 0.5, 0.0, 0.25])
+    tagData.append(b"para\0\0\0\0\0\x02\0\0" + params)
+    # Matrix swapping the first two channels and offset
+    tagData.append(
+        s15Fixed16Number_array_tohex([0, 1, 0, 1, 0, 0, 0, 0, 1, 0.125, 0, 0])
+    )
+    # M curves: identity
+    tagData.append((b"curv\0\0\0\0" + uInt32Number_tohex(0)) * 3)
+    # 8-bit 2x2x2 cLUT with 2 output channels: sum and first input
+    grid = bytes([2, 2, 2]).ljust(16, b"\0") + bytes([1, 0, 0, 0])
+    clut = []
+    for a in range(2):
+        for b in range(2):
+            for c in range(2):
+                clut += [(a + b + c) * 85, a * 255]
+    tagData.append(grid + bytes(clut))
+    # A curves: identity
+    tagData.append((b"curv\0\0\0\0" + uInt32Number_tohex(0)) * 2)
+    tagData = b"".join(tagData)
+    assert len(tagData) == 232
+    tag = ICCProfile.LUTBToAType(tagData, "B2A0")
+    assert tag.tagData == tagData
+    assert tag.b_curves[2].params == {"g": 1.0, "a": 0.5, "b": 0.0, "c": 0.25}
+    assert tag.clut_array.dtype == numpy.uint8
+    assert (tag.input_channels_count, tag.output_channels_count) == (3, 2)
+    result = tag.lookup([[0.5, 0.25, 0.5], [0, 0, 0]])
+    # B curves: 0.25, 0.25, 0.5, matrix: 0.375, 0.25, 0.5
+    assert result[0] == pytest.approx([(0.375 + 0.25 + 0.5) / 3, 0.375])
+    assert result[1] == pytest.approx([(0.125 + 0.25) / 3, 0.125])
+
+
+def _lut_atob_tag_data():
+    """Return mAB tag data with the elements in B/matrix/M/cLUT/A order."""
+    identity = b"curv\0\0\0\0" + uInt32Number_tohex(0)
+    tagData = [
+        b"mAB \0\0\0\0",
+        bytes([3, 3, 0, 0]),
+        # Offsets of B curves, matrix, M curves, cLUT, A curves
+        uInt32Number_array_tohex([32, 68, 116, 152, 196]),
+        identity * 3,
+        s15Fixed16Number_array_tohex([0, 1, 0, 1, 0, 0, 0, 0, 1, 0.125, 0, 0]),
+        identity * 3,
+    ]
+    # 8-bit 2x2x2 cLUT with 3 output channels: inputs in reverse order
+    grid = bytes([2, 2, 2]).ljust(16, b"\0") + bytes([1, 0, 0, 0])
+    clut = []
+    for a in range(2):
+        for b in range(2):
+            for c in range(2):
+                clut += [c * 255, b * 255, a * 255]
+    tagData.append(grid + bytes(clut))
+    tagData.append(identity * 3)
+    tagData = b"".join(tagData)
+    assert len(tagData) == 232
+    return tagData
+
+
+def test_lut_atob_type_keeps_tag_data():
+    """Testing LUTAToBType returns unmodified tag data as-is."""
+    tagData = _lut_atob_tag_data()
+    tag = ICCProfile.LUTAToBType(tagData, "A2B0")
+    assert tag.tagData == tagData
+    values = [[0.5, 0.25, 0.75], [0, 0, 0]]
+    expected = tag.lookup(values)
+    # cLUT reverses, matrix swaps the first two channels and offsets the first
+    assert expected[0] == pytest.approx([0.375, 0.75, 0.5])
+    # Modified tags are encoded from their elements
+    tag.a_curves[0].set_trc(1.0, 2)
+    assert tag.tagData != tagData
+    tag = ICCProfile.LUTAToBType(tag.tagData, "A2B0")
+    assert tag.lookup(values) == pytest.approx(expected)
+    tag = ICCProfile.LUTAToBType(tagData, "A2B0")
+    tag.matrix[0][0] = 0.5
+    assert tag.tagData != tagData
+    tag = ICCProfile.LUTAToBType(tagData, "A2B0")
+    tag.clut_array = tag.clut_array[::-1]
+    assert tag.tagData != tagData
+
+
+def test_iccprofile_v4_lut_atob_write(data_files, tmp_path):
+    """Testing reading and writing a profile with a mAB tag keeps its data."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    profile.version = 4.3
+    # Write the tag data as-is
+    profile.tags.A2B0 = ICCProfile.ICCProfileTag(_lut_atob_tag_data(), "A2B0")
+    profile.calculateID()
+    path = tmp_path / "v4.icc"
+    profile.write(str(path))
+    data = path.read_bytes()
+    profile = ICCProfile.ICCProfile(str(path))
+    assert isinstance(profile.tags.A2B0, ICCProfile.LUTAToBType)
+    assert profile.tags.A2B0.tagData == _lut_atob_tag_data()
+    profile.convert_iccv4_tags_to_iccv2()
+    written = tmp_path / "written.icc"
+    profile.write(str(written))
+    assert written.read_bytes() == data
+    profile = ICCProfile.ICCProfile(str(written))
+    assert profile.ID == profile.calculateID(False)
+
+
+def test_iccprofile_lookup_matrix_trc(data_files):
+    """Testing ICCProfile.lookup with a matrix/shaper profile."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["BenQ SW271 #1 2021-11-17 14-21 2.2 F-S 1xCurve+MTX.icc"]
+    )
+    gamma = icc_profile.tags.rTRC[0]
+    rXYZ = list(icc_profile.tags.rXYZ.values())
+    result = icc_profile.lookup([[0.5, 0, 0], [1, 1, 1]], pcs="x")
+    assert result[0].tolist() == pytest.approx([v * 0.5**gamma for v in rXYZ])
+    assert result[1].tolist() == pytest.approx(
+        colormath.get_whitepoint("D50"), abs=1e-4
+    )
+    result = icc_profile.lookup([1, 1, 1], pcs="X")
+    assert result.tolist() == pytest.approx([96.42, 100, 82.49], abs=1e-2)
+    result = icc_profile.lookup([1, 1, 1], pcs="l")
+    assert result.tolist() == pytest.approx([100, 0, 0], abs=1e-2)
+
+
+def test_iccprofile_lookup_lut16(data_files):
+    """Testing ICCProfile.lookup with a LUT16 profile."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    values = icc_profile.tags.A2B1.lookup([[0, 0, 0], [0.5, 0.25, 1]])
+    result = icc_profile.lookup([[0, 0, 0], [0.5, 0.25, 1]], "r")
+    assert result == pytest.approx(values * 65535 / 32768.0)
+    result = icc_profile.lookup([[1, 1, 1]], "p", pcs="l")
+    assert result[0].tolist() == pytest.approx([100, 0, 0], abs=1e-2)
+
+
+def test_iccprofile_lookup_unsupported(data_files):
+    """Testing that ICCProfile.lookup raises NotImplementedError for lookups
+    that need ArgyllCMS."""
+    icc_profile = ICCProfile.ICCProfile(
+        profile=data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    with pytest.raises(NotImplementedError):
+        icc_profile.lookup([0, 0, 0], direction="b")
+    with pytest.raises(NotImplementedError):
+        icc_profile.lookup([0, 0, 0], pcs="j")
+    # Media white differs from PCS illuminant
+    with pytest.raises(NotImplementedError):
+        icc_profile.lookup([0, 0, 0], "a")
+    with pytest.raises(ValueError):
+        icc_profile.lookup([0, 0, 0, 0])
+
+
+def test_iccprofile_lazy_tag_loading(data_files, tmp_path):
+    """Test ICCProfile tag data is read on first access if load=False."""
+    path = tmp_path / "lazy.icc"
+    path.write_bytes(
+        data_files[
+            "UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"
+        ].read_bytes()
+    )
+    reference = ICCProfile.ICCProfile(str(path))
+    reference_data = reference.data
+    profile = ICCProfile.ICCProfile(str(path), load=False)
+    assert list(profile.tags.keys()) == list(reference.tags.keys())
+    # Only the tag table has been read
+    assert all(
+        ICCProfile.AODict.__getitem__(profile.tags, key)[3] is None
+        for key in profile.tags
+    )
+    assert profile.tags.wtpt.tagData == reference.tags.wtpt.tagData
+    assert ICCProfile.AODict.__getitem__(profile.tags, "A2B0")[3] is None
+    assert profile.data == reference_data
+    # Writing to the same file reads remaining tag data first
+    profile = ICCProfile.ICCProfile(str(path), load=False)
+    profile.tags
+    profile.write(str(path))
+    assert path.read_bytes() == reference_data
+
+
+def test_iccprofile_cache(data_files, monkeypatch):
+    """Test the ICCProfile instance cache is a bounded LRU cache."""
+    cache = ICCProfile.ICCProfileCache()
+    monkeypatch.setattr(ICCProfile, "_iccprofilecache", cache)
+    path = str(data_files["default.icc"])
+    profile = ICCProfile.ICCProfile(path, use_cache=True)
+    assert ICCProfile.ICCProfile(path, use_cache=True) is profile
+    assert (cache.hits, cache.misses, cache.size) == (1, 1, profile.size)
+
+    # Binary data with profile ID is keyed by header
+    data = profile.data
+    assert data[84:100] != b"\0" * 16
+    profile2 = ICCProfile.ICCProfile(data, use_cache=True)
+    assert profile2 is not profile
+    assert ICCProfile.ICCProfile(data, use_cache=True) is profile2
+    assert len(cache) == 2
+
+    # Modified profiles are removed from the cache
+    profile2.setDescription("Modified")
+    assert ICCProfile.ICCProfile(data, use_cache=True) is not profile2
+
+    # Least recently used profiles are evicted first
+    cache.get(profile._key)
+    cache.trim(profile.size)
+    assert len(cache) == 1
+    assert cache.evictions == 1
+    assert ICCProfile.ICCProfile(path, use_cache=True) is profile
+
+
+def test_iccprofile_cache_threads():
+    """Test the ICCProfile instance cache can be used from multiple threads."""
+    import threading
+
+    class Profile(object):
+        size = 1
+
+    cache = ICCProfile.ICCProfileCache(maxsize=8)
+    switchinterval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors = []
+
+    def use_cache():
+        try:
+            for i in range(20000):
+                key = i % 16
+                if cache.get(key) is None:
+                    cache.add(key, Profile())
+        except Exception as exception:
+            errors.append(exception)
+
+    threads = [threading.Thread(target=use_cache) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switchinterval)
+    assert not errors
+    assert len(cache) == cache.size <= 8
+    assert cache.hits + cache.misses == 8 * 20000
+
+
+def test_iccprofile_data_is_cached(data_files):
+    """Test serialized profile data is reused until the profile changes."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    data = profile.data
+    assert profile.data is data
+    profile.setDescription("Changed")
+    assert profile.data is not data
+    assert ICCProfile.ICCProfile(profile.data).getDescription() == "Changed"
+    # Identical tag data is only stored once
+    profile.tags.B2A1 = profile.tags.B2A0
+    profile.tags.B2A2 = profile.tags.B2A0
+    offsets = {profile.data[136 + i * 12 : 140 + i * 12] for i in range(len(profile))}
+    assert len(offsets) < len(profile)
+
+
+def test_iccprofile_layout_is_cached(data_files):
+    """Test the tag layout is only redone when tags change."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    data = profile.data
+    layout = profile._layout()[1]
+    assert profile._layout()[1] is layout
+    # Header changes don't affect the tag layout
+    profile.intent = 2
+    assert profile.data != data
+    assert profile.data[64:68] == b"\0\0\0\2"
+    assert profile._layout()[1] is layout
+    profile.tags.vcgt.data[0][5] += 1
+    assert profile._layout()[1] is not layout
+    layout = profile._layout()[1]
+    profile.setDescription("Changed")
+    assert profile._layout()[1] is not layout
+    assert ICCProfile.ICCProfile(profile.data).getDescription() == "Changed"
+
+
+def test_iccprofile_write_streams_data(data_files, tmp_path):
+    """Test writing a profile streams the same data as ICCProfile.data."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    profile.tags.A2B0.clut_array = profile.tags.A2B0.clut_array * 0.5
+    profile.tags.B2A1 = profile.tags.B2A0
+    profile.tags.B2A2 = ICCProfile.LUT16Type(profile.tags.B2A0.tagData, "B2A2")
+    path = tmp_path / "stream.icc"
+    profile.write(str(path))
+    data = path.read_bytes()
+    assert data == profile.data
+    # Identical tag data is only written once
+    offsets = {
+        data[132 + i * 12 : 136 + i * 12]: data[136 + i * 12 : 140 + i * 12]
+        for i in range(len(profile))
+    }
+    assert offsets[b"B2A2"] == offsets[b"B2A0"]
+    written = ICCProfile.ICCProfile(str(path))
+    assert written.tags.A2B0.tagData == profile.tags.A2B0.tagData
+
+
+def test_iccprofile_calculate_id_tracks_changes(data_files):
+    """Test the profile ID is recalculated when tags are modified in place."""
+    path = data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    profile = ICCProfile.ICCProfile(path)
+    vcgt = profile.tags.vcgt
+    ID = profile.calculateID(False)
+    assert ID == profile.ID
+    data = profile.data
+    assert profile.calculateID(False) == ID
+    vcgt.data[0][5] += 1
+    assert profile.data != data
+    modified_ID = profile.calculateID(False)
+    assert modified_ID != ID
+    assert ICCProfile.ICCProfile(profile.data).calculateID(False) == modified_ID
+    vcgt.data[0][5] -= 1
+    assert profile.data == data
+    assert profile.calculateID(False) == ID
+
+
+def test_iccprofile_tag_data_is_encoded_once(data_files):
+    """Test modified tags are only encoded again after further changes."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    lut = profile.tags.A2B0
+    clut = lut.clut_array * 0.5
+    lut.clut_array = clut
+    # The table is stored as read-only copy
+    clut[0, 0, 0] = 1
+    assert lut.clut_array[0, 0, 0, 0] != 1
+    assert not lut.clut_array.flags.writeable
+    tagData = lut.tagData
+    assert lut.tagData is tagData
+    data = profile.data
+    assert profile.tags.A2B0.tagData is tagData
+    # Changes made through the legacy lists are picked up
+    lut.clut[0][0][0] = 1
+    assert lut.tagData != tagData
+    assert profile.data != data
+    assert lut.clut_array[0, 0, 0, 0] == 1
+    tagData = lut.tagData
+    assert lut.tagData is tagData
+    lut.matrix = colormath.Matrix3x3([[2, 0, 0], [0, 1, 0], [0, 0, 1]])
+    assert lut.tagData != tagData
+    lut.matrix[0][0] = 1
+    assert lut.tagData == tagData
+    curve = profile.tags.rTRC
+    tagData = curve.tagData
+    assert curve.tagData is tagData
+    curve[0] = 100
+    assert curve.tagData != tagData
+    assert ICCProfile.ICCProfile(profile.data).tags.rTRC[0] == 100
+
+
+def test_iccprofile_calculate_id_matches_data(data_files):
+    """Test the profile ID is the MD5 of the profile data with zeroed
+    flags, intent and ID fields."""
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    profile.tags.A2B0.clut_array = profile.tags.A2B0.clut_array * 0.5
+    profile.tags.B2A1 = profile.tags.B2A0
+    profile.intent = 2
+    data = bytearray(profile.data)
+    data[44:48] = data[64:68] = b"\0" * 4
+    data[84:100] = b"\0" * 16
+    assert profile.calculateID() == md5(data).digest()
+    assert profile.data[84:100] == md5(data).digest()
+
+
+def test_curve_type_array_is_invalidated():
+    """Test the cached array of a CurveType is discarded on modification."""
+    curve = ICCProfile.CurveType()
+    curve.set_trc(2.2, 256)
+    assert curve.array.tolist() == list(curve)
+    curve[0] = 100
+    assert curve.array[0] == 100
+    curve.append(65535)
+    assert len(curve.array) == 257
+    curve.clear()
+    assert len(curve.array) == 0
+
+
+def test_curve_type_get_gamma():
+    """Test the gamma estimation of a CurveType."""
+    curve = ICCProfile.CurveType()
+    curve.set_trc(2.2, 1024)
+    assert curve.get_gamma() == pytest.approx(2.2)
+    assert curve.get_gamma(least_squares=True) == pytest.approx(2.2)
+    gammas = curve.get_gamma(average=False, lstar_slice=False)
+    assert len(gammas) == 1004
+    assert gammas == pytest.approx([2.2] * len(gammas))
+    (name, exp, outoffset), match = curve.get_transfer_function()
+    assert name == "Gamma 2.20 100%"
+    assert match == pytest.approx(1.0)
+
+
+def test_vcgt_resize_and_quantize(data_files):
+    """Test resizing and quantizing of a VideoCardGammaTableType."""
+    path = data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    vcgt = ICCProfile.ICCProfile(path).tags.vcgt
+    resized = vcgt.resized(vcgt.entryCount)
+    assert resized.data == vcgt.data
+    resized = vcgt.resized(vcgt.entryCount * 2 - 1)
+    assert resized.data[0][::2] == vcgt.data[0]
+    assert resized.entryCount == vcgt.entryCount * 2 - 1
+    values = vcgt.getNormalizedValues(17)
+    assert len(values) == 17
+    assert values[-1] == tuple(channel[-1] / 65535.0 for channel in vcgt.data)
+    vcgt.quantize(8)
+    assert vcgt.entrySize == 1
+    assert all(type(v) is int and 0 <= v <= 255 for v in vcgt.data[0])
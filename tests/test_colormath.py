@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import random
+
+import numpy
 import pytest
 
+from DisplayCAL import colormath
 from DisplayCAL.colormath import smooth_avg_old, smooth_avg
 from tests.data.display_data import DisplayData
 
@@ -123,3 +127,187 @@ def test_smooth_avg_protetced_values_2():
         0,
     ]
     assert result == expected_result
+
+
+def _random_triplets(count=200, low=0.0, high=1.0, seed=0):
+    rnd = random.Random(seed)
+    return [tuple(rnd.uniform(low, high) for _ in range(3)) for _ in range(count)]
+
+
+def _flat(rows):
+    return [float(v) for row in rows for v in row]
+
+
+@pytest.mark.parametrize(
+    "func_name,args,kwargs,low,high",
+    (
+        ("XYZ2Lab", (), {}, 0.0, 100.0),
+        ("XYZ2Lab", (), {"whitepoint": "D65", "scale": 1.0}, 0.0, 1.0),
+        ("Lab2XYZ", (), {}, 0.0, 100.0),
+        ("Lab2XYZ", (), {"whitepoint": "D65", "scale": 100.0}, -50.0, 100.0),
+        ("XYZ2xyY", (), {}, 0.0, 1.0),
+        ("xyY2XYZ", (), {}, 0.01, 1.0),
+        ("XYZ2RGB", (), {}, -0.1, 1.1),
+        ("XYZ2RGB", ("Rec. 2020",), {"clamp": False}, 0.0, 1.0),
+        ("XYZ2RGB", ("DCI P3 D65",), {"scale": 255, "round_": 3}, 0.0, 1.0),
+        ("RGB2XYZ", (), {}, 0.0, 1.0),
+        ("RGB2XYZ", ("Rec. 709",), {"scale": 100}, 0.0, 1.0),
+        ("RGB2XYZ", ("Adobe RGB (1998)",), {}, 0.0, 1.0),
+        ("adapt", ("D50", "D65"), {}, 0.0, 1.0),
+        ("adapt", ("D65", "D50", "CAT02"), {}, 0.0, 1.0),
+        ("XYZ2ICtCp", (), {}, 0.0, 1.0),
+        ("ICtCp2XYZ", (), {}, 0.0, 0.5),
+        ("Lab2LCHab", (), {}, -100.0, 100.0),
+        ("LCHab2Lab", (), {}, 0.0, 360.0),
+    ),
+)
+def test_colormath_np_matches_scalar_functions(func_name, args, kwargs, low, high):
+    """testing if the array API matches the scalar colormath functions"""
+    values = _random_triplets(low=low, high=high)
+    scalar_func = getattr(colormath, func_name)
+    array_func = getattr(colormath.np, func_name)
+    expected = [scalar_func(*(v + args), **kwargs) for v in values]
+    result = array_func(values, *args, **kwargs)
+    assert result.shape == (len(values), 3)
+    assert _flat(result.tolist()) == pytest.approx(_flat(expected), rel=1e-9, abs=1e-9)
+
+
+def test_colormath_np_accepts_grids():
+    """testing if the array API keeps the shape of (..., 3) input grids"""
+    grid = numpy.stack(
+        numpy.meshgrid(*[numpy.linspace(0, 1, 5)] * 3, indexing="ij"), axis=-1
+    )
+    result = colormath.np.XYZ2Lab(colormath.np.RGB2XYZ(grid), scale=1.0)
+    assert result.shape == (5, 5, 5, 3)
+    assert result[2, 3, 4].tolist() == pytest.approx(
+        colormath.XYZ2Lab(*colormath.RGB2XYZ(*grid[2, 3, 4]), scale=1.0)
+    )
+
+
+@pytest.mark.parametrize(
+    "b",
+    (
+        2.2,
+        -2.4,
+        1.0 / -2.4,
+        -3.0,
+        1.0 / -3.0,
+        -240,
+        1.0 / -240,
+        -709,
+        1.0 / -709,
+        -2084,
+        1.0 / -2084,
+    ),
+)
+def test_colormath_np_specialpow_matches_scalar(b):
+    """testing if colormath.np.specialpow matches colormath.specialpow"""
+    values = [v / 100.0 for v in range(-100, 101)]
+    if b in (-2084, 1.0 / -2084):
+        values = [v for v in values if v >= 0]
+    expected = [colormath.specialpow(v, b) for v in values]
+    assert colormath.np.specialpow(values, b).tolist() == pytest.approx(
+        expected, rel=1e-9, abs=1e-12
+    )
+
+
+def test_colormath_np_xyY_black_and_zero_y():
+    """testing the black and y == 0 special cases of the xyY conversions"""
+    assert colormath.np.XYZ2xyY([(0, 0, 0)])[0].tolist() == pytest.approx(
+        colormath.XYZ2xyY(0, 0, 0)
+    )
+    assert colormath.np.xyY2XYZ([(0.3, 0, 1)]).tolist() == [[0, 0, 0]]
+
+
+def test_colormath_np_blend_blackpoint_matches_scalar():
+    """testing if colormath.np.blend_blackpoint matches the scalar version"""
+    values = _random_triplets(low=0.0, high=0.3)
+    bp_in = (0.002, 0.0021, 0.0025)
+    bp_out = (0.0005, 0.0004, 0.0006)
+    expected = [
+        colormath.blend_blackpoint(*v, bp_in=bp_in, bp_out=bp_out) for v in values
+    ]
+    result = colormath.np.blend_blackpoint(values, bp_in, bp_out)
+    assert _flat(result.tolist()) == pytest.approx(_flat(expected), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("weight", (False, True))
+@pytest.mark.parametrize("pin_chromaticity", (False, True))
+def test_colormath_np_apply_bpc_matches_scalar(weight, pin_chromaticity):
+    """testing if colormath.np.apply_bpc matches the scalar version"""
+    values = _random_triplets(low=0.0, high=0.9)
+    bp_in = (0.002, 0.0021, 0.0025)
+    bp_out = (0.0005, 0.0004, 0.0006)
+    expected = [
+        colormath.apply_bpc(*v, bp_in, bp_out, "D50", weight, pin_chromaticity)
+        for v in values
+    ]
+    result = colormath.np.apply_bpc(
+        values, bp_in, bp_out, "D50", weight, pin_chromaticity
+    )
+    assert _flat(result.tolist()) == pytest.approx(_flat(expected), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize(
+    "method,p1,p2,p3",
+    (
+        ("76", None, None, None),
+        ("94", None, None, None),
+        ("94", True, None, None),
+        ("cmc", None, None, None),
+        ("cmc(2:1)", None, None, None),
+        ("00", None, None, None),
+        (2000, 2.0, 1.0, 1.0),
+    ),
+)
+def test_colormath_np_delta_matches_scalar(method, p1, p2, p3):
+    """testing if colormath.np.delta matches colormath.delta"""
+    rnd = random.Random(1)
+    Lab1 = [
+        (rnd.uniform(0, 100), rnd.uniform(-128, 127), rnd.uniform(-128, 127))
+        for _ in range(500)
+    ]
+    Lab2 = [(L + rnd.uniform(-5, 5), a * 0.9, b + 3) for L, a, b in Lab1]
+    # Include neutral and identical samples (hue angle special cases)
+    Lab1 += [(50, 0, 0), (50, 0, 0), (20, 10, -10)]
+    Lab2 += [(50, 0, 0), (60, 2, 2), (20, 10, -10)]
+    result = colormath.np.delta(Lab1, Lab2, method, p1, p2, p3)
+    for i, (v1, v2) in enumerate(zip(Lab1, Lab2)):
+        expected = colormath.delta(*v1 + v2 + (method, p1, p2, p3))
+        for key, value in expected.items():
+            assert result[key][i] == pytest.approx(value, rel=1e-9, abs=1e-9)
+
+
+def test_colormath_np_delta_broadcasts_reference():
+    """testing if colormath.np.delta broadcasts a single reference value"""
+    result = colormath.np.delta((50, 0, 0), [(50, 0, 0), (50, 3, 4)])
+    assert result["E"].tolist() == [0, 5]
+
+
+@pytest.mark.parametrize("average,least_squares", ((True, False), (False, True)))
+def test_colormath_np_get_gamma_matches_scalar(average, least_squares):
+    """testing if colormath.np.get_gamma matches colormath.get_gamma"""
+    values = [(i / 64.0, (i / 64.0) ** 2.2) for i in range(65)]
+    expected = colormath.get_gamma(values, 1.0, 0, 1, average, least_squares)
+    result = colormath.np.get_gamma(values, 1.0, 0, 1, average, least_squares)
+    assert result == pytest.approx(expected, rel=1e-12)
+
+
+def test_colormath_np_get_gamma_per_value():
+    """testing if colormath.np.get_gamma returns NaN for undefined values"""
+    values = [(0, 0), (0.5, 0.25), (1, 1)]
+    result = colormath.np.get_gamma(values, average=False)
+    assert numpy.isnan(result[[0, 2]]).all()
+    assert result[1] == pytest.approx(colormath.get_gamma(values, average=False)[0])
+
+
+def test_colormath_np_bt1886_apply_matches_scalar():
+    """testing if colormath.np.BT1886_apply matches colormath.BT1886.apply"""
+    mtx = colormath.Matrix3x3(
+        [[0.4361, 0.3851, 0.1431], [0.2225, 0.7169, 0.0606], [0.0139, 0.0971, 0.7141]]
+    )
+    bt1886 = colormath.BT1886(mtx, (0.0009, 0.001, 0.0008), 0.5, 2.4)
+    values = _random_triplets(low=0.0, high=0.9)
+    expected = [bt1886.apply(*v) for v in values]
+    result = colormath.np.BT1886_apply(bt1886, values)
+    assert _flat(result.tolist()) == pytest.approx(_flat(expected), rel=1e-9, abs=1e-12)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pytest
+
+from DisplayCAL import config
+from DisplayCAL.debughelpers import Info
+from DisplayCAL import multiprocess
+from DisplayCAL.multiprocess import (
+    PoolJob,
+    get_pool,
+    pool_slice,
+    pool_slice_shared,
+    shutdown_pool,
+)
+from DisplayCAL.worker_base import ThreadAbort
+
+
+def _scale(chunk, thread_abort_event, progress_queue, factor=1):
+    """Worker function for the tests below"""
+    if thread_abort_event is not None and thread_abort_event.is_set():
+        return Info("Aborted")
+    progress_queue.put(100)
+    return [[v * factor for v in row] + [len(chunk)] for row in chunk]
+
+
+def _nested(chunk, thread_abort_event, progress_queue):
+    """Worker function that uses a pool itself"""
+    result = []
+    for slices in pool_slice(_scale, chunk, (), {"factor": 2}, 2):
+        result.extend(slices)
+    return result
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_pool_slice_shared(num_workers):
+    """Test multiprocess.pool_slice_shared() function."""
+    config.initcfg()
+    data = numpy.arange(30.0).reshape((10, 3))
+    result = pool_slice_shared(
+        _scale, data, 4, (), {"factor": 2}, num_workers, num_batches=2
+    )
+    assert result.shape == (10, 4)
+    assert (result[:, :3] == data * 2).all()
+    # Same slicing as pool_slice
+    expected_result = []
+    for slices in pool_slice(
+        _scale, data.tolist(), (), {"factor": 2}, num_workers, num_batches=2
+    ):
+        expected_result.extend(slices)
+    assert result.tolist() == expected_result
+
+
+def test_pool_slice_shared_abort():
+    """Test multiprocess.pool_slice_shared() function abort."""
+    config.initcfg()
+    thread_abort = ThreadAbort()
+    thread_abort.event.set()
+    with pytest.raises(Info):
+        pool_slice_shared(_scale, [[0, 0, 0]] * 4, None, (), {}, 2, thread_abort)
+
+
+def test_pool_job():
+    """Test multiprocess.PoolJob class with the shared pool."""
+    config.initcfg()
+    pool = get_pool()
+    assert get_pool() is pool
+    job = PoolJob(_scale, [[[1, 2, 3]], [[4, 5, 6], [7, 8, 9]]], (), {"factor": 2})
+    assert job.progress == 0
+    job.start()
+    assert job.wait(30)
+    assert job.progress == 100
+    assert job.get() == [[[2, 4, 6, 1]], [[8, 10, 12, 2], [14, 16, 18, 2]]]
+    # The pool is reused
+    assert get_pool() is pool
+
+
+def test_pool_resized(monkeypatch):
+    """Test multiprocess.get_pool() function after the number of CPUs to use
+    changed."""
+    config.initcfg()
+    monkeypatch.setattr(multiprocess, "cpu_count", lambda: 4)
+    config.setcfg("multiprocessing.max_cpus", 2)
+    try:
+        pool = get_pool()
+        assert get_pool() is pool
+        job = PoolJob(_scale, [[[1, 2, 3]], [[4, 5, 6]]], (), {"factor": 2})
+        job.start()
+        config.setcfg("multiprocessing.max_cpus", 3)
+        assert get_pool() is not pool
+        # Jobs that were already submitted are finished by the old pool
+        assert job.get() == [[[2, 4, 6, 1]], [[8, 10, 12, 1]]]
+        # The old pool is reaped by the next call once its workers exited
+        for process in list(pool._pool):
+            process.join(5)
+        get_pool()
+        assert pool not in multiprocess._closed_pools
+        assert not pool._worker_handler.is_alive()
+        assert not pool._result_handler.is_alive()
+    finally:
+        config.setcfg("multiprocessing.max_cpus", 0)
+        shutdown_pool()
+
+
+def test_shutdown_pool():
+    """Test multiprocess.shutdown_pool() function letting workers exit
+    normally, including pools started inside workers."""
+    config.initcfg()
+    pool = get_pool()
+    data = [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]]
+    assert pool_slice(_nested, data, num_workers=2) == [
+        [[2, 4, 6, 1], [8, 10, 12, 1]],
+        [[14, 16, 18, 1], [20, 22, 24, 1]],
+    ]
+    processes = list(pool._pool)
+    shutdown_pool()
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert get_pool() is not pool
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+
+from DisplayCAL.ICCProfile import ICCProfile
+from DisplayCAL.profile_index import ProfileIndex
+
+
+def test_profile_index_refresh(data_files, tmp_path, monkeypatch):
+    """Test that only new or changed profiles are read by the profile index."""
+    srgb = str(tmp_path / "sRGB.icc")
+    shutil.copyfile(data_files["default.icc"], srgb)
+    invalid = str(tmp_path / "invalid.icc")
+    with open(invalid, "wb") as f:
+        f.write(b"not a profile")
+    missing = str(tmp_path / "missing.icc")
+
+    index = ProfileIndex(str(tmp_path / "cache" / "profile_index.sqlite"))
+    read = []
+    _read = index._read
+
+    def read_profile(path, stat):
+        read.append(path)
+        return _read(path, stat)
+
+    monkeypatch.setattr(index, "_read", read_profile)
+
+    entries = index.get([srgb, invalid, missing])
+    assert [entry.fileName for entry in entries] == [srgb]
+    profile = ICCProfile(srgb)
+    entry = entries[0]
+    assert entry.profileClass == profile.profileClass
+    assert entry.colorSpace == profile.colorSpace
+    assert entry.connectionColorSpace == profile.connectionColorSpace
+    assert entry.version == profile.version
+    assert entry.ID == profile.ID
+    assert entry.getDescription() == profile.getDescription()
+    assert read == [srgb, invalid]
+
+    # Unchanged files are not read again, not even invalid ones
+    del read[:]
+    entries = index.get([srgb, invalid])
+    assert [entry.fileName for entry in entries] == [srgb]
+    assert read == []
+
+    # Changed files are read again
+    profile.setDescription("Changed")
+    profile.write(srgb)
+    st = os.stat(srgb)
+    os.utime(srgb, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+    entries = index.get([srgb, invalid])
+    assert read == [srgb]
+    assert entries[0].getDescription() == "Changed"
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 import os
+import struct
+import sys
 from subprocess import Popen
 
+import pytest
+
 from DisplayCAL import worker_base
 from DisplayCAL import config
 from DisplayCAL.dev.mocks import check_call
@@ -56,3 +60,176 @@ def test_printcmdline_1():
     # fn = "<bound method WorkerBase.log of <DisplayCAL.worker.Worker object at 0x7f7b941bb6a0>>"
     cwd = "/tmp/DisplayCAL-i91d9z8_"
     worker_base.printcmdline(cmd=cmd, args=args, cwd=cwd)
+
+
+def test_xicclu_in_process_lookup(data_files):
+    """Test worker_base.WorkerBase.xicclu() forward lookup without ArgyllCMS."""
+    from DisplayCAL import ICCProfile
+
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    worker = worker_base.WorkerBase()
+    result = worker.xicclu(profile, [[100, 100, 100], [0, 0, 0]], pcs="x", scale=100)
+    expected_result = profile.lookup([[1, 1, 1], [0, 0, 0]], pcs="x").tolist()
+    assert result == expected_result
+    # Single row
+    result = worker.xicclu(profile, (0, 0, 0), pcs="x")
+    assert result == expected_result[1:]
+
+
+def test_xicclu_parse_output():
+    """Test worker_base.Xicclu output parsing without ArgyllCMS."""
+    xicclu = object.__new__(worker_base.Xicclu)
+    xicclu.verbose = 1
+    xicclu.scale = 100.0
+    xicclu.output_scale = 100.0
+    xicclu.convert_video_rgb_to_clut65 = False
+    xicclu.sessionlogfile = None
+    xicclu.show_actual_if_clipped = False
+    xicclu._output_data = (
+        b"[RGB] -> Lut -> [XYZ]\n"
+        b"50 50 50 [RGB] -> Lut -> 21.04 21.75 18.22 [XYZ] (clip)\n"
+        b"100 100 100 [RGB] -> Lut -> 95.1 100 108.7 [XYZ]\n"
+    )
+    xicclu.output = xicclu._output_data.splitlines(True)
+    values, clip = xicclu.get_array(get_clip=True)
+    assert values.tolist() == [[0.2104, 0.2175, 0.1822], [0.951, 1.0, 1.087]]
+    assert clip.tolist() == [True, False]
+    assert xicclu.rows_out == 2
+    assert xicclu.get(get_clip=True) == [
+        [0.2104, 0.2175, 0.1822, True],
+        [0.951, 1.0, 1.087, False],
+    ]
+    packed = xicclu.get(output_format=("<i", 65535))
+    assert packed[0] == struct.pack("<3i", 13789, 14254, 11940)
+    assert packed[1] == struct.pack("<3i", 62324, 65535, 71237)
+    # Reversed channel order
+    assert xicclu.get(reverse=True)[0] == [0.1822, 0.2175, 0.2104]
+
+
+FAKE_XICCLU = """#!%s
+import sys
+
+while True:
+    line = sys.stdin.readline()
+    if line.startswith("#"):
+        sys.stdout.write(line + "\\n")
+    elif not line.strip():
+        break
+    else:
+        values = [float(v) for v in line.split()]
+        print(line.strip(), "[RGB] -> Lut ->", " ".join("%%f" %% (v / 2) for v in values), "[XYZ]")
+    sys.stdout.flush()
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs a POSIX shebang")
+def test_xicclu_pool_reuses_process(data_files, monkeypatch, tmp_path):
+    """Test worker_base.XiccluPool reusing xicclu processes."""
+    from DisplayCAL import ICCProfile
+
+    xicclu = tmp_path / "xicclu"
+    xicclu.write_text(FAKE_XICCLU % sys.executable)
+    xicclu.chmod(0o755)
+    monkeypatch.setattr(worker_base, "get_argyll_util", lambda name: str(xicclu))
+    monkeypatch.setattr(worker_base, "get_argyll_version", lambda name: [2, 3, 0])
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    pool = worker_base.XiccluPool()
+    try:
+        for i in range(3):
+            result = pool.xicclu(profile, [[1, 1, 1], [0.5, 0.5, 0.5]], direction="b")
+            assert result == [[0.5, 0.5, 0.5], [0.25, 0.25, 0.25]]
+        assert (pool.hits, pool.misses) == (2, 1)
+        # Different options need a different process
+        pool.xicclu(profile, [[1, 1, 1]], intent="p", direction="b")
+        assert pool.misses == 2
+        assert pool.evict() == 2
+    finally:
+        pool.clear()
+
+
+FAKE_XICCLU_PROFILE_SIZE = """#!%s
+import struct
+import sys
+
+# Output the size of the profile the process was started with
+with open(sys.argv[-1], "rb") as profile:
+    size = struct.unpack(">I", profile.read(4))[0] / 1000000.0
+
+while True:
+    line = sys.stdin.readline()
+    if line.startswith("#"):
+        sys.stdout.write(line + "\\n")
+    elif not line.strip():
+        break
+    else:
+        print(line.strip(), "[RGB] -> Lut ->", " ".join(["%%f" %% size] * 3), "[XYZ]")
+    sys.stdout.flush()
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs a POSIX shebang")
+def test_xicclu_pool_changed_profile(data_files, monkeypatch, tmp_path):
+    """Test worker_base.XiccluPool with a profile changed in memory."""
+    from DisplayCAL import ICCProfile
+
+    xicclu = tmp_path / "xicclu"
+    xicclu.write_text(FAKE_XICCLU_PROFILE_SIZE % sys.executable)
+    xicclu.chmod(0o755)
+    monkeypatch.setattr(worker_base, "get_argyll_util", lambda name: str(xicclu))
+    monkeypatch.setattr(worker_base, "get_argyll_version", lambda name: [2, 3, 0])
+    path = data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    with open(path, "rb") as f:
+        profile = ICCProfile.ICCProfile(f.read())
+    pool = worker_base.XiccluPool()
+    try:
+        size = len(profile.data) / 1000000.0
+        assert pool.xicclu(profile, [[1, 1, 1]], direction="b") == [[size] * 3]
+        assert pool.xicclu(profile, [[1, 1, 1]], direction="b") == [[size] * 3]
+        assert (pool.hits, pool.misses) == (1, 1)
+        temp_fileName = profile.fileName
+        profile.setDescription("Changed " * 20)
+        changed_size = len(profile.data) / 1000000.0
+        assert changed_size != size
+        assert pool.xicclu(profile, [[1, 1, 1]], direction="b") == [[changed_size] * 3]
+        assert (pool.hits, pool.misses) == (1, 2)
+        assert profile.fileName != temp_fileName
+    finally:
+        pool.clear()
+    assert not os.path.exists(profile.fileName)
+    assert not os.path.exists(temp_fileName)
+
+
+def test_xicclu_cache(data_files, monkeypatch, tmp_path):
+    """Test worker_base.XiccluCache."""
+    from DisplayCAL import ICCProfile
+
+    profile = ICCProfile.ICCProfile(
+        data_files["UP2516D #1 2022-03-20 02-08 D6500 2.2 F-S XYZLUT+MTX.icc"]
+    )
+    cache = worker_base.XiccluCache(str(tmp_path))
+    key = cache.key(profile, [[1, 1, 1]], "r", "b", pcs="x")
+    assert key == cache.key(profile, [(1.0, 1.0, 1.0)], "r", "b", pcs="x")
+    assert key != cache.key(profile, [[1, 1, 1]], "p", "b", pcs="x")
+    assert key != cache.key(profile, [[1, 1, 0.5]], "r", "b", pcs="x")
+    assert cache.key(profile, ["1 1 1"]) is None
+    assert cache.get(key) is None
+    cache.set(key, [[0.5, 0.25, 0.125]])
+    assert cache.get(key) == [[0.5, 0.25, 0.125]]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Cached results are used by WorkerBase.xicclu without running ArgyllCMS
+    monkeypatch.setattr(worker_base, "xicclu_cache", cache)
+    worker = worker_base.WorkerBase()
+    assert worker.xicclu(profile, [[1, 1, 1]], direction="b", pcs="x") == [
+        [0.5, 0.25, 0.125]
+    ]
+    # Least recently used entries are removed first
+    key2 = cache.key(profile, [[0, 0, 0]], "r", "b", pcs="x")
+    cache.set(key2, [[0, 0, 0]])
+    os.utime(os.path.join(cache.path, key + ".npy"), (0, 0))
+    cache.trim(os.path.getsize(os.path.join(cache.path, key2 + ".npy")))
+    assert cache.get(key) is None
+    assert cache.get(key2) == [[0, 0, 0]]
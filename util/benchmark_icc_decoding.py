@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark for decoding and encoding ICC profile tags
+
+Parses all tags of the bundled reference profiles (or the profiles given as
+arguments) and reports throughput, and compares the single value and array
+number decoders/encoders on the numeric tag payloads.
+
+"""
+
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DisplayCAL import ICCProfile as ICCP
+
+
+def parse_all(datas):
+    for data in datas:
+        profile = ICCP.ICCProfile(data)
+        for tagSignature in profile.tags:
+            profile.tags[tagSignature]
+
+
+def serialize_all(profiles):
+    for profile in profiles:
+        for tagSignature in profile.tags:
+            profile.tags[tagSignature].tagData
+
+
+def decode_single(payloads):
+    for payload in payloads:
+        [ICCP.uInt16Number(payload[i : i + 2]) for i in range(0, len(payload) - 1, 2)]
+
+
+def decode_array(payloads):
+    for payload in payloads:
+        ICCP.uInt16Number_array(payload[: len(payload) // 2 * 2]).tolist()
+
+
+def encode_single(values):
+    for value in values:
+        b"".join([ICCP.uInt16Number_tohex(v) for v in value])
+
+
+def encode_array(values):
+    for value in values:
+        ICCP.uInt16Number_array_tohex(value)
+
+
+def report(name, func, arg, size, number):
+    seconds = min(timeit.repeat(lambda: func(arg), number=number, repeat=3)) / number
+    print(
+        "%-24s %9.3f ms %9.1f MiB/s"
+        % (name, seconds * 1000, size / seconds / 1024.0 / 1024.0)
+    )
+
+
+def main(paths=None):
+    if not paths:
+        ref = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "DisplayCAL",
+            "ref",
+        )
+        paths = sorted(glob.glob(os.path.join(ref, "*.ic[cm]")))
+    datas = []
+    for path in paths:
+        with open(path, "rb") as f:
+            datas.append(f.read())
+    size = sum(len(data) for data in datas)
+    print("%i profiles, %.1f KiB" % (len(datas), size / 1024.0))
+
+    profiles = [ICCP.ICCProfile(data) for data in datas]
+    parse_all(datas)
+    for profile in profiles:
+        for tagSignature in profile.tags:
+            profile.tags[tagSignature]
+    report("Parse all tags", parse_all, datas, size, 5)
+    report("Serialize all tags", serialize_all, profiles, size, 5)
+
+    # Numeric payloads (curves, tables, cLUTs)
+    payloads = []
+    for profile in profiles:
+        for tagSignature in profile.tags:
+            tagData = profile.tags[tagSignature].tagData
+            if tagData[:4] in (b"curv", b"mft2", b"vcgt", b"sf32"):
+                payloads.append(tagData[12:])
+    payload_size = sum(len(payload) for payload in payloads)
+    values = [ICCP.uInt16Number_array(payload).tolist() for payload in payloads]
+    print("%i numeric payloads, %.1f KiB" % (len(payloads), payload_size / 1024.0))
+    report("Decode single values", decode_single, payloads, payload_size, 3)
+    report("Decode array", decode_array, payloads, payload_size, 3)
+    report("Encode single values", encode_single, values, payload_size, 3)
+    report("Encode array", encode_array, values, payload_size, 3)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])